@@ -0,0 +1,106 @@
+from collections import Counter
+
+from sqlalchemy import and_, func, inspect, or_, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .changes import record_changes
+from .models import Attendance, Student
+from .rollups import apply_deltas, rollup_key
+
+ATTENDANCE_KEY = "uq_attendance_student_date"
+PRESENT_STATUSES = ("presente", "tarde")
+
+
+def attendance_rate(by_status: dict[str, int]) -> float | None:
+    total = sum(by_status.values())
+    if not total:
+        return None
+    return round(sum(by_status.get(status, 0) for status in PRESENT_STATUSES) / total, 4)
+
+
+def roll_call(db: Session, owner_id: int, payload: schemas.AttendanceBatch) -> schemas.AttendanceBatchOut:
+    statuses: dict[int, str] = {}
+    repeated: set[int] = set()
+    for entry in payload.entries:
+        if entry.student_id in statuses:
+            repeated.add(entry.student_id)
+        statuses[entry.student_id] = entry.status
+
+    # One query validates ownership, expands the group and tells which rows already exist for the date.
+    scope = [Student.id.in_(list(statuses))]
+    if payload.group_name is not None and payload.default_status:
+        scope.append(Student.group_name == payload.group_name)
+    students = db.execute(
+        select(Student.id, Attendance.id, Attendance.status)
+        .outerjoin(Attendance, and_(Attendance.student_id == Student.id, Attendance.date == payload.date))
+        .where(Student.owner_id == owner_id, or_(*scope))
+        .order_by(Student.full_name, Student.id)
+    ).all()
+    existing = {student_id: attendance_id for student_id, attendance_id, _status in students}
+    previous = {student_id: status for student_id, _attendance_id, status in students}
+
+    results: dict[int, schemas.AttendanceBatchResult] = {}
+    rows = []
+    for student_id, _attendance_id, _status in students:
+        if student_id in repeated:
+            results[student_id] = schemas.AttendanceBatchResult(
+                student_id=student_id, result="error", error="Alumno repetido en la lista"
+            )
+            continue
+        status = statuses.get(student_id, payload.default_status)
+        rows.append({"owner_id": owner_id, "student_id": student_id, "date": payload.date, "status": status})
+    for student_id in statuses:
+        if student_id not in existing:
+            results[student_id] = schemas.AttendanceBatchResult(
+                student_id=student_id, result="error", error="Alumno no encontrado"
+            )
+
+    if rows:
+        statement = insert(Attendance).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Attendance.student_id, Attendance.date],
+            set_={"status": statement.excluded.status},
+        )
+        records = db.scalars(statement.returning(Attendance), execution_options={"populate_existing": True}).all()
+        # Core-level upserts bypass the mapper events, so the change log and the rollups are fed explicitly.
+        record_changes(db.connection(), owner_id, "attendance", [record.id for record in records])
+        deltas = Counter()
+        for record in records:
+            deltas[rollup_key(owner_id, record.student_id, record.date, record.status)] += 1
+            if previous.get(record.student_id) is not None:
+                deltas[rollup_key(owner_id, record.student_id, record.date, previous[record.student_id])] -= 1
+        apply_deltas(db.connection(), deltas)
+        for record in records:
+            results[record.student_id] = schemas.AttendanceBatchResult(
+                student_id=record.student_id,
+                result="updated" if existing.get(record.student_id) else "created",
+                attendance=schemas.AttendanceOut.model_validate(record),
+            )
+        db.commit()
+
+    ordered = [results[student_id] for student_id, _attendance_id, _status in students if student_id in results]
+    ordered += [result for student_id, result in results.items() if student_id not in existing]
+    return schemas.AttendanceBatchOut(
+        date=payload.date,
+        created=sum(result.result == "created" for result in ordered),
+        updated=sum(result.result == "updated" for result in ordered),
+        failed=sum(result.result == "error" for result in ordered),
+        results=ordered,
+    )
+
+
+def init_attendance_key(connection: Connection) -> None:
+    if any(index["name"] == ATTENDANCE_KEY for index in inspect(connection).get_indexes(Attendance.__tablename__)):
+        return
+    # Older databases may hold several rows for the same student and day; the latest one wins.
+    latest = select(func.max(Attendance.id)).group_by(Attendance.student_id, Attendance.date)
+    duplicates = connection.execute(select(Attendance.id, Attendance.owner_id).where(Attendance.id.not_in(latest))).all()
+    if duplicates:
+        connection.execute(Attendance.__table__.delete().where(Attendance.id.in_([row.id for row in duplicates])))
+        for owner_id in {row.owner_id for row in duplicates}:
+            ids = [row.id for row in duplicates if row.owner_id == owner_id]
+            record_changes(connection, owner_id, "attendance", ids, deleted=True)
+    next(index for index in Attendance.__table__.indexes if index.name == ATTENDANCE_KEY).create(connection)
@@ -1,28 +1,46 @@
+import os
 from datetime import datetime, timedelta, timezone
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 
-from .database import get_db
+from .cache import TTLCache
+from .database import ReadSessionLocal, get_async_db, get_db
+from .hashing import HashingPool
+from .invalidation import on_invalidate, publish
 from .models import User
 
 SECRET_KEY = "change_me_for_production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 24 * 60
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "2048"))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+PRINCIPAL_TOPIC = "users"
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+hashing_pool = HashingPool(max_workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_QUEUE_LIMIT)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
 
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def hash_password_async(password: str) -> str:
+    return await hashing_pool.run(pwd_context.hash, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await hashing_pool.run(pwd_context.verify_and_update, plain_password, hashed_password)
 
 
 def create_access_token(subject: str) -> str:
@@ -31,21 +49,87 @@ def create_access_token(subject: str) -> str:
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def _detached_principal(user: User) -> User:
+    principal = User(
+        id=user.id,
+        email=user.email,
+        full_name=user.full_name,
+        hashed_password=user.hashed_password,
+        created_at=user.created_at,
+    )
+    make_transient_to_detached(principal)
+    return principal
+
+
+def invalidate_principal(user_id: int) -> int:
+    return principal_cache.discard_where(lambda _token, principal: principal.id == user_id)
+
+
+on_invalidate(PRINCIPAL_TOPIC, invalidate_principal)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _evict_changed_principal(_mapper, connection, target: User) -> None:
+    invalidate_principal(target.id)
+    publish(connection, target.id, PRINCIPAL_TOPIC)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str | None = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError as exc:
-        raise credentials_exception from exc
+        raise _credentials_exception() from exc
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+
+def _remember_principal(token: str, payload: dict, user: User) -> None:
+    expires_in = payload["exp"] - datetime.now(timezone.utc).timestamp() if "exp" in payload else None
+    principal_cache.set(token, _detached_principal(user), ttl=expires_in)
+
+
+def _load_user(email: str) -> User | None:
+    # Read through the read-only pool even on writes, so authenticating never takes the write lock.
+    db = ReadSessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+        return None if user is None else _detached_principal(user)
+    finally:
+        db.close()
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return db.merge(principal, load=False)
+
+    payload = _decode_token(token)
+    user = _load_user(payload["sub"])
+    if user is None:
+        raise _credentials_exception()
+    _remember_principal(token, payload, user)
+    return db.merge(user, load=False)
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    # Async routes only read the principal's columns, so the cached detached copy is returned as is.
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
 
-    user = db.query(User).filter(User.email == email).first()
+    payload = _decode_token(token)
+    user = await db.scalar(select(User).where(User.email == payload["sub"]))
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    _remember_principal(token, payload, user)
     return user
@@ -0,0 +1,141 @@
+import os
+from datetime import datetime
+
+from sqlalchemy import event as orm_event
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .cache import TTLCache
+from .database import engine
+from .models import Attendance, ChangeLog, DailyContent, Event, EventException, Observation, Planning, Reminder, Student, Task
+
+COLLECTIONS = {
+    "events": (Event, schemas.EventOut),
+    "event_exceptions": (EventException, schemas.EventExceptionOut),
+    "tasks": (Task, schemas.TaskOut),
+    "reminders": (Reminder, schemas.ReminderOut),
+    "students": (Student, schemas.StudentOut),
+    "observations": (Observation, schemas.ObservationOut),
+    "attendance": (Attendance, schemas.AttendanceOut),
+    "plannings": (Planning, schemas.PlanningOut),
+    "contents": (DailyContent, schemas.DailyContentOut),
+}
+COLLECTION_BY_MODEL = {model: name for name, (model, _schema) in COLLECTIONS.items()}
+
+COLLECTION_VERSION_CACHE_SIZE = int(os.getenv("COLLECTION_VERSION_CACHE_SIZE", "8192"))
+COLLECTION_VERSION_TTL_SECONDS = int(os.getenv("COLLECTION_VERSION_TTL_SECONDS", "300"))
+PENDING_CHANGES_KEY = "pending_changes"
+
+collection_versions = TTLCache(maxsize=COLLECTION_VERSION_CACHE_SIZE, ttl=COLLECTION_VERSION_TTL_SECONDS)
+_generation = 0
+# Callables receiving [(owner_id, collection, row_id, deleted), ...] when the writing connection is released.
+# That also happens after a rollback, so subscribers must re-read the rows rather than trust the entries.
+change_subscribers: list = []
+
+
+def record_changes(connection: Connection, owner_id: int, collection: str, row_ids, deleted: bool = False) -> None:
+    # One entry per row: OR REPLACE drops the previous entry and AUTOINCREMENT hands out a fresh, higher seq.
+    rows = [
+        {"owner_id": owner_id, "collection": collection, "row_id": row_id, "deleted": deleted, "changed_at": datetime.utcnow()}
+        for row_id in row_ids
+    ]
+    if rows:
+        connection.execute(insert(ChangeLog).prefix_with("OR REPLACE"), rows)
+        connection.info.setdefault(PENDING_CHANGES_KEY, []).extend(
+            (owner_id, collection, row_id, deleted) for row_id in row_ids
+        )
+
+
+def _listener(deleted: bool):
+    def record(mapper, connection, target) -> None:
+        record_changes(connection, target.owner_id, COLLECTION_BY_MODEL[mapper.class_], [target.id], deleted)
+
+    return record
+
+
+for _model in COLLECTION_BY_MODEL:
+    orm_event.listen(_model, "after_insert", _listener(False))
+    orm_event.listen(_model, "after_update", _listener(False))
+    orm_event.listen(_model, "after_delete", _listener(True))
+
+
+def invalidate_versions(keys) -> None:
+    global _generation
+    _generation += 1
+    for key in keys:
+        collection_versions.pop(key)
+
+
+def subscribe(callback) -> None:
+    change_subscribers.append(callback)
+
+
+def unsubscribe(callback) -> None:
+    if callback in change_subscribers:
+        change_subscribers.remove(callback)
+
+
+def dispatch_changes(changes) -> None:
+    invalidate_versions({(owner_id, collection) for owner_id, collection, _row_id, _deleted in changes})
+    for callback in list(change_subscribers):
+        callback(changes)
+
+
+@orm_event.listens_for(engine, "checkin")
+def _publish_changes(_dbapi_connection, connection_record) -> None:
+    # Connections go back to the pool after commit, so readers never cache a version from an uncommitted write.
+    changes = connection_record.info.pop(PENDING_CHANGES_KEY, None)
+    if changes:
+        dispatch_changes(changes)
+
+
+def _version_query(owner_id: int, collection: str):
+    return select(func.max(ChangeLog.seq)).where(ChangeLog.owner_id == owner_id, ChangeLog.collection == collection)
+
+
+def _remember_version(key: tuple[int, str], version: int, generation: int) -> None:
+    # A write that committed while we were reading must not be masked by the older value.
+    if generation == _generation:
+        collection_versions.set(key, version)
+
+
+def collection_version(db: Session, owner_id: int, collection: str) -> int:
+    key = (owner_id, collection)
+    version = collection_versions.get(key)
+    if version is None:
+        generation = _generation
+        version = db.scalar(_version_query(owner_id, collection)) or 0
+        _remember_version(key, version, generation)
+    return version
+
+
+async def collection_version_async(db: AsyncSession, owner_id: int, collection: str) -> int:
+    key = (owner_id, collection)
+    version = collection_versions.get(key)
+    if version is None:
+        generation = _generation
+        version = await db.scalar(_version_query(owner_id, collection)) or 0
+        _remember_version(key, version, generation)
+    return version
+
+
+def latest_seq(db: Session, owner_id: int) -> int:
+    return db.scalar(select(func.max(ChangeLog.seq)).where(ChangeLog.owner_id == owner_id)) or 0
+
+
+def init_change_log(connection: Connection) -> None:
+    for index in ChangeLog.__table__.indexes:
+        index.create(connection, checkfirst=True)
+    if connection.scalar(select(ChangeLog.seq).limit(1)) is not None:
+        return
+    for name, (model, _schema) in COLLECTIONS.items():
+        connection.execute(
+            insert(ChangeLog).from_select(
+                ["owner_id", "collection", "row_id", "deleted", "changed_at"],
+                select(model.owner_id, literal(name), model.id, literal(False), func.current_timestamp()).order_by(model.id),
+            )
+        )
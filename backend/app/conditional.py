@@ -0,0 +1,72 @@
+import hashlib
+from datetime import date
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .auth import get_current_user, get_current_user_async
+from .changes import collection_version, collection_version_async
+from .database import get_async_db, get_db
+from .models import User
+
+ETAG_HEADER = "ETag"
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def _check(request: Request, response: Response, user_id: int, versions: list[int], extra: tuple = ()) -> str:
+    # Today's date is part of the key because several lists default their window to it.
+    key = (
+        user_id,
+        versions,
+        extra,
+        date.today().isoformat(),
+        request.url.path,
+        sorted(request.query_params.multi_items()),
+        request.headers.get("accept", ""),
+    )
+    etag = '"' + hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest() + '"'
+    headers = {ETAG_HEADER: etag, "Cache-Control": "private, no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return etag
+
+
+def check_collections(
+    request: Request, response: Response, db: Session, owner_id: int, collections: tuple[str, ...], extra: tuple = ()
+) -> str:
+    # `extra` carries response inputs that live outside the change log, such as the user's own row.
+    versions = [collection_version(db, owner_id, collection) for collection in collections]
+    return _check(request, response, owner_id, versions, extra)
+
+
+def collection_etag(*collections: str):
+    def dependency(
+        request: Request,
+        response: Response,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user),
+    ) -> str:
+        return check_collections(request, response, db, current_user.id, collections)
+
+    return dependency
+
+
+def async_collection_etag(*collections: str):
+    async def dependency(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user_async),
+    ) -> str:
+        versions = [await collection_version_async(db, current_user.id, collection) for collection in collections]
+        return _check(request, response, current_user.id, versions)
+
+    return dependency
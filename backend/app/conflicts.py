@@ -0,0 +1,255 @@
+import calendar
+import os
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .cache import TTLCache
+from .changes import collection_version
+from .models import ChangeLog, Event, EventException
+from .recurrence import expand_events, occurrence_dates, parse_rule, recurring_filter, window_exceptions
+
+CONFLICT_HORIZON_DAYS = int(os.getenv("CONFLICT_HORIZON_DAYS", "366"))
+CONFLICT_INDEX_CACHE_SIZE = int(os.getenv("CONFLICT_INDEX_CACHE_SIZE", "1024"))
+CONFLICT_INDEX_TTL_SECONDS = int(os.getenv("CONFLICT_INDEX_TTL_SECONDS", "600"))
+# Past this many changed rows a cached index is rebuilt rather than patched.
+CONFLICT_INDEX_MAX_PATCH = int(os.getenv("CONFLICT_INDEX_MAX_PATCH", "200"))
+CONFLICT_COLLECTIONS = ("events", "event_exceptions")
+SCHEDULE_FIELDS = {"date", "start_time", "end_time", "recurrence", "recurrence_rule"}
+
+index_cache = TTLCache(maxsize=CONFLICT_INDEX_CACHE_SIZE, ttl=CONFLICT_INDEX_TTL_SECONDS)
+
+
+def _conflict(occurrence: schemas.EventOccurrenceOut) -> schemas.EventConflict:
+    return schemas.EventConflict(
+        event_id=occurrence.id,
+        title=occurrence.title,
+        date=occurrence.date,
+        start_time=occurrence.start_time,
+        end_time=occurrence.end_time,
+        occurrence_date=occurrence.occurrence_date,
+    )
+
+
+class IntervalIndex:
+    # Occurrences never cross midnight, so each day keeps its intervals sorted by start time together
+    # with a running maximum of their end times; a lookup bisects on the start and walks back only
+    # while an earlier interval could still reach past the queried start.
+    def __init__(self, occurrences: list[schemas.EventOccurrenceOut], exception_events: dict[int, int] | None = None):
+        self._days: dict[date, list[schemas.EventOccurrenceOut]] = {}
+        self._starts: dict[date, list[time]] = {}
+        self._max_ends: dict[date, list[time]] = {}
+        # event id -> days holding one of its occurrences, and exception id -> event id, for patching
+        self._event_days: dict[int, set[date]] = defaultdict(set)
+        self.exception_events = dict(exception_events or {})
+        for day, items in self._group(occurrences).items():
+            self._set_day(day, items)
+
+    @staticmethod
+    def _group(occurrences: list[schemas.EventOccurrenceOut]) -> dict[date, list[schemas.EventOccurrenceOut]]:
+        days: dict[date, list[schemas.EventOccurrenceOut]] = defaultdict(list)
+        for occurrence in occurrences:
+            if occurrence.end_time > occurrence.start_time:
+                days[occurrence.date].append(occurrence)
+        return days
+
+    def _set_day(self, day: date, items: list[schemas.EventOccurrenceOut]) -> None:
+        if not items:
+            self._days.pop(day, None)
+            self._starts.pop(day, None)
+            self._max_ends.pop(day, None)
+            return
+        items.sort(key=lambda occurrence: (occurrence.start_time, occurrence.end_time, occurrence.id))
+        max_ends = []
+        for occurrence in items:
+            max_ends.append(max(max_ends[-1], occurrence.end_time) if max_ends else occurrence.end_time)
+            self._event_days[occurrence.id].add(day)
+        self._days[day] = items
+        self._starts[day] = [occurrence.start_time for occurrence in items]
+        self._max_ends[day] = max_ends
+
+    def patched(
+        self, event_ids: set[int], occurrences: list[schemas.EventOccurrenceOut], exception_events: dict[int, int]
+    ) -> "IntervalIndex":
+        # Copy on write: readers holding this index keep a consistent view while only the days that held
+        # or now hold an occurrence of the changed events are rebuilt.
+        added = self._group(occurrences)
+        touched = set(added).union(*(self._event_days.get(event_id, ()) for event_id in event_ids))
+        # Events sharing a rebuilt day get their own copy of the day set, since _set_day writes to it.
+        sharing = {occurrence.id for day in touched for occurrence in self._days.get(day, ())} - event_ids
+        index = IntervalIndex([])
+        index._days, index._starts, index._max_ends = dict(self._days), dict(self._starts), dict(self._max_ends)
+        index._event_days = defaultdict(
+            set,
+            {
+                event_id: set(days) if event_id in sharing else days
+                for event_id, days in self._event_days.items()
+                if event_id not in event_ids
+            },
+        )
+        index.exception_events = {**self.exception_events, **exception_events}
+        for day in touched:
+            kept = [occurrence for occurrence in self._days.get(day, []) if occurrence.id not in event_ids]
+            index._set_day(day, kept + added.get(day, []))
+        return index
+
+    def overlapping(self, day: date, start: time, end: time, exclude_event_id: int | None = None) -> list[schemas.EventOccurrenceOut]:
+        items = self._days.get(day)
+        if not items or end <= start:
+            return []
+        found = []
+        max_ends = self._max_ends[day]
+        for position in range(bisect_left(self._starts[day], end) - 1, -1, -1):
+            if max_ends[position] <= start:
+                break
+            occurrence = items[position]
+            if occurrence.end_time > start and occurrence.id != exclude_event_id:
+                found.append(occurrence)
+        found.reverse()
+        return found
+
+    def pairs(self, start: date, end: date) -> list[schemas.ConflictPair]:
+        found = []
+        for day in sorted(day for day in self._days if start <= day <= end):
+            active: list[schemas.EventOccurrenceOut] = []
+            for occurrence in self._days[day]:
+                active = [other for other in active if other.end_time > occurrence.start_time]
+                found.extend(schemas.ConflictPair(date=day, first=_conflict(other), second=_conflict(occurrence)) for other in active)
+                active.append(occurrence)
+        return found
+
+    def free_slots(self, day: date, day_start: time, day_end: time, duration: timedelta) -> list[schemas.FreeSlot]:
+        slots = []
+        cursor = datetime.combine(day, day_start)
+        closing = datetime.combine(day, day_end)
+        for occurrence in self._days.get(day, []):
+            busy_start = datetime.combine(day, occurrence.start_time)
+            if busy_start >= closing:
+                break
+            if busy_start - cursor >= duration:
+                slots.append(schemas.FreeSlot(date=day, start_time=cursor.time(), end_time=busy_start.time()))
+            cursor = max(cursor, datetime.combine(day, occurrence.end_time))
+        if closing - cursor >= duration:
+            slots.append(schemas.FreeSlot(date=day, start_time=cursor.time(), end_time=day_end))
+        return slots
+
+
+def _expand(db: Session, owner_id: int, start: date, end: date, event_ids: set[int] | None = None):
+    query = db.query(Event).filter(Event.owner_id == owner_id, Event.date <= end, or_(Event.date >= start, recurring_filter()))
+    if event_ids is not None:
+        query = query.filter(Event.id.in_(event_ids))
+    events = query.all()
+    overrides: dict[int, dict[date, EventException]] = defaultdict(dict)
+    exception_events: dict[int, int] = {}
+    if events:
+        exceptions = db.query(EventException).filter(
+            EventException.owner_id == owner_id,
+            EventException.event_id.in_([event.id for event in events]),
+            window_exceptions(start, end),
+        )
+        for exception in exceptions:
+            overrides[exception.event_id][exception.original_date] = exception
+            exception_events[exception.id] = exception.event_id
+    return expand_events(events, overrides, start, end), exception_events
+
+
+def _changed_events(db: Session, owner_id: int, index: IntervalIndex, since: tuple[int, ...]) -> set[int] | None:
+    # The change log keeps one entry per row at its latest seq, so everything written after the index was
+    # built shows up once. None means the change is too large (or untraceable) to patch.
+    rows = db.execute(
+        select(ChangeLog.collection, ChangeLog.row_id, EventException.event_id)
+        .outerjoin(EventException, and_(ChangeLog.collection == "event_exceptions", EventException.id == ChangeLog.row_id))
+        .where(
+            ChangeLog.owner_id == owner_id,
+            or_(*(and_(ChangeLog.collection == collection, ChangeLog.seq > seq) for collection, seq in zip(CONFLICT_COLLECTIONS, since))),
+        )
+        .limit(CONFLICT_INDEX_MAX_PATCH + 1)
+    ).all()
+    if len(rows) > CONFLICT_INDEX_MAX_PATCH:
+        return None
+    event_ids = set()
+    for collection, row_id, event_id in rows:
+        if collection == "events":
+            event_ids.add(row_id)
+        elif event_id is not None:
+            event_ids.add(event_id)
+        elif row_id in index.exception_events:
+            # A deleted exception is gone from the table; the index remembers which event it overrode, and
+            # one it never saw did not touch the window.
+            event_ids.add(index.exception_events[row_id])
+    return event_ids
+
+
+def owner_index(db: Session, owner_id: int, start: date, end: date) -> IntervalIndex:
+    # Windows are widened to whole months so that nearby lookups share one index until the events change;
+    # after a write only the changed events are expanded again and the days they touch rebuilt.
+    start = start.replace(day=1)
+    end = end.replace(day=calendar.monthrange(end.year, end.month)[1])
+    versions = tuple(collection_version(db, owner_id, collection) for collection in CONFLICT_COLLECTIONS)
+    key = (owner_id, start, end)
+    cached = index_cache.get(key)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+    event_ids = _changed_events(db, owner_id, cached[1], cached[0]) if cached is not None else None
+    if event_ids is not None:
+        index = cached[1].patched(event_ids, *_expand(db, owner_id, start, end, event_ids))
+    else:
+        index = IntervalIndex(*_expand(db, owner_id, start, end))
+    index_cache.set(key, (versions, index))
+    return index
+
+
+def _candidate_dates(db: Session, fields: dict, event_id: int | None) -> list[date]:
+    rule = parse_rule(fields.get("recurrence"), fields.get("recurrence_rule"))
+    if rule is None:
+        return [fields["date"]]
+    window_start = max(fields["date"], date.today())
+    dates = occurrence_dates(rule, fields["date"], window_start, window_start + timedelta(days=CONFLICT_HORIZON_DAYS))
+    if event_id is None:
+        return dates
+    cancelled = set(
+        db.scalars(
+            select(EventException.original_date).where(EventException.event_id == event_id, EventException.is_cancelled.is_(True))
+        )
+    )
+    return [day for day in dates if day not in cancelled]
+
+
+def find_conflicts(db: Session, owner_id: int, fields: dict, event_id: int | None = None) -> list[schemas.EventConflict]:
+    # `fields` holds the event as it would be saved; `event_id` leaves the event's current occurrences out.
+    if fields["end_time"] <= fields["start_time"]:
+        return []
+    dates = _candidate_dates(db, fields, event_id)
+    if not dates:
+        return []
+    index = owner_index(db, owner_id, dates[0], dates[-1])
+    return [
+        _conflict(occurrence)
+        for day in dates
+        for occurrence in index.overlapping(day, fields["start_time"], fields["end_time"], exclude_event_id=event_id)
+    ]
+
+
+def free_slots(
+    db: Session,
+    owner_id: int,
+    start: date,
+    end: date,
+    day_start: time,
+    day_end: time,
+    duration: timedelta,
+    include_weekends: bool = False,
+    limit: int | None = None,
+) -> list[schemas.FreeSlot]:
+    index = owner_index(db, owner_id, start, end)
+    slots: list[schemas.FreeSlot] = []
+    day = start
+    while day <= end and (limit is None or len(slots) < limit):
+        if include_weekends or day.weekday() < 5:
+            slots.extend(index.free_slots(day, day_start, day_end, duration))
+        day += timedelta(days=1)
+    return slots[:limit]
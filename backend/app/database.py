@@ -1,16 +1,146 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
 
-DATABASE_URL = "sqlite:///./agenda.db"
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./agenda.db")
+# "sync" serves every route from the threadpool; "async" also mounts the async read routes (needs aiosqlite).
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync").lower()
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1))
+ASYNC_MODE = DATABASE_MODE == "async"
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-20000"))  # negative values are KiB
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+READ_POOL_SIZE = int(os.getenv("READ_POOL_SIZE", "8"))
+LOCK_WAIT_WARN_MS = int(os.getenv("LOCK_WAIT_WARN_MS", "100"))
+READ_METHODS = {"GET", "HEAD"}
+
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+IN_MEMORY = IS_SQLITE and make_url(DATABASE_URL).database in (None, "", ":memory:")
+
+logger = logging.getLogger(__name__)
+
+
+class LockWaits:
+    def __init__(self, warn_ms: int):
+        self.warn_ms = warn_ms
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.slow = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            slow = seconds * 1000 >= self.warn_ms
+            if slow:
+                self.slow += 1
+        if slow:
+            logger.warning("Waited %.0f ms for the SQLite write lock", seconds * 1000)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "total_ms": round(self.total_seconds * 1000, 3),
+                "max_ms": round(self.max_seconds * 1000, 3),
+                "slow": self.slow,
+            }
+
+
+lock_waits = LockWaits(warn_ms=LOCK_WAIT_WARN_MS)
+
+
+def configure_sqlite(engine: Engine, read_only: bool = False) -> None:
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, _connection_record) -> None:
+        if not read_only and hasattr(dbapi_connection, "isolation_level"):
+            # Transactions are begun explicitly below instead of by the driver.
+            dbapi_connection.isolation_level = None
+        pragmas = [
+            f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+            f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}",
+            f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}",
+            f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}",
+        ]
+        if not read_only and not IN_MEMORY:
+            pragmas.insert(0, f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        if read_only:
+            pragmas.append("PRAGMA query_only = ON")
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    if read_only:
+        return
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(connection) -> None:
+        # Taking the write lock up front lets busy_timeout queue writers; a deferred transaction that
+        # upgrades from reading to writing fails straight away with "database is locked" instead.
+        started = time.perf_counter()
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        lock_waits.record(time.perf_counter() - started)
+
+
+connect_args = {"check_same_thread": False} if IS_SQLITE else {}
+if IS_SQLITE and not IN_MEMORY:
+    # SQLite allows one writer at a time, so writes share a single connection and reads get their own pool.
+    engine = create_engine(DATABASE_URL, connect_args=connect_args, pool_size=1, max_overflow=0)
+    read_engine = create_engine(DATABASE_URL, connect_args=connect_args, pool_size=READ_POOL_SIZE)
+    configure_sqlite(engine)
+    configure_sqlite(read_engine, read_only=True)
+else:
+    engine = read_engine = create_engine(DATABASE_URL, connect_args=connect_args)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    # The async routes only read, so this engine gets the read-only profile.
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    if IS_SQLITE and not IN_MEMORY:
+        configure_sqlite(async_engine.sync_engine, read_only=True)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
-def get_db():
-    db = SessionLocal()
+
+def get_db(request: Request):
+    db = (ReadSessionLocal if request.method in READ_METHODS else SessionLocal)()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@contextmanager
+def read_snapshot(db: Session):
+    db.connection().exec_driver_sql("BEGIN")
+    try:
+        yield db
+    finally:
+        db.rollback()
@@ -0,0 +1,191 @@
+import argparse
+import calendar
+import multiprocessing
+import os
+import time
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from itertools import repeat
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .cache import TTLCache
+from .database import ReadSessionLocal
+from .migrations import ensure_schema
+from .models import ChangeLog, Event, EventException, Planning, Reminder, Student, Task
+from .recurrence import expand_events, recurring_filter, window_exceptions
+
+DIGEST_WORKERS = int(os.getenv("DIGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+DIGEST_SHARD_SIZE = int(os.getenv("DIGEST_SHARD_SIZE", "2000"))
+DIGEST_CACHE_SIZE = int(os.getenv("DIGEST_CACHE_SIZE", "16384"))
+DIGEST_CACHE_TTL_SECONDS = int(os.getenv("DIGEST_CACHE_TTL_SECONDS", "86400"))
+QUERY_CHUNK_SIZE = 500
+
+# Collections whose change-log versions key a cached digest.
+DIGEST_COLLECTIONS = ("events", "event_exceptions", "tasks", "students", "plannings")
+WEEKDAY_NAMES = ("lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo")
+
+digest_cache = TTLCache(maxsize=DIGEST_CACHE_SIZE, ttl=DIGEST_CACHE_TTL_SECONDS)
+
+
+def _chunks(values: list, size: int = QUERY_CHUNK_SIZE):
+    for index in range(0, len(values), size):
+        yield values[index : index + size]
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().strip().lower()
+
+
+def _birthday_keys(day: date) -> list[str]:
+    keys = [day.strftime("%m-%d")]
+    if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+        keys.append("02-29")
+    return keys
+
+
+def _planning_day(planning: Planning) -> date | None:
+    name = _normalize(planning.weekday)
+    if name not in WEEKDAY_NAMES:
+        return None
+    return planning.week_start + timedelta(days=(WEEKDAY_NAMES.index(name) - planning.week_start.weekday()) % 7)
+
+
+def digest_body(digest: schemas.DailyDigest) -> str:
+    body = f"Hoy: {len(digest.events)} eventos y {len(digest.tasks)} tareas pendientes"
+    if digest.birthdays:
+        body += ". Cumpleaños: " + ", ".join(student.full_name for student in digest.birthdays)
+    if digest.plannings:
+        body += ". Planificación: " + digest.plannings[0].activities
+    return body
+
+
+def opted_in_owners(db: Session) -> list[int]:
+    return list(
+        db.scalars(select(Reminder.owner_id).where(Reminder.daily_summary.is_(True)).distinct().order_by(Reminder.owner_id))
+    )
+
+
+def digest_versions(db: Session, owner_ids: list[int]) -> dict[int, tuple[int, ...]]:
+    found: dict[int, dict[str, int]] = defaultdict(dict)
+    for chunk in _chunks(owner_ids):
+        rows = db.execute(
+            select(ChangeLog.owner_id, ChangeLog.collection, func.max(ChangeLog.seq))
+            .where(ChangeLog.owner_id.in_(chunk), ChangeLog.collection.in_(DIGEST_COLLECTIONS))
+            .group_by(ChangeLog.owner_id, ChangeLog.collection)
+        )
+        for owner_id, collection, seq in rows:
+            found[owner_id][collection] = seq
+    return {owner_id: tuple(found[owner_id].get(name, 0) for name in DIGEST_COLLECTIONS) for owner_id in owner_ids}
+
+
+def build_shard(db: Session, owner_ids: list[int], day: date) -> dict[int, schemas.DailyDigest]:
+    # Every query covers the whole shard; nothing below runs once per user.
+    digests = {owner_id: schemas.DailyDigest(owner_id=owner_id, date=day) for owner_id in owner_ids}
+    for chunk in _chunks(owner_ids):
+        events = (
+            db.query(Event)
+            .filter(Event.owner_id.in_(chunk), Event.date <= day, or_(Event.date >= day, recurring_filter()))
+            .all()
+        )
+        overrides: dict[int, dict[date, EventException]] = defaultdict(dict)
+        if events:
+            exceptions = db.query(EventException).filter(EventException.owner_id.in_(chunk), window_exceptions(day, day))
+            for exception in exceptions:
+                overrides[exception.event_id][exception.original_date] = exception
+        for occurrence in expand_events(events, overrides, day, day):
+            digests[occurrence.owner_id].events.append(occurrence)
+
+        tasks = (
+            db.query(Task)
+            .filter(Task.owner_id.in_(chunk), Task.is_done.is_(False), Task.due_date <= day)
+            .order_by(Task.due_date, Task.id)
+        )
+        for task in tasks:
+            digests[task.owner_id].tasks.append(schemas.TaskOut.model_validate(task))
+
+        students = (
+            db.query(Student)
+            .filter(Student.owner_id.in_(chunk), func.strftime("%m-%d", Student.birthday).in_(_birthday_keys(day)))
+            .order_by(Student.full_name, Student.id)
+        )
+        for student in students:
+            digests[student.owner_id].birthdays.append(schemas.StudentOut.model_validate(student))
+
+        plannings = (
+            db.query(Planning)
+            .filter(Planning.owner_id.in_(chunk), Planning.week_start.between(day - timedelta(days=6), day))
+            .order_by(Planning.week_start.desc(), Planning.id)
+        )
+        for planning in plannings:
+            if _planning_day(planning) == day:
+                digests[planning.owner_id].plannings.append(schemas.PlanningOut.model_validate(planning))
+
+    for digest in digests.values():
+        digest.body = digest_body(digest)
+    return digests
+
+
+def _build_shard_in_worker(owner_ids: list[int], day: date) -> dict[int, schemas.DailyDigest]:
+    db = ReadSessionLocal()
+    try:
+        return build_shard(db, owner_ids, day)
+    finally:
+        db.close()
+
+
+def build_digests(
+    db: Session, day: date, owner_ids: list[int] | None = None, workers: int = DIGEST_WORKERS
+) -> dict[int, schemas.DailyDigest]:
+    if owner_ids is None:
+        owner_ids = opted_in_owners(db)
+    # Versions are read before building, so a write racing the build can only make a cached digest look stale.
+    versions = digest_versions(db, owner_ids)
+    digests: dict[int, schemas.DailyDigest] = {}
+    stale = []
+    for owner_id in owner_ids:
+        cached = digest_cache.get((owner_id, day))
+        if cached is not None and cached[0] == versions[owner_id]:
+            digests[owner_id] = cached[1]
+        else:
+            stale.append(owner_id)
+
+    shards = list(_chunks(stale, DIGEST_SHARD_SIZE))
+    if workers > 1 and len(shards) > 1:
+        # Spawned, not forked: this also runs from the scheduler inside the server, whose threads, pooled
+        # SQLite connections and hashing pool must not be copied into the workers.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=context) as pool:
+            results = list(pool.map(_build_shard_in_worker, shards, repeat(day)))
+    else:
+        results = [build_shard(db, shard, day) for shard in shards]
+
+    for result in results:
+        for owner_id, digest in result.items():
+            digest_cache.set((owner_id, day), (versions[owner_id], digest))
+            digests[owner_id] = digest
+    return digests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.digest", description="Build the daily summaries of every opted-in user.")
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--workers", type=int, default=DIGEST_WORKERS)
+    args = parser.parse_args()
+
+    ensure_schema()
+    started = time.perf_counter()
+    db = ReadSessionLocal()
+    try:
+        digests = build_digests(db, args.date, workers=args.workers)
+    finally:
+        db.close()
+    print(f"Built {len(digests)} daily summaries for {args.date.isoformat()} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
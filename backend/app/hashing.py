@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+
+class HashingPoolSaturated(Exception):
+    pass
+
+
+class HashingPool:
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.peak_queue_depth = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._slots: asyncio.Semaphore | None = None
+
+    @asynccontextmanager
+    async def slot(self):
+        # Requests wait here on the event loop, without holding a threadpool worker or a DB connection.
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise HashingPoolSaturated()
+            self.queued += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self.queued)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        try:
+            await self._slots.acquire()
+        finally:
+            with self._lock:
+                self.queued -= 1
+        with self._lock:
+            self.running += 1
+        try:
+            yield
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "peak_queue_depth": self.peak_queue_depth,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
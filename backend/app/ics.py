@@ -0,0 +1,183 @@
+import os
+import re
+from collections import defaultdict
+from datetime import date, datetime, time, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import event as orm_event
+
+from .cache import TTLCache
+from .database import ReadSessionLocal, read_snapshot
+from .models import Event, EventException
+from .recurrence import OVERRIDE_FIELDS, InvalidRecurrenceRule, parse_rule
+
+ICS_MEDIA_TYPE = "text/calendar; charset=utf-8"
+ICS_UID_DOMAIN = os.getenv("ICS_UID_DOMAIN", "agenda-docente")
+# Event times carry no zone; calendar clients show them as floating local times unless this names one.
+ICS_TIMEZONE = os.getenv("ICS_TIMEZONE")
+ICS_ZONE = ZoneInfo(ICS_TIMEZONE) if ICS_TIMEZONE else None
+ICS_CACHE_SIZE = int(os.getenv("ICS_CACHE_SIZE", "16384"))
+ICS_CACHE_TTL_SECONDS = int(os.getenv("ICS_CACHE_TTL_SECONDS", "86400"))
+ICS_STREAM_BATCH_SIZE = 200
+LINE_LIMIT = 75
+# DTSTAMP for rows created before events recorded created_at.
+EPOCH = datetime(1970, 1, 1)
+
+NEWLINE = re.compile(r"\r\n|\r|\n")
+
+fragment_cache = TTLCache(maxsize=ICS_CACHE_SIZE, ttl=ICS_CACHE_TTL_SECONDS)
+
+
+def _escape(text: str) -> str:
+    return NEWLINE.sub(r"\\n", text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,"))
+
+
+def _fold(line: str) -> str:
+    # Lines longer than 75 octets continue on the next line after a single space (RFC 5545, 3.1).
+    raw = line.encode()
+    if len(raw) <= LINE_LIMIT:
+        return line + "\r\n"
+    parts = []
+    start = 0
+    limit = LINE_LIMIT
+    while start < len(raw):
+        end = min(start + limit, len(raw))
+        while end < len(raw) and raw[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(raw[start:end].decode())
+        start = end
+        limit = LINE_LIMIT - 1
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _datetime(day: date, moment: time) -> str:
+    return datetime.combine(day, moment).strftime("%Y%m%dT%H%M%S")
+
+
+def _timed(name: str, day: date, moment: time) -> str:
+    if ICS_TIMEZONE:
+        return f"{name};TZID={ICS_TIMEZONE}:{_datetime(day, moment)}"
+    return f"{name}:{_datetime(day, moment)}"
+
+
+def _until(day: date) -> str:
+    # UNTIL has to be a date-time like DTSTART; stored rules may hold a bare date. Against a DTSTART with a
+    # TZID it must also be given in UTC (RFC 5545, 3.3.10).
+    until = datetime.combine(day, time(23, 59, 59))
+    if ICS_ZONE is None:
+        return until.strftime("%Y%m%dT%H%M%S")
+    return until.replace(tzinfo=ICS_ZONE).astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _rrule(event: Event) -> str | None:
+    try:
+        rule = parse_rule(event.recurrence, event.recurrence_rule)
+    except InvalidRecurrenceRule:
+        return None
+    if rule is None:
+        return None
+    if not event.recurrence_rule:
+        return f"FREQ={rule.freq}"
+    text = event.recurrence_rule.strip()
+    parts = [part.strip() for part in (text[6:] if text.upper().startswith("RRULE:") else text).split(";") if part.strip()]
+    for index, part in enumerate(parts):
+        if part.upper().startswith("UNTIL="):
+            parts[index] = f"UNTIL={_until(rule.until)}"
+    return ";".join(parts)
+
+
+def _vevent(event: Event, fields: dict, extra: list[str]) -> list[str]:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:event-{event.id}@{ICS_UID_DOMAIN}",
+        f"DTSTAMP:{(event.created_at or EPOCH).strftime('%Y%m%dT%H%M%SZ')}",
+        _timed("DTSTART", fields["date"], fields["start_time"]),
+        _timed("DTEND", fields["date"], fields["end_time"]),
+        f"SUMMARY:{_escape(fields['title'])}",
+        f"CATEGORIES:{_escape(event.category)}",
+    ]
+    if fields["location"]:
+        lines.append(f"LOCATION:{_escape(fields['location'])}")
+    if fields["notes"]:
+        lines.append(f"DESCRIPTION:{_escape(fields['notes'])}")
+    return lines + extra + ["END:VEVENT"]
+
+
+def _fingerprint(event: Event, exceptions: list[EventException]) -> tuple:
+    columns = Event.__table__.columns.keys()
+    overrides = tuple(
+        (exception.original_date, exception.is_cancelled, *(getattr(exception, name) for name in OVERRIDE_FIELDS))
+        for exception in exceptions
+    )
+    return tuple(getattr(event, name) for name in columns) + overrides
+
+
+def event_fragment(event: Event, exceptions: list[EventException]) -> str:
+    fingerprint = _fingerprint(event, exceptions)
+    cached = fragment_cache.get(event.id)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    extra = []
+    rule = _rrule(event)
+    if rule:
+        extra.append(f"RRULE:{rule}")
+        extra += [_timed("EXDATE", exception.original_date, event.start_time) for exception in exceptions if exception.is_cancelled]
+    base = {name: getattr(event, name) for name in OVERRIDE_FIELDS}
+    lines = _vevent(event, base, extra)
+    if rule:
+        for exception in exceptions:
+            if exception.is_cancelled:
+                continue
+            # A moved or edited repetition is its own VEVENT with the same UID and a RECURRENCE-ID.
+            fields = {**base, "date": exception.original_date}
+            fields.update((name, getattr(exception, name)) for name in OVERRIDE_FIELDS if getattr(exception, name) is not None)
+            lines += _vevent(event, fields, [_timed("RECURRENCE-ID", exception.original_date, event.start_time)])
+    fragment = "".join(_fold(line) for line in lines)
+    fragment_cache.set(event.id, (fingerprint, fragment))
+    return fragment
+
+
+def _header(name: str) -> str:
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:-//{ICS_UID_DOMAIN}//Agenda Docente//ES", "CALSCALE:GREGORIAN"]
+    lines.append(f"X-WR-CALNAME:{_escape(name)}")
+    if ICS_TIMEZONE:
+        lines.append(f"X-WR-TIMEZONE:{ICS_TIMEZONE}")
+    return "".join(_fold(line) for line in lines)
+
+
+def stream_calendar(owner_id: int, name: str):
+    # The request session is closed before the body is sent, so the stream reads through its own session.
+    db = ReadSessionLocal()
+    try:
+        with read_snapshot(db):
+            exceptions: dict[int, list[EventException]] = defaultdict(list)
+            for exception in (
+                db.query(EventException).filter(EventException.owner_id == owner_id).order_by(EventException.original_date)
+            ):
+                exceptions[exception.event_id].append(exception)
+
+            batch = [_header(name)]
+            events = db.query(Event).filter(Event.owner_id == owner_id).order_by(Event.id)
+            for event in events.yield_per(ICS_STREAM_BATCH_SIZE):
+                batch.append(event_fragment(event, exceptions.get(event.id, [])))
+                if len(batch) >= ICS_STREAM_BATCH_SIZE:
+                    yield "".join(batch).encode()
+                    batch = []
+            batch.append("END:VCALENDAR\r\n")
+            yield "".join(batch).encode()
+    finally:
+        db.close()
+
+
+@orm_event.listens_for(Event, "after_update")
+@orm_event.listens_for(Event, "after_delete")
+def _evict_changed_event(_mapper, _connection, target: Event) -> None:
+    fragment_cache.pop(target.id)
+
+
+@orm_event.listens_for(EventException, "after_insert")
+@orm_event.listens_for(EventException, "after_update")
+@orm_event.listens_for(EventException, "after_delete")
+def _evict_changed_exception(_mapper, _connection, target: EventException) -> None:
+    fragment_cache.pop(target.event_id)
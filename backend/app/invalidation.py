@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection
+
+from .changes import dispatch_changes
+from .database import IN_MEMORY, ReadSessionLocal
+from .models import CacheInvalidation, ChangeLog
+
+# How often each worker reads back the writes committed by the others; 0 turns polling off.
+INVALIDATION_POLL_SECONDS = float(os.getenv("INVALIDATION_POLL_SECONDS", "1"))
+INVALIDATION_BUS_ENABLED = INVALIDATION_POLL_SECONDS > 0 and not IN_MEMORY
+INVALIDATION_BATCH_SIZE = 5000
+INVALIDATION_RETENTION = timedelta(hours=1)
+
+logger = logging.getLogger(__name__)
+
+# topic -> callables receiving the owner id of each invalidation published under that topic
+topic_handlers: dict[str, list] = defaultdict(list)
+
+
+def on_invalidate(topic: str, handler) -> None:
+    topic_handlers[topic].append(handler)
+
+
+def publish(connection: Connection, owner_id: int, topic: str) -> None:
+    # For caches of data outside the change log. Written in the caller's transaction, so the other workers
+    # only hear about it once the change is committed.
+    connection.execute(delete(CacheInvalidation).where(CacheInvalidation.created_at < datetime.utcnow() - INVALIDATION_RETENTION))
+    connection.execute(insert(CacheInvalidation).values(owner_id=owner_id, topic=topic))
+
+
+class InvalidationBus:
+    # Every collection write already lands in change_log with an increasing seq, and SQLite commits writers
+    # one at a time, so reading past the last seen seq picks up each worker's writes in commit order.
+    # This worker's own writes come back too; evicting them a second time is harmless.
+    def __init__(self, session_factory=ReadSessionLocal, interval: float = INVALIDATION_POLL_SECONDS):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.polls = 0
+        self.received = 0
+        self._change_seq = 0
+        self._topic_seq = 0
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._change_seq, self._topic_seq = await loop.run_in_executor(None, self._latest)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {"polls": self.polls, "received": self.received, "change_seq": self._change_seq}
+
+    def _latest(self) -> tuple[int, int]:
+        db = self.session_factory()
+        try:
+            return db.scalar(select(func.max(ChangeLog.seq))) or 0, db.scalar(select(func.max(CacheInvalidation.seq))) or 0
+        finally:
+            db.close()
+
+    def poll(self) -> int:
+        db = self.session_factory()
+        try:
+            changes = db.execute(
+                select(ChangeLog.seq, ChangeLog.owner_id, ChangeLog.collection, ChangeLog.row_id, ChangeLog.deleted)
+                .where(ChangeLog.seq > self._change_seq)
+                .order_by(ChangeLog.seq)
+                .limit(INVALIDATION_BATCH_SIZE)
+            ).all()
+            topics = db.execute(
+                select(CacheInvalidation.seq, CacheInvalidation.owner_id, CacheInvalidation.topic)
+                .where(CacheInvalidation.seq > self._topic_seq)
+                .order_by(CacheInvalidation.seq)
+                .limit(INVALIDATION_BATCH_SIZE)
+            ).all()
+        finally:
+            db.close()
+
+        if changes:
+            dispatch_changes([(row.owner_id, row.collection, row.row_id, row.deleted) for row in changes])
+            self._change_seq = changes[-1].seq
+        for row in topics:
+            for handler in topic_handlers.get(row.topic, ()):
+                handler(row.owner_id)
+        if topics:
+            self._topic_seq = topics[-1].seq
+        self.polls += 1
+        self.received += len(changes) + len(topics)
+        return max(len(changes), len(topics))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # A full batch means there is more to catch up on, so poll again straight away.
+                if await loop.run_in_executor(None, self.poll) >= INVALIDATION_BATCH_SIZE:
+                    continue
+            except Exception:
+                logger.exception("Cache invalidation poll failed")
+            await asyncio.sleep(self.interval)
+
+
+invalidation_bus = InvalidationBus()
@@ -1,12 +1,47 @@
-from fastapi import FastAPI
+import hmac
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import Base, engine
-from .routers import auth, events, pedagogical, reminders, students, tasks
+from .auth import hashing_pool, principal_cache
+from .changes import collection_versions
+from .conditional import ETAG_HEADER
+from .conflicts import index_cache
+from .database import ASYNC_MODE, async_engine, engine, lock_waits, read_engine
+from .digest import digest_cache
+from .ics import fragment_cache
+from .invalidation import INVALIDATION_BUS_ENABLED, invalidation_bus
+from .metrics import METRICS_TOKEN, PROMETHEUS_MEDIA_TYPE, MetricsMiddleware, instrument_engine, metrics
+from .migrations import ensure_schema
+from .pagination import NEXT_CURSOR_HEADER
+from .recurrence import expansion_cache
+from .routers import auth, bootstrap, events, ics, pedagogical, reminders, search, students, sync, tasks
+from .scheduler import REMINDER_SCHEDULER_ENABLED, reminder_scheduler
+
+ensure_schema()
+
+instrumented = {engine, read_engine}
+if async_engine is not None:
+    instrumented.add(async_engine.sync_engine)
+for target in instrumented:
+    instrument_engine(target)
+
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    if INVALIDATION_BUS_ENABLED:
+        await invalidation_bus.start()
+    if REMINDER_SCHEDULER_ENABLED:
+        await reminder_scheduler.start()
+    yield
+    await reminder_scheduler.stop()
+    await invalidation_bus.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
 
-app = FastAPI(title="Agenda Docente API")
+
+app = FastAPI(title="Agenda Docente API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,16 +49,85 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER],
 )
+app.add_middleware(MetricsMiddleware)
 
+if ASYNC_MODE:
+    # Registered first so these async read routes win over their sync twins.
+    app.include_router(events.async_router)
+    app.include_router(tasks.async_router)
+    app.include_router(students.async_router)
 app.include_router(auth.router)
+app.include_router(ics.router)
 app.include_router(events.router)
 app.include_router(tasks.router)
 app.include_router(reminders.router)
 app.include_router(students.router)
 app.include_router(pedagogical.router)
+app.include_router(bootstrap.router)
+app.include_router(search.router)
+app.include_router(sync.router)
 
 
 @app.get("/api/health")
 def healthcheck():
-    return {"status": "ok"}
+    return {"status": "ok", "lock_waits": lock_waits.stats()}
+
+
+@metrics.collector
+def _cache_metrics():
+    caches = {
+        "principals": principal_cache,
+        "collection_versions": collection_versions,
+        "recurrence": expansion_cache,
+        "digests": digest_cache,
+        "ics_fragments": fragment_cache,
+        "conflict_index": index_cache,
+    }
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    return [
+        (name, kind, help_text, [({"cache": cache}, values[field]) for cache, values in stats.items()])
+        for name, kind, help_text, field in (
+            ("cache_entries", "gauge", "Entries held by each in-process cache.", "size"),
+            ("cache_hits_total", "counter", "Cache lookups that found a live entry.", "hits"),
+            ("cache_misses_total", "counter", "Cache lookups that found nothing or an expired entry.", "misses"),
+            ("cache_evictions_total", "counter", "Entries dropped because a cache was full.", "evictions"),
+        )
+    ]
+
+
+@metrics.collector
+def _runtime_metrics():
+    hashing = hashing_pool.stats()
+    scheduler = reminder_scheduler.stats()
+    waits = lock_waits.stats()
+    bus = invalidation_bus.stats()
+    return [
+        ("password_hashing_queue_depth", "gauge", "Password hashes waiting for a worker.", [({}, hashing["queue_depth"])]),
+        ("password_hashing_running", "gauge", "Password hashes being computed.", [({}, hashing["running"])]),
+        ("password_hashing_completed_total", "counter", "Password hashes computed.", [({}, hashing["completed"])]),
+        ("password_hashing_rejected_total", "counter", "Password hashes rejected by a full queue.", [({}, hashing["rejected"])]),
+        ("reminders_scheduler_leader", "gauge", "Whether this worker fires the reminders.", [({}, int(scheduler["leader"]))]),
+        ("reminders_scheduled", "gauge", "Reminders waiting to fire.", [({}, scheduler["scheduled"])]),
+        ("reminders_fired_total", "counter", "Reminders dispatched.", [({}, scheduler["fired"])]),
+        ("reminders_failed_total", "counter", "Reminders whose dispatch failed.", [({}, scheduler["failed"])]),
+        ("sqlite_write_lock_waits_total", "counter", "Write transactions begun.", [({}, waits["count"])]),
+        ("sqlite_write_lock_wait_seconds_total", "counter", "Time spent waiting for the write lock.", [({}, waits["total_ms"] / 1000)]),
+        ("sqlite_write_lock_slow_waits_total", "counter", "Write lock waits over LOCK_WAIT_WARN_MS.", [({}, waits["slow"])]),
+        ("cache_invalidation_polls_total", "counter", "Reads of the changes committed by any worker.", [({}, bus["polls"])]),
+        ("cache_invalidations_received_total", "counter", "Changes read back and evicted from the local caches.", [({}, bus["received"])]),
+    ]
+
+
+# Async so that the scheduler stats are read on the event loop that owns them.
+async def metrics_endpoint(request: Request):
+    # Compared as bytes: compare_digest rejects str with non-ASCII characters.
+    if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+# Per-route traffic and latency are not for the public, so the endpoint only exists once a token is set.
+if METRICS_TOKEN:
+    app.add_api_route("/api/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
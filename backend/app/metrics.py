@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+from .query_budget import (
+    DEFAULT_QUERY_BUDGET,
+    SERVER_TIMING_ENABLED,
+    SERVER_TIMING_HEADER,
+    SLOW_QUERY_MS,
+    budget_for,
+    check_budget,
+    log_slow_query,
+    report_over_budget,
+    server_timing,
+)
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Requests that match no route share one label so scanners cannot grow the series without bound.
+UNMATCHED_ROUTE = "<unmatched>"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+SQL_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+@dataclass
+class RequestStats:
+    route: tuple = ()
+    budget: int = DEFAULT_QUERY_BUDGET
+    queries: int = 0
+    sql_seconds: float = 0.0
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations: dict[tuple, Histogram] = {}
+        self._sizes: dict[tuple, Histogram] = {}
+        self._queries: dict[tuple, Histogram] = {}
+        self._sql_time: dict[tuple, Histogram] = {}
+        self._statuses: dict[tuple, int] = defaultdict(int)
+        self._in_progress: dict[tuple, int] = defaultdict(int)
+        self._over_budget: dict[tuple, int] = defaultdict(int)
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self._collectors: list = []
+
+    def request_started(self, key: tuple) -> None:
+        with self._lock:
+            self._in_progress[key] += 1
+
+    def request_finished(self, key: tuple, status: int, seconds: float, size: int, stats: RequestStats) -> None:
+        with self._lock:
+            self._in_progress[key] -= 1
+            self._statuses[(*key, str(status))] += 1
+            if stats.queries > stats.budget:
+                self._over_budget[key] += 1
+            for series, buckets, value in (
+                (self._durations, LATENCY_BUCKETS, seconds),
+                (self._sizes, SIZE_BUCKETS, size),
+                (self._queries, QUERY_COUNT_BUCKETS, stats.queries),
+                (self._sql_time, SQL_TIME_BUCKETS, stats.sql_seconds),
+            ):
+                histogram = series.get(key)
+                if histogram is None:
+                    histogram = series[key] = Histogram(buckets)
+                histogram.observe(value)
+
+    def query_finished(self, seconds: float) -> None:
+        with self._lock:
+            self.sql_queries += 1
+            self.sql_seconds += seconds
+
+    def collector(self, function):
+        # A collector returns (name, type, help, [(labels dict, value), ...]) tuples when scraped.
+        self._collectors.append(function)
+        return function
+
+    def render(self) -> str:
+        lines: list[str] = []
+        route_labels = ("method", "route")
+        with self._lock:
+            for name, help_text, series in (
+                ("http_request_duration_seconds", "Request latency by route template.", self._durations),
+                ("http_response_size_bytes", "Response body size by route template.", self._sizes),
+                ("http_request_sql_queries", "SQL statements executed per request.", self._queries),
+                ("http_request_sql_seconds", "Time spent in SQL per request.", self._sql_time),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                        cumulative += count
+                        le = f'le="{bound}"'
+                        lines.append(f"{name}_bucket{_labels(route_labels, key, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(route_labels, key)} {_number(histogram.sum)}")
+                    lines.append(f"{name}_count{_labels(route_labels, key)} {histogram.count}")
+
+            lines += ["# HELP http_requests_total Responses by route template and status code.", "# TYPE http_requests_total counter"]
+            for key, count in sorted(self._statuses.items()):
+                lines.append(f"http_requests_total{_labels((*route_labels, 'status'), key)} {count}")
+            lines += ["# HELP http_requests_in_progress Requests being served.", "# TYPE http_requests_in_progress gauge"]
+            for key, count in sorted(self._in_progress.items()):
+                lines.append(f"http_requests_in_progress{_labels(route_labels, key)} {count}")
+            lines += [
+                "# HELP http_request_query_budget_exceeded_total Requests that ran more SQL statements than their budget.",
+                "# TYPE http_request_query_budget_exceeded_total counter",
+            ]
+            for key, count in sorted(self._over_budget.items()):
+                lines.append(f"http_request_query_budget_exceeded_total{_labels(route_labels, key)} {count}")
+            lines += [
+                "# HELP sql_queries_total SQL statements executed.",
+                "# TYPE sql_queries_total counter",
+                f"sql_queries_total {self.sql_queries}",
+                "# HELP sql_query_seconds_total Time spent executing SQL.",
+                "# TYPE sql_query_seconds_total counter",
+                f"sql_query_seconds_total {_number(self.sql_seconds)}",
+            ]
+            collectors = list(self._collectors)
+
+        for collector in collectors:
+            for name, kind, help_text, samples in collector():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def route_template(scope) -> str:
+    partial = None
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope["method"], route_template(scope))
+        stats = RequestStats(route=key, budget=budget_for(*key))
+        token = current_request.set(stats)
+        status = 500
+        size = 0
+
+        async def send_and_measure(message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    timing = server_timing(stats.queries, stats.sql_seconds, time.perf_counter() - started)
+                    message["headers"] = [*message.get("headers", []), (SERVER_TIMING_HEADER.encode(), timing.encode())]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        metrics.request_started(key)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            metrics.request_finished(key, status, time.perf_counter() - started, size, stats)
+            if stats.queries > stats.budget:
+                report_over_budget(key, stats.queries, stats.budget)
+            current_request.reset(token)
+
+
+def instrument_engine(engine: Engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(_connection, _cursor, _statement, _parameters, context, _executemany) -> None:
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(connection, _cursor, statement, parameters, context, _executemany) -> None:
+        elapsed = time.perf_counter() - context._metrics_started
+        metrics.query_finished(elapsed)
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            log_slow_query(connection, statement, parameters, elapsed)
+        # Sync routes run in the threadpool with a copy of the request context, so the counters are shared.
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+            check_budget(stats.route, stats.queries, stats.budget, statement)
@@ -0,0 +1,127 @@
+import argparse
+import logging
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from sqlalchemy import func, insert, inspect, select
+from sqlalchemy.engine import Connection, Engine
+
+from .attendance import init_attendance_key
+from .changes import init_change_log
+from .database import Base, engine, read_engine
+from .models import Attendance, CacheInvalidation, DailyContent, Event, Observation, Planning, SchemaVersion
+from .rollups import init_rollups
+from .search import init_search_index
+
+# Workers apply pending migrations as they start unless this is turned off; deployments that run
+# `python -m app.migrations upgrade` as a separate step turn it off so workers only check the version.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaOutdated(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+def _create_tables(connection: Connection) -> None:
+    Base.metadata.create_all(connection)
+
+
+def _owner_date_indexes(connection: Connection) -> None:
+    # The list routes filter on the owner and range or sort on the date, newest first.
+    names = {
+        "ix_events_owner_date",
+        "ix_attendance_owner_date",
+        "ix_observations_owner_date",
+        "ix_plannings_owner_week",
+        "ix_daily_contents_owner_date",
+    }
+    for model in (Event, Attendance, Observation, Planning, DailyContent):
+        for index in model.__table__.indexes:
+            if index.name in names:
+                index.create(connection, checkfirst=True)
+
+
+def _cache_invalidations(connection: Connection) -> None:
+    CacheInvalidation.__table__.create(connection, checkfirst=True)
+
+
+# Append only. A new database runs every step after create_all has already built the current models,
+# so each step has to cope with finding its change in place.
+MIGRATIONS = [
+    Migration(1, "create tables", _create_tables),
+    Migration(2, "full-text search index and triggers", init_search_index),
+    Migration(3, "change log", init_change_log),
+    Migration(4, "one attendance row per student and day", init_attendance_key),
+    Migration(5, "attendance rollups", init_rollups),
+    Migration(6, "owner and date indexes", _owner_date_indexes),
+    Migration(7, "cache invalidation topics", _cache_invalidations),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(connection: Connection) -> int:
+    if not inspect(connection).has_table(SchemaVersion.__tablename__):
+        return 0
+    return connection.scalar(select(func.max(SchemaVersion.version))) or 0
+
+
+def migrate(target: Engine = engine) -> list[Migration]:
+    applied = []
+    for migration in MIGRATIONS:
+        # Each step re-reads the version inside its own write transaction, so workers starting together
+        # apply it once.
+        with target.begin() as connection:
+            SchemaVersion.__table__.create(connection, checkfirst=True)
+            if current_version(connection) >= migration.version:
+                continue
+            migration.apply(connection)
+            connection.execute(insert(SchemaVersion).values(version=migration.version, name=migration.name))
+        logger.info("Applied migration %d: %s", migration.version, migration.name)
+        applied.append(migration)
+    return applied
+
+
+def ensure_schema() -> int:
+    with read_engine.connect() as connection:
+        version = current_version(connection)
+    if version >= LATEST_VERSION:
+        return version
+    if not AUTO_MIGRATE:
+        raise SchemaOutdated(
+            f"Database schema is at version {version} but this build needs {LATEST_VERSION}; run `python -m app.migrations upgrade`"
+        )
+    migrate(engine)
+    return LATEST_VERSION
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Apply or inspect the database schema migrations.")
+    parser.add_argument("command", choices=["upgrade", "current", "history"])
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        for migration in migrate(engine):
+            print(f"Applied {migration.version}: {migration.name}")
+        print(f"Schema is at version {LATEST_VERSION}")
+        return
+    with engine.connect() as connection:
+        version = current_version(connection)
+    if args.command == "current":
+        print(f"Schema is at version {version} (latest {LATEST_VERSION})")
+        return
+    for migration in MIGRATIONS:
+        print(f"{'*' if migration.version <= version else ' '} {migration.version}: {migration.name}")
+
+
+if __name__ == "__main__":
+    main()
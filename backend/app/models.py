@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Integer, String, Text, Time
+from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Index, Integer, String, Text, Time, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
@@ -16,6 +16,7 @@ class User(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     events = relationship("Event", back_populates="owner", cascade="all,delete")
+    event_exceptions = relationship("EventException", back_populates="owner", cascade="all,delete")
     tasks = relationship("Task", back_populates="owner", cascade="all,delete")
     reminders = relationship("Reminder", back_populates="owner", cascade="all,delete")
     students = relationship("Student", back_populates="owner", cascade="all,delete")
@@ -27,6 +28,7 @@ class User(Base):
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (Index("ix_events_owner_date", "owner_id", "date"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
@@ -44,6 +46,36 @@ class Event(Base):
 
     owner = relationship("User", back_populates="events")
     tasks = relationship("Task", back_populates="event")
+    exceptions = relationship("EventException", back_populates="event", cascade="all,delete")
+
+
+class EventException(Base):
+    __tablename__ = "event_exceptions"
+    __table_args__ = (UniqueConstraint("event_id", "original_date", name="uq_event_exceptions_event_date"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    event_id: Mapped[int] = mapped_column(ForeignKey("events.id"), nullable=False, index=True)
+    original_date: Mapped[Date] = mapped_column(Date, nullable=False)
+    is_cancelled: Mapped[bool] = mapped_column(Boolean, default=False)
+    title: Mapped[str | None] = mapped_column(String(255))
+    date: Mapped[Date | None] = mapped_column(Date)
+    start_time: Mapped[Time | None] = mapped_column(Time)
+    end_time: Mapped[Time | None] = mapped_column(Time)
+    location: Mapped[str | None] = mapped_column(String(255))
+    notes: Mapped[str | None] = mapped_column(Text)
+
+    owner = relationship("User", back_populates="event_exceptions")
+    event = relationship("Event", back_populates="exceptions")
+
+
+class CalendarFeed(Base):
+    __tablename__ = "calendar_feeds"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, unique=True)
+    token: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 
 class Task(Base):
@@ -96,6 +128,7 @@ class Student(Base):
 
 class Observation(Base):
     __tablename__ = "observations"
+    __table_args__ = (Index("ix_observations_owner_date", "owner_id", "date"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
@@ -111,6 +144,10 @@ class Observation(Base):
 
 class Attendance(Base):
     __tablename__ = "attendance"
+    __table_args__ = (
+        Index("uq_attendance_student_date", "student_id", "date", unique=True),
+        Index("ix_attendance_owner_date", "owner_id", "date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
@@ -122,8 +159,21 @@ class Attendance(Base):
     student = relationship("Student", back_populates="attendance_records")
 
 
+class AttendanceRollup(Base):
+    __tablename__ = "attendance_rollups"
+    __table_args__ = (UniqueConstraint("student_id", "month", "status", name="uq_attendance_rollup"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    student_id: Mapped[int] = mapped_column(ForeignKey("students.id"), nullable=False)
+    month: Mapped[str] = mapped_column(String(7), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 class Planning(Base):
     __tablename__ = "plannings"
+    __table_args__ = (Index("ix_plannings_owner_week", "owner_id", "week_start"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
@@ -136,6 +186,7 @@ class Planning(Base):
 
 class DailyContent(Base):
     __tablename__ = "daily_contents"
+    __table_args__ = (Index("ix_daily_contents_owner_date", "owner_id", "date"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
@@ -146,3 +197,39 @@ class DailyContent(Base):
 
     owner = relationship("User", back_populates="daily_contents")
     student = relationship("Student", back_populates="daily_contents")
+
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "collection", "row_id", name="uq_change_log_row"),
+        Index("ix_change_log_owner_seq", "owner_id", "seq"),
+        Index("ix_change_log_owner_collection_seq", "owner_id", "collection", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    collection: Mapped[str] = mapped_column(String(30), nullable=False)
+    row_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted: Mapped[bool] = mapped_column(Boolean, default=False)
+    changed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class CacheInvalidation(Base):
+    __tablename__ = "cache_invalidations"
+    # AUTOINCREMENT so pruned sequence numbers are never handed out again.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    owner_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    topic: Mapped[str] = mapped_column(String(30), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(120), nullable=False)
+    applied_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
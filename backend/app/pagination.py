@@ -0,0 +1,200 @@
+import base64
+import binascii
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, time
+
+from fastapi import HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import AsyncSessionLocal, ReadSessionLocal
+from .serialization import FastJSONResponse, fast_columns, ndjson_line, row_dicts, select_columns
+
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# A sort key is (column, descending); the last key must be unique, usually the primary key.
+SortKeys = list[tuple]
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([value.isoformat() if isinstance(value, (date, time)) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: SortKeys) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError("cursor does not match the sort keys")
+        decoded = []
+        for (column, _descending), value in zip(keys, values):
+            python_type = column.type.python_type
+            if python_type in (date, time):
+                value = python_type.fromisoformat(value)
+            elif not isinstance(value, python_type):
+                raise ValueError("cursor value has the wrong type")
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def after_cursor(keys: SortKeys, values: list):
+    clauses = []
+    for index, (column, descending) in enumerate(keys):
+        ties = [previous == values[position] for position, (previous, _) in enumerate(keys[:index])]
+        clauses.append(and_(*ties, column < values[index] if descending else column > values[index]))
+    return or_(*clauses)
+
+
+def order_by_keys(query, keys: SortKeys):
+    return query.order_by(*(column.desc() if descending else column.asc() for column, descending in keys))
+
+
+def _trim(rows: list, keys: SortKeys, limit: int) -> tuple[list, str | None]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([getattr(rows[-1], column.key) for column, _ in keys])
+
+
+def fetch_page(query, keys: SortKeys, limit: int, cursor: str | None = None) -> tuple[list, str | None]:
+    query = order_by_keys(query, keys)
+    if cursor:
+        query = query.filter(after_cursor(keys, decode_cursor(cursor, keys)))
+    return _trim(query.limit(limit + 1).all(), keys, limit)
+
+
+@dataclass
+class Window:
+    limit: int
+    cursor: str | None = None
+    start: date | None = None
+    end: date | None = None
+
+    def apply(self, query, column):
+        if self.start:
+            query = query.filter(column >= self.start)
+        if self.end:
+            query = query.filter(column <= self.end)
+        return query
+
+
+def window_params(prefix: str, default_limit: int):
+    # Query parameters <prefix>_limit, <prefix>_cursor, <prefix>_start and <prefix>_end for one section of a response.
+    def dependency(
+        limit: int = Query(default=default_limit, ge=1, le=MAX_PAGE_SIZE, alias=f"{prefix}_limit"),
+        cursor: str | None = Query(default=None, alias=f"{prefix}_cursor"),
+        start: date | None = Query(default=None, alias=f"{prefix}_start"),
+        end: date | None = Query(default=None, alias=f"{prefix}_end"),
+    ) -> Window:
+        return Window(limit=limit, cursor=cursor, start=start, end=end)
+
+    return dependency
+
+
+class Page:
+    def __init__(
+        self,
+        request: Request,
+        response: Response,
+        limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = None,
+    ):
+        self.response = response
+        self.limit = limit
+        self.cursor = cursor
+        self.stream = NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+    def _columns(self, query, keys: SortKeys, schema: type[BaseModel], fast: bool) -> tuple | None:
+        # With `fast`, rows are selected as plain tuples and encoded by orjson instead of through `schema`.
+        columns = fast_columns(query, schema) if fast else None
+        if columns is None or not {column.key for column, _ in keys} <= {column.key for column in columns}:
+            return None
+        return columns
+
+    def _rows(self, rows: list, columns: tuple | None):
+        if columns is None:
+            return rows
+        return FastJSONResponse(row_dicts(rows, columns), headers=dict(self.response.headers))
+
+    def respond(self, query, keys: SortKeys, schema: type[BaseModel], fast: bool = False):
+        columns = self._columns(query, keys, schema, fast)
+        if columns:
+            query = select_columns(query, columns)
+        if self.limit is not None and not self.stream:
+            rows, next_cursor = fetch_page(query, keys, self.limit, self.cursor)
+            if next_cursor:
+                self.response.headers[NEXT_CURSOR_HEADER] = next_cursor
+            return self._rows(rows, columns)
+
+        query = order_by_keys(query, keys)
+        if self.cursor:
+            query = query.filter(after_cursor(keys, decode_cursor(self.cursor, keys)))
+        if not self.stream:
+            return self._rows(query.all(), columns)
+        if self.limit:
+            query = query.limit(self.limit)
+        return StreamingResponse(
+            _stream_rows(query.statement, schema, columns), media_type=NDJSON_MEDIA_TYPE, headers=dict(self.response.headers)
+        )
+
+    async def respond_async(self, db: AsyncSession, statement, keys: SortKeys, schema: type[BaseModel], fast: bool = False):
+        columns = self._columns(statement, keys, schema, fast)
+        if columns:
+            statement = select_columns(statement, columns)
+        statement = order_by_keys(statement, keys)
+        if self.cursor:
+            statement = statement.filter(after_cursor(keys, decode_cursor(self.cursor, keys)))
+        if self.stream:
+            if self.limit:
+                statement = statement.limit(self.limit)
+            return StreamingResponse(
+                _stream_rows_async(statement, schema, columns),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers=dict(self.response.headers),
+            )
+        fetch = db.execute if columns else db.scalars
+        if self.limit is None:
+            return self._rows((await fetch(statement)).all(), columns)
+        rows, next_cursor = _trim((await fetch(statement.limit(self.limit + 1))).all(), keys, self.limit)
+        if next_cursor:
+            self.response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return self._rows(rows, columns)
+
+
+def _stream_rows(statement, schema: type[BaseModel], columns: tuple | None = None):
+    # The request session is closed before the body is sent, so the stream reads through its own session.
+    db = ReadSessionLocal()
+    statement = statement.execution_options(yield_per=STREAM_BATCH_SIZE)
+    try:
+        if columns is None:
+            for row in db.scalars(statement):
+                yield schema.model_validate(row).model_dump_json() + "\n"
+        else:
+            names = [column.key for column in columns]
+            # One chunk per batch: every chunk of a sync generator costs a trip through the threadpool.
+            for rows in db.execute(statement).partitions():
+                yield b"".join(ndjson_line(names, row) for row in rows)
+    finally:
+        db.close()
+
+
+async def _stream_rows_async(statement, schema: type[BaseModel], columns: tuple | None = None):
+    statement = statement.execution_options(yield_per=STREAM_BATCH_SIZE)
+    async with AsyncSessionLocal() as db:
+        if columns is None:
+            async for row in await db.stream_scalars(statement):
+                yield schema.model_validate(row).model_dump_json() + "\n"
+        else:
+            names = [column.key for column in columns]
+            async for rows in (await db.stream(statement)).partitions():
+                yield b"".join(ndjson_line(names, row) for row in rows)
@@ -0,0 +1,104 @@
+import logging
+import os
+
+from sqlalchemy.engine import Connection
+
+# Budgets count every statement a request runs, the principal and collection-version lookups included.
+DEFAULT_QUERY_BUDGET = int(os.getenv("DEFAULT_QUERY_BUDGET", "20"))
+# Strict mode (for the test suite and CI) turns an over-budget statement into an error instead of a warning.
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "false").lower() == "true"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+# Longest parameter repr written with a slow query; they can hold students' names and notes.
+SLOW_QUERY_PARAMETERS_CHARS = 500
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+SERVER_TIMING_HEADER = "Server-Timing"
+
+QUERY_BUDGETS = {
+    "GET /api/events": 4,
+    "GET /api/events/occurrences": 5,
+    "GET /api/events/calendar": 5,
+    "GET /api/events/conflicts": 5,
+    "GET /api/events/free-slots": 5,
+    "GET /api/tasks": 4,
+    "GET /api/students": 4,
+    "GET /api/students/{student_id}": 3,
+    "GET /api/reminders": 4,
+    "GET /api/pedagogical/observations": 4,
+    "GET /api/pedagogical/attendance": 4,
+    "GET /api/pedagogical/plannings": 4,
+    "GET /api/pedagogical/contents": 4,
+    "GET /api/search": 8,
+    "GET /api/sync": 12,
+    "GET /api/bootstrap": 16,
+}
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def budget_for(method: str, route: str) -> int:
+    return QUERY_BUDGETS.get(f"{method} {route}", DEFAULT_QUERY_BUDGET)
+
+
+def check_budget(route_key: tuple, queries: int, budget: int, statement: str) -> None:
+    if QUERY_BUDGET_STRICT and queries > budget:
+        method, route = route_key
+        raise QueryBudgetExceeded(f"{method} {route} ran {queries} queries (budget {budget}); last statement: {statement}")
+
+
+def report_over_budget(route_key: tuple, queries: int, budget: int) -> None:
+    method, route = route_key
+    logger.warning("%s %s ran %d queries, over its budget of %d", method, route, queries, budget)
+
+
+def _first_row(parameters):
+    # An executemany passes a list with one entry per row.
+    if isinstance(parameters, list):
+        return parameters[0] if parameters else ()
+    return parameters
+
+
+def _describe_parameters(parameters) -> str:
+    text = repr(_first_row(parameters))
+    if len(text) > SLOW_QUERY_PARAMETERS_CHARS:
+        text = text[:SLOW_QUERY_PARAMETERS_CHARS] + "..."
+    if isinstance(parameters, list) and len(parameters) > 1:
+        text += f" (+{len(parameters) - 1} more rows)"
+    return text
+
+
+def _explain(connection: Connection, statement: str, parameters) -> list[str]:
+    if connection.dialect.name != "sqlite":
+        return []
+    parameters = _first_row(parameters)
+    # A raw cursor keeps the EXPLAIN out of the cursor events, so it is not logged or counted itself.
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def log_slow_query(connection: Connection, statement: str, parameters, seconds: float) -> None:
+    plan: list[str] = []
+    if SLOW_QUERY_EXPLAIN:
+        try:
+            plan = _explain(connection, statement, parameters)
+        except Exception:
+            logger.debug("Could not explain slow query", exc_info=True)
+    logger.warning(
+        "Slow query (%.1f ms): %s\nparameters: %s\nplan:\n  %s",
+        seconds * 1000,
+        statement,
+        _describe_parameters(parameters),
+        "\n  ".join(plan) or "(unavailable)",
+    )
+
+
+def server_timing(queries: int, sql_seconds: float, elapsed_seconds: float) -> str:
+    return f'db;dur={sql_seconds * 1000:.1f};desc="{queries} queries", app;dur={elapsed_seconds * 1000:.1f}'
@@ -0,0 +1,323 @@
+import calendar
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event as orm_event
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .cache import TTLCache
+from .models import Event, EventException
+
+RECURRENCE_CACHE_SIZE = int(os.getenv("RECURRENCE_CACHE_SIZE", "4096"))
+RECURRENCE_CACHE_TTL_SECONDS = int(os.getenv("RECURRENCE_CACHE_TTL_SECONDS", "3600"))
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+PRESETS = {"daily": "DAILY", "weekly": "WEEKLY", "monthly": "MONTHLY", "yearly": "YEARLY"}
+OVERRIDE_FIELDS = ("title", "date", "start_time", "end_time", "location", "notes")
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+
+expansion_cache = TTLCache(maxsize=RECURRENCE_CACHE_SIZE, ttl=RECURRENCE_CACHE_TTL_SECONDS)
+
+
+class InvalidRecurrenceRule(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    freq: str
+    interval: int = 1
+    count: int | None = None
+    until: date | None = None
+    byday: tuple[tuple[int | None, int], ...] = ()
+    bymonthday: tuple[int, ...] = ()
+
+
+def _parse_until(value: str) -> date:
+    for fmt in ("%Y%m%d", "%Y%m%dT%H%M%SZ", "%Y%m%dT%H%M%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise InvalidRecurrenceRule(f"Invalid UNTIL value: {value}")
+
+
+def _parse_byday(value: str) -> tuple[int | None, int]:
+    code = value[-2:].upper()
+    if code not in WEEKDAYS:
+        raise InvalidRecurrenceRule(f"Invalid BYDAY value: {value}")
+    ordinal = value[:-2]
+    if not ordinal:
+        return None, WEEKDAYS[code]
+    try:
+        nth = int(ordinal)
+    except ValueError as exc:
+        raise InvalidRecurrenceRule(f"Invalid BYDAY value: {value}") from exc
+    if nth == 0 or abs(nth) > 5:
+        raise InvalidRecurrenceRule(f"Invalid BYDAY value: {value}")
+    return nth, WEEKDAYS[code]
+
+
+def parse_rule(recurrence: str | None, recurrence_rule: str | None) -> RecurrenceRule | None:
+    if not recurrence_rule:
+        freq = PRESETS.get((recurrence or "").lower())
+        return RecurrenceRule(freq=freq) if freq else None
+
+    text = recurrence_rule.strip()
+    if text.upper().startswith("RRULE:"):
+        text = text[6:]
+    parts: dict[str, str] = {}
+    for item in text.split(";"):
+        if not item.strip():
+            continue
+        key, sep, value = item.partition("=")
+        if not sep or not value:
+            raise InvalidRecurrenceRule(f"Invalid rule part: {item}")
+        parts[key.strip().upper()] = value.strip()
+
+    freq = parts.get("FREQ", "").upper()
+    if freq not in FREQUENCIES:
+        raise InvalidRecurrenceRule("FREQ must be one of DAILY, WEEKLY, MONTHLY or YEARLY")
+    try:
+        interval = int(parts.get("INTERVAL", "1"))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+        bymonthday = tuple(int(day) for day in parts["BYMONTHDAY"].split(",")) if "BYMONTHDAY" in parts else ()
+    except ValueError as exc:
+        raise InvalidRecurrenceRule("INTERVAL, COUNT and BYMONTHDAY must be integers") from exc
+    if interval < 1 or (count is not None and count < 1):
+        raise InvalidRecurrenceRule("INTERVAL and COUNT must be positive")
+    if any(day == 0 or abs(day) > 31 for day in bymonthday):
+        raise InvalidRecurrenceRule("BYMONTHDAY values must be between 1 and 31")
+    byday = tuple(_parse_byday(day.strip()) for day in parts["BYDAY"].split(",")) if "BYDAY" in parts else ()
+    if any(nth is not None for nth, _ in byday) and freq != "MONTHLY":
+        raise InvalidRecurrenceRule("Ordinal BYDAY values are only supported with FREQ=MONTHLY")
+    until = _parse_until(parts["UNTIL"]) if "UNTIL" in parts else None
+    return RecurrenceRule(freq=freq, interval=interval, count=count, until=until, byday=byday, bymonthday=bymonthday)
+
+
+def _add_months(day: date, months: int) -> tuple[int, int]:
+    index = day.year * 12 + day.month - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def _period_start(rule: RecurrenceRule, dtstart: date, k: int) -> date:
+    step = k * rule.interval
+    if rule.freq == "DAILY":
+        return dtstart + timedelta(days=step)
+    if rule.freq == "WEEKLY":
+        return dtstart - timedelta(days=dtstart.weekday()) + timedelta(weeks=step)
+    if rule.freq == "MONTHLY":
+        year, month = _add_months(dtstart, step)
+        return date(year, month, 1)
+    return date(dtstart.year + step, 1, 1)
+
+
+def _month_candidates(rule: RecurrenceRule, dtstart: date, year: int, month: int) -> list[date]:
+    last_day = calendar.monthrange(year, month)[1]
+    days: set[int] = set()
+    if rule.bymonthday:
+        for day in rule.bymonthday:
+            resolved = day if day > 0 else last_day + day + 1
+            if 1 <= resolved <= last_day:
+                days.add(resolved)
+    elif rule.byday:
+        for nth, weekday in rule.byday:
+            matches = [day for day in range(1, last_day + 1) if date(year, month, day).weekday() == weekday]
+            if nth is None:
+                days.update(matches)
+            elif abs(nth) <= len(matches):
+                days.add(matches[nth - 1] if nth > 0 else matches[nth])
+    elif dtstart.day <= last_day:
+        days.add(dtstart.day)
+    return [date(year, month, day) for day in sorted(days)]
+
+
+def _candidates(rule: RecurrenceRule, dtstart: date, period: date) -> list[date]:
+    if rule.freq == "DAILY":
+        if rule.byday and period.weekday() not in {weekday for _, weekday in rule.byday}:
+            return []
+        return [period]
+    if rule.freq == "WEEKLY":
+        weekdays = sorted({weekday for _, weekday in rule.byday}) if rule.byday else [dtstart.weekday()]
+        return [period + timedelta(days=weekday) for weekday in weekdays]
+    if rule.freq == "MONTHLY":
+        return _month_candidates(rule, dtstart, period.year, period.month)
+    if dtstart.month == 2 and dtstart.day == 29 and not calendar.isleap(period.year):
+        return []
+    return [date(period.year, dtstart.month, dtstart.day)]
+
+
+def _first_period(rule: RecurrenceRule, dtstart: date, window_start: date) -> int:
+    if window_start <= dtstart:
+        return 0
+    if rule.freq == "DAILY":
+        elapsed = (window_start - dtstart).days
+    elif rule.freq == "WEEKLY":
+        elapsed = (window_start - _period_start(rule, dtstart, 0)).days // 7
+    elif rule.freq == "MONTHLY":
+        elapsed = (window_start.year - dtstart.year) * 12 + window_start.month - dtstart.month
+    else:
+        elapsed = window_start.year - dtstart.year
+    return elapsed // rule.interval
+
+
+def _emitted_before(rule: RecurrenceRule, dtstart: date, k: int) -> int:
+    if k == 0:
+        return 0
+    if rule.freq == "DAILY" and not rule.byday:
+        return k
+    if rule.freq == "WEEKLY":
+        per_period = len(_candidates(rule, dtstart, _period_start(rule, dtstart, 1)))
+        first = len([day for day in _candidates(rule, dtstart, _period_start(rule, dtstart, 0)) if day >= dtstart])
+        return first + (k - 1) * per_period
+    return sum(
+        1
+        for index in range(k)
+        for day in _candidates(rule, dtstart, _period_start(rule, dtstart, index))
+        if day >= dtstart
+    )
+
+
+def occurrence_dates(rule: RecurrenceRule, dtstart: date, window_start: date, window_end: date) -> list[date]:
+    if rule.until:
+        window_end = min(window_end, rule.until)
+    if window_end < dtstart or window_end < window_start:
+        return []
+
+    k = _first_period(rule, dtstart, window_start)
+    emitted = _emitted_before(rule, dtstart, k) if rule.count else 0
+    dates: list[date] = []
+    while True:
+        period = _period_start(rule, dtstart, k)
+        if period > window_end:
+            break
+        for day in _candidates(rule, dtstart, period):
+            if day < dtstart:
+                continue
+            if rule.count and emitted >= rule.count:
+                return dates
+            emitted += 1
+            if window_start <= day <= window_end:
+                dates.append(day)
+        k += 1
+    return dates
+
+
+def _fingerprint(event: Event) -> tuple:
+    return event.date, event.recurrence, event.recurrence_rule
+
+
+def _month_range(start: date, end: date):
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def event_occurrences(event: Event, window_start: date, window_end: date) -> list[date]:
+    rule = parse_rule(event.recurrence, event.recurrence_rule)
+    if rule is None:
+        return [event.date] if window_start <= event.date <= window_end else []
+
+    fingerprint = _fingerprint(event)
+    cached = expansion_cache.get(event.id)
+    if cached is None or cached[0] != fingerprint:
+        cached = (fingerprint, {})
+        expansion_cache.set(event.id, cached)
+    months = cached[1]
+
+    dates: list[date] = []
+    for year, month in _month_range(window_start, window_end):
+        if (year, month) not in months:
+            month_start = date(year, month, 1)
+            month_end = date(year, month, calendar.monthrange(year, month)[1])
+            months[(year, month)] = occurrence_dates(rule, event.date, month_start, month_end)
+        dates.extend(day for day in months[(year, month)] if window_start <= day <= window_end)
+    return dates
+
+
+def is_occurrence(event: Event, day: date) -> bool:
+    return day in event_occurrences(event, day, day)
+
+
+def recurring_filter():
+    return or_(Event.recurrence_rule.isnot(None), Event.recurrence.in_(list(PRESETS)))
+
+
+def expand_occurrences(
+    db: Session,
+    owner_id: int,
+    window_start: date,
+    window_end: date,
+    category: str | None = None,
+) -> list[schemas.EventOccurrenceOut]:
+    query = db.query(Event).filter(
+        Event.owner_id == owner_id,
+        Event.date <= window_end,
+        or_(Event.date >= window_start, recurring_filter()),
+    )
+    if category:
+        query = query.filter(Event.category == category)
+    events = query.all()
+
+    overrides: dict[int, dict[date, EventException]] = {}
+    if events:
+        exceptions = db.query(EventException).filter(
+            EventException.owner_id == owner_id,
+            EventException.event_id.in_([event.id for event in events]),
+            window_exceptions(window_start, window_end),
+        )
+        for exception in exceptions:
+            overrides.setdefault(exception.event_id, {})[exception.original_date] = exception
+    return expand_events(events, overrides, window_start, window_end)
+
+
+def window_exceptions(window_start: date, window_end: date):
+    return or_(
+        EventException.original_date.between(window_start, window_end),
+        EventException.date.between(window_start, window_end),
+    )
+
+
+def expand_events(
+    events: list[Event], overrides: dict[int, dict[date, EventException]], window_start: date, window_end: date
+) -> list[schemas.EventOccurrenceOut]:
+    occurrences: list[schemas.EventOccurrenceOut] = []
+    for event in events:
+        base = schemas.EventOut.model_validate(event).model_dump()
+        event_overrides = overrides.get(event.id, {})
+        dates = set(event_occurrences(event, window_start, window_end))
+        dates.update(
+            original
+            for original, exception in event_overrides.items()
+            if original not in dates and exception.date and window_start <= exception.date <= window_end and is_occurrence(event, original)
+        )
+        for day in sorted(dates):
+            fields = {**base, "date": day}
+            exception = event_overrides.get(day)
+            if exception is not None:
+                if exception.is_cancelled:
+                    continue
+                for name in OVERRIDE_FIELDS:
+                    value = getattr(exception, name)
+                    if value is not None:
+                        fields[name] = value
+                if not window_start <= fields["date"] <= window_end:
+                    continue
+            occurrences.append(schemas.EventOccurrenceOut(**fields, occurrence_date=day, is_exception=exception is not None))
+
+    occurrences.sort(key=lambda occurrence: (occurrence.date, occurrence.start_time, occurrence.id))
+    return occurrences
+
+
+def invalidate_event(event_id: int) -> None:
+    expansion_cache.pop(event_id)
+
+
+@orm_event.listens_for(Event, "after_update")
+@orm_event.listens_for(Event, "after_delete")
+def _evict_changed_event(_mapper, _connection, target: Event) -> None:
+    invalidate_event(target.id)
@@ -0,0 +1,131 @@
+import argparse
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import delete, func, inspect, select
+from sqlalchemy import event as orm_event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .database import engine
+from .models import Attendance, AttendanceRollup, Student
+
+# (owner_id, student_id, month, status) -> change in count
+RollupKey = tuple[int, int, str, str]
+
+rollups = AttendanceRollup.__table__
+
+
+def month_of(day: date) -> str:
+    return day.strftime("%Y-%m")
+
+
+def rollup_key(owner_id: int, student_id: int, day: date, status: str) -> RollupKey:
+    return owner_id, student_id, month_of(day), status
+
+
+def apply_deltas(connection: Connection, deltas: Counter) -> None:
+    rows = [
+        {"owner_id": owner_id, "student_id": student_id, "month": month, "status": status, "count": delta}
+        for (owner_id, student_id, month, status), delta in deltas.items()
+        if delta
+    ]
+    if not rows:
+        return
+    statement = insert(rollups)
+    statement = statement.on_conflict_do_update(
+        index_elements=[rollups.c.student_id, rollups.c.month, rollups.c.status],
+        set_={"count": rollups.c.count + statement.excluded["count"]},
+    )
+    connection.execute(statement, rows)
+    if any(row["count"] < 0 for row in rows):
+        touched = {row["student_id"] for row in rows if row["count"] < 0}
+        connection.execute(delete(rollups).where(rollups.c.count <= 0, rollups.c.student_id.in_(touched)))
+
+
+def _previous(target: Attendance, name: str):
+    history = inspect(target).attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(target, name)
+
+
+@orm_event.listens_for(Attendance, "after_insert")
+def _count_inserted(_mapper, connection, target: Attendance) -> None:
+    apply_deltas(connection, Counter({rollup_key(target.owner_id, target.student_id, target.date, target.status): 1}))
+
+
+@orm_event.listens_for(Attendance, "after_update")
+def _count_updated(_mapper, connection, target: Attendance) -> None:
+    old = rollup_key(target.owner_id, _previous(target, "student_id"), _previous(target, "date"), _previous(target, "status"))
+    new = rollup_key(target.owner_id, target.student_id, target.date, target.status)
+    if old != new:
+        apply_deltas(connection, Counter({old: -1, new: 1}))
+
+
+@orm_event.listens_for(Attendance, "after_delete")
+def _count_deleted(_mapper, connection, target: Attendance) -> None:
+    apply_deltas(connection, Counter({rollup_key(target.owner_id, target.student_id, target.date, target.status): -1}))
+
+
+def rebuild_rollups(connection: Connection) -> int:
+    connection.execute(delete(rollups))
+    month = func.strftime("%Y-%m", Attendance.date)
+    result = connection.execute(
+        insert(rollups).from_select(
+            ["owner_id", "student_id", "month", "status", "count"],
+            select(Attendance.owner_id, Attendance.student_id, month, Attendance.status, func.count()).group_by(
+                Attendance.owner_id, Attendance.student_id, month, Attendance.status
+            ),
+        )
+    )
+    return result.rowcount
+
+
+def init_rollups(connection: Connection) -> None:
+    empty = connection.scalar(select(rollups.c.id).limit(1)) is None
+    if empty and connection.scalar(select(Attendance.id).limit(1)) is not None:
+        rebuild_rollups(connection)
+
+
+def rollup_counts(
+    db: Session,
+    owner_id: int,
+    group_by: list,
+    start_month: str | None = None,
+    end_month: str | None = None,
+    group_name: str | None = None,
+    student_id: int | None = None,
+):
+    query = (
+        select(*group_by, AttendanceRollup.status, func.sum(AttendanceRollup.count).label("total"))
+        .join(Student, Student.id == AttendanceRollup.student_id)
+        .where(AttendanceRollup.owner_id == owner_id)
+        .group_by(*group_by, AttendanceRollup.status)
+    )
+    if start_month:
+        query = query.where(AttendanceRollup.month >= start_month)
+    if end_month:
+        query = query.where(AttendanceRollup.month <= end_month)
+    if group_name is not None:
+        query = query.where(Student.group_name == group_name)
+    if student_id is not None:
+        query = query.where(AttendanceRollup.student_id == student_id)
+    return db.execute(query).all()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.rollups", description="Maintain the attendance rollup tables.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    # Imported here because the migrations themselves build on this module.
+    from .migrations import ensure_schema
+
+    ensure_schema()
+    with engine.begin() as connection:
+        count = rebuild_rollups(connection)
+    print(f"Rebuilt {count} attendance rollup rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,82 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from .. import schemas
-from ..auth import create_access_token, hash_password, verify_password
-from ..database import get_db
+from ..auth import create_access_token, hash_password_async, hashing_pool, verify_and_update_password
+from ..database import ReadSessionLocal, get_db
+from ..hashing import HashingPoolSaturated
 from ..models import User
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
-@router.post("/register", response_model=schemas.UserOut, status_code=201)
-def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == payload.email).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
+def _busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent sign-ins, try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _find_user(email: str) -> User | None:
+    # A read-only session, so sign-ins never queue on the write lock; the user stays usable detached and
+    # the writer session is only opened if something has to be saved.
+    db = ReadSessionLocal()
+    try:
+        return db.query(User).filter(User.email == email).first()
+    finally:
+        db.close()
+
+
+def _duplicate_email_exception() -> HTTPException:
+    return HTTPException(status_code=400, detail="Email already registered")
+
 
-    user = User(email=payload.email, full_name=payload.full_name, hashed_password=hash_password(payload.password))
+def _save_user(db: Session, user: User) -> User:
     db.add(user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        # Another registration for the same email committed while the password was being hashed.
+        db.rollback()
+        raise _duplicate_email_exception() from exc
     db.refresh(user)
     return user
 
 
+@router.post("/register", response_model=schemas.UserOut, status_code=201)
+async def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
+    try:
+        async with hashing_pool.slot():
+            existing = await run_in_threadpool(_find_user, payload.email)
+            if existing:
+                raise _duplicate_email_exception()
+            hashed_password = await hash_password_async(payload.password)
+    except HashingPoolSaturated as exc:
+        raise _busy_exception() from exc
+
+    user = User(email=payload.email, full_name=payload.full_name, hashed_password=hashed_password)
+    return await run_in_threadpool(_save_user, db, user)
+
+
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    try:
+        async with hashing_pool.slot():
+            user = await run_in_threadpool(_find_user, form_data.username)
+            if not user:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+            verified, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+    except HashingPoolSaturated as exc:
+        raise _busy_exception() from exc
+    if not verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
+    if new_hash:
+        user.hashed_password = new_hash
+        await run_in_threadpool(_save_user, db, user)
+
     return schemas.Token(access_token=create_access_token(user.email))
@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from .. import schemas
+from ..auth import get_current_user
+from ..changes import latest_seq
+from ..database import get_db, read_snapshot
+from ..models import Attendance, DailyContent, Event, Observation, Planning, Reminder, Student, Task, User
+
+router = APIRouter(prefix="/api/bootstrap", tags=["bootstrap"])
+
+SECTIONS = ("events", "tasks", "reminders", "students", "observations", "attendance", "plannings", "contents")
+
+
+def _window(query, column, start: date | None, end: date | None):
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column <= end)
+    return query
+
+
+@router.get("", response_model=schemas.Bootstrap, response_model_exclude_unset=True)
+def bootstrap(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    sections: str | None = None,
+    events_start: date | None = None,
+    events_end: date | None = None,
+    tasks_start: date | None = None,
+    tasks_end: date | None = None,
+    observations_start: date | None = None,
+    observations_end: date | None = None,
+    attendance_start: date | None = None,
+    attendance_end: date | None = None,
+    plannings_start: date | None = None,
+    plannings_end: date | None = None,
+    contents_start: date | None = None,
+    contents_end: date | None = None,
+):
+    requested = [name.strip() for name in sections.split(",") if name.strip()] if sections else list(SECTIONS)
+    unknown = [name for name in requested if name not in SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+
+    if not attendance_start and not attendance_end:
+        attendance_end = date.today()
+        attendance_start = attendance_end - timedelta(days=6)
+
+    owner_id = current_user.id
+    loaders = {
+        "events": lambda: _window(db.query(Event).filter(Event.owner_id == owner_id), Event.date, events_start, events_end)
+        .order_by(Event.date, Event.start_time)
+        .all(),
+        "tasks": lambda: _window(db.query(Task).filter(Task.owner_id == owner_id), Task.due_date, tasks_start, tasks_end)
+        .order_by(Task.due_date)
+        .all(),
+        "reminders": lambda: db.query(Reminder).filter(Reminder.owner_id == owner_id).all(),
+        "students": lambda: db.query(Student).filter(Student.owner_id == owner_id).order_by(Student.full_name).all(),
+        "observations": lambda: _window(
+            db.query(Observation).filter(Observation.owner_id == owner_id), Observation.date, observations_start, observations_end
+        )
+        .order_by(Observation.date.desc())
+        .all(),
+        "attendance": lambda: _window(
+            db.query(Attendance).filter(Attendance.owner_id == owner_id), Attendance.date, attendance_start, attendance_end
+        )
+        .order_by(Attendance.date.desc())
+        .all(),
+        "plannings": lambda: _window(
+            db.query(Planning).filter(Planning.owner_id == owner_id), Planning.week_start, plannings_start, plannings_end
+        )
+        .order_by(Planning.week_start.desc(), Planning.weekday)
+        .all(),
+        "contents": lambda: _window(
+            db.query(DailyContent).filter(DailyContent.owner_id == owner_id), DailyContent.date, contents_start, contents_end
+        )
+        .order_by(DailyContent.date.desc())
+        .all(),
+    }
+
+    with read_snapshot(db):
+        payload = {name: loaders[name]() for name in requested}
+        return schemas.Bootstrap(sync_token=str(latest_seq(db, owner_id)), **payload)
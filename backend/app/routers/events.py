@@ -1,14 +1,23 @@
-from datetime import date, timedelta
+from datetime import date, time, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .. import schemas
-from ..auth import get_current_user
-from ..database import get_db
-from ..models import Event, User
+from ..auth import get_current_user, get_current_user_async
+from ..conditional import async_collection_etag, collection_etag
+from ..conflicts import SCHEDULE_FIELDS, find_conflicts, free_slots, owner_index
+from ..database import get_async_db, get_db
+from ..models import Event, EventException, User
+from ..pagination import Page
+from ..recurrence import InvalidRecurrenceRule, expand_occurrences, is_occurrence, parse_rule
+from ..search import filter_by_search
 
 router = APIRouter(prefix="/api/events", tags=["events"])
+# Mounted ahead of `router` when DATABASE_MODE=async.
+async_router = APIRouter(prefix="/api/events", tags=["events"])
 
 CATEGORY_COLORS = {
     "subject": "#2563eb",
@@ -16,14 +25,110 @@ CATEGORY_COLORS = {
     "exam": "#dc2626",
     "personal": "#9333ea",
 }
+OTHER_CATEGORY = "other"
+CALENDAR_VIEW_PATTERN = r"^(month|week|day)$"
+MAX_OCCURRENCE_WINDOW_DAYS = 366 * 2
+MAX_FREE_SLOTS = 200
+EVENT_SORT_KEYS = [(Event.date, False), (Event.start_time, False), (Event.id, False)]
 
 
-@router.post("", response_model=schemas.EventOut, status_code=201)
+def _validate_window(start_date: date, end_date: date) -> None:
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end_date - start_date).days > MAX_OCCURRENCE_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"Window cannot exceed {MAX_OCCURRENCE_WINDOW_DAYS} days")
+
+
+def _filter_events(
+    query,
+    owner_id: int,
+    q: str | None,
+    category: str | None,
+    start_date: date | None,
+    end_date: date | None,
+    upcoming_days: int | None,
+):
+    # Works on both a legacy Query and a select(), so the sync and async routes share it.
+    query = query.filter(Event.owner_id == owner_id)
+    if q:
+        query = filter_by_search(query, Event, "events", owner_id, q)
+    if category:
+        query = query.filter(Event.category == category)
+    if start_date:
+        query = query.filter(Event.date >= start_date)
+    if end_date:
+        query = query.filter(Event.date <= end_date)
+    if upcoming_days:
+        today = date.today()
+        query = query.filter(Event.date.between(today, today + timedelta(days=upcoming_days)))
+    return query
+
+
+def _calendar_window(view: str, anchor: date) -> tuple[date, date, date, date]:
+    # (grid start, grid end, period start, period end); month grids run Monday to Sunday over whole weeks.
+    if view == "day":
+        return anchor, anchor, anchor, anchor
+    if view == "week":
+        start = anchor - timedelta(days=anchor.weekday())
+        return start, start + timedelta(days=6), start, start + timedelta(days=6)
+    first = anchor.replace(day=1)
+    last = (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    return first - timedelta(days=first.weekday()), last + timedelta(days=6 - last.weekday()), first, last
+
+
+def _category_counts() -> dict[str, int]:
+    return {**dict.fromkeys(CATEGORY_COLORS, 0), OTHER_CATEGORY: 0}
+
+
+def calendar_grid(
+    db: Session, owner_id: int, view: str, anchor: date, category: str | None = None
+) -> schemas.CalendarGrid:
+    start, end, period_start, period_end = _calendar_window(view, anchor)
+    days = {}
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        days[day] = schemas.CalendarDay(date=day, in_period=period_start <= day <= period_end, counts=_category_counts())
+    counts = _category_counts()
+    for occurrence in expand_occurrences(db, owner_id, start, end, category):
+        bucket = days[occurrence.date]
+        bucket.events.append(occurrence)
+        key = occurrence.category.lower()
+        key = key if key in CATEGORY_COLORS else OTHER_CATEGORY
+        bucket.counts[key] += 1
+        if bucket.in_period:
+            counts[key] += 1
+    return schemas.CalendarGrid(view=view, anchor=anchor, start=start, end=end, days=list(days.values()), counts=counts)
+
+
+def _validate_recurrence(recurrence: str | None, recurrence_rule: str | None) -> None:
+    try:
+        parse_rule(recurrence, recurrence_rule)
+    except InvalidRecurrenceRule as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _check_conflicts(conflicts: list[schemas.EventConflict], allow_conflicts: bool) -> None:
+    if conflicts and not allow_conflicts:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Event overlaps other events", "conflicts": [conflict.model_dump(mode="json") for conflict in conflicts]},
+        )
+
+
+def _write_out(event: Event, conflicts: list[schemas.EventConflict]) -> schemas.EventWriteOut:
+    return schemas.EventWriteOut.model_validate(event).model_copy(update={"conflicts": conflicts})
+
+
+@router.post("", response_model=schemas.EventWriteOut, status_code=201)
 def create_event(
     payload: schemas.EventCreate,
+    allow_conflicts: bool = True,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    _validate_recurrence(payload.recurrence, payload.recurrence_rule)
+    conflicts = find_conflicts(db, current_user.id, payload.model_dump())
+    _check_conflicts(conflicts, allow_conflicts)
     event = Event(
         owner_id=current_user.id,
         color=CATEGORY_COLORS.get(payload.category.lower(), "#0f766e"),
@@ -32,10 +137,10 @@ def create_event(
     db.add(event)
     db.commit()
     db.refresh(event)
-    return event
+    return _write_out(event, conflicts)
 
 
-@router.get("", response_model=list[schemas.EventOut])
+@router.get("", response_model=list[schemas.EventOut], dependencies=[Depends(collection_etag("events"))])
 def list_events(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -44,27 +149,132 @@ def list_events(
     start_date: date | None = None,
     end_date: date | None = None,
     upcoming_days: int | None = None,
+    page: Page = Depends(),
 ):
-    query = db.query(Event).filter(Event.owner_id == current_user.id)
-    if q:
-        like = f"%{q}%"
-        query = query.filter((Event.title.ilike(like)) | (Event.notes.ilike(like)) | (Event.location.ilike(like)))
-    if category:
-        query = query.filter(Event.category == category)
-    if start_date:
-        query = query.filter(Event.date >= start_date)
-    if end_date:
-        query = query.filter(Event.date <= end_date)
-    if upcoming_days:
-        today = date.today()
-        query = query.filter(Event.date.between(today, today + timedelta(days=upcoming_days)))
-    return query.order_by(Event.date, Event.start_time).all()
+    query = _filter_events(db.query(Event), current_user.id, q, category, start_date, end_date, upcoming_days)
+    return page.respond(query, EVENT_SORT_KEYS, schemas.EventOut, fast=True)
+
+
+@async_router.get("", response_model=list[schemas.EventOut], dependencies=[Depends(async_collection_etag("events"))])
+async def list_events_async(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+    q: str | None = None,
+    category: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    upcoming_days: int | None = None,
+    page: Page = Depends(),
+):
+    statement = _filter_events(select(Event), current_user.id, q, category, start_date, end_date, upcoming_days)
+    return await page.respond_async(db, statement, EVENT_SORT_KEYS, schemas.EventOut, fast=True)
+
+
+@router.get(
+    "/occurrences",
+    response_model=list[schemas.EventOccurrenceOut],
+    dependencies=[Depends(collection_etag("events", "event_exceptions"))],
+)
+def list_occurrences(
+    start_date: date,
+    end_date: date,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    category: str | None = None,
+):
+    _validate_window(start_date, end_date)
+    return expand_occurrences(db, current_user.id, start_date, end_date, category)
 
 
-@router.put("/{event_id}", response_model=schemas.EventOut)
+@async_router.get(
+    "/occurrences",
+    response_model=list[schemas.EventOccurrenceOut],
+    dependencies=[Depends(async_collection_etag("events", "event_exceptions"))],
+)
+async def list_occurrences_async(
+    start_date: date,
+    end_date: date,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+    category: str | None = None,
+):
+    _validate_window(start_date, end_date)
+    return await db.run_sync(expand_occurrences, current_user.id, start_date, end_date, category)
+
+
+@router.get(
+    "/calendar",
+    response_model=schemas.CalendarGrid,
+    dependencies=[Depends(collection_etag("events", "event_exceptions"))],
+)
+def get_calendar(
+    view: str = Query(default="month", pattern=CALENDAR_VIEW_PATTERN),
+    anchor: date | None = None,
+    category: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return calendar_grid(db, current_user.id, view, anchor or date.today(), category)
+
+
+@async_router.get(
+    "/calendar",
+    response_model=schemas.CalendarGrid,
+    dependencies=[Depends(async_collection_etag("events", "event_exceptions"))],
+)
+async def get_calendar_async(
+    view: str = Query(default="month", pattern=CALENDAR_VIEW_PATTERN),
+    anchor: date | None = None,
+    category: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    return await db.run_sync(calendar_grid, current_user.id, view, anchor or date.today(), category)
+
+
+@router.get(
+    "/conflicts",
+    response_model=list[schemas.ConflictPair],
+    dependencies=[Depends(collection_etag("events", "event_exceptions"))],
+)
+def list_conflicts(
+    start_date: date,
+    end_date: date,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    _validate_window(start_date, end_date)
+    return owner_index(db, current_user.id, start_date, end_date).pairs(start_date, end_date)
+
+
+@router.get(
+    "/free-slots",
+    response_model=list[schemas.FreeSlot],
+    dependencies=[Depends(collection_etag("events", "event_exceptions"))],
+)
+def list_free_slots(
+    start_date: date,
+    end_date: date,
+    duration_minutes: int = Query(default=30, ge=5, le=24 * 60),
+    day_start: time = time(8, 0),
+    day_end: time = time(18, 0),
+    include_weekends: bool = False,
+    limit: int = Query(default=50, ge=1, le=MAX_FREE_SLOTS),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    _validate_window(start_date, end_date)
+    if day_end <= day_start:
+        raise HTTPException(status_code=400, detail="day_end must be after day_start")
+    duration = timedelta(minutes=duration_minutes)
+    return free_slots(db, current_user.id, start_date, end_date, day_start, day_end, duration, include_weekends, limit)
+
+
+@router.put("/{event_id}", response_model=schemas.EventWriteOut)
 def update_event(
     event_id: int,
     payload: schemas.EventUpdate,
+    allow_conflicts: bool = True,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -73,6 +283,12 @@ def update_event(
         raise HTTPException(status_code=404, detail="Event not found")
 
     updates = payload.model_dump(exclude_unset=True)
+    _validate_recurrence(updates.get("recurrence", event.recurrence), updates.get("recurrence_rule", event.recurrence_rule))
+    conflicts = []
+    if SCHEDULE_FIELDS & updates.keys():
+        fields = {name: updates.get(name, getattr(event, name)) for name in SCHEDULE_FIELDS}
+        conflicts = find_conflicts(db, current_user.id, fields, event_id=event.id)
+        _check_conflicts(conflicts, allow_conflicts)
     for key, value in updates.items():
         setattr(event, key, value)
 
@@ -81,7 +297,7 @@ def update_event(
 
     db.commit()
     db.refresh(event)
-    return event
+    return _write_out(event, conflicts)
 
 
 @router.delete("/{event_id}", status_code=204)
@@ -94,3 +310,70 @@ def delete_event(
     if event:
         db.delete(event)
         db.commit()
+
+
+@router.get(
+    "/{event_id}/exceptions",
+    response_model=list[schemas.EventExceptionOut],
+    dependencies=[Depends(collection_etag("event_exceptions"))],
+)
+def list_event_exceptions(
+    event_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return (
+        db.query(EventException)
+        .filter(EventException.event_id == event_id, EventException.owner_id == current_user.id)
+        .order_by(EventException.original_date)
+        .all()
+    )
+
+
+@router.post("/{event_id}/exceptions", response_model=schemas.EventExceptionOut, status_code=201)
+def create_event_exception(
+    event_id: int,
+    payload: schemas.EventExceptionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    event = db.query(Event).filter(Event.id == event_id, Event.owner_id == current_user.id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if parse_rule(event.recurrence, event.recurrence_rule) is None or not is_occurrence(event, payload.original_date):
+        raise HTTPException(status_code=400, detail="original_date is not an occurrence of this recurring event")
+
+    exception = (
+        db.query(EventException)
+        .filter(EventException.event_id == event_id, EventException.original_date == payload.original_date)
+        .first()
+    )
+    if exception is None:
+        exception = EventException(owner_id=current_user.id, event_id=event_id, original_date=payload.original_date)
+        db.add(exception)
+    for key, value in payload.model_dump(exclude={"original_date"}).items():
+        setattr(exception, key, value)
+    db.commit()
+    db.refresh(exception)
+    return exception
+
+
+@router.delete("/{event_id}/exceptions/{exception_id}", status_code=204)
+def delete_event_exception(
+    event_id: int,
+    exception_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    exception = (
+        db.query(EventException)
+        .filter(
+            EventException.id == exception_id,
+            EventException.event_id == event_id,
+            EventException.owner_id == current_user.id,
+        )
+        .first()
+    )
+    if exception:
+        db.delete(exception)
+        db.commit()
@@ -0,0 +1,80 @@
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from .. import schemas
+from ..auth import get_current_user
+from ..conditional import check_collections
+from ..database import get_db
+from ..ics import ICS_MEDIA_TYPE, stream_calendar
+from ..models import CalendarFeed, User
+
+# Included ahead of the events router so that /feed is not taken for an event id.
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+ICS_COLLECTIONS = ("events", "event_exceptions")
+FEED_TOKEN_BYTES = 24
+
+
+def _calendar_name(full_name: str) -> str:
+    return f"Agenda Docente - {full_name}"
+
+
+def _feed_out(request: Request, feed: CalendarFeed) -> schemas.CalendarFeedOut:
+    return schemas.CalendarFeedOut(url=str(request.url_for("calendar_feed", token=feed.token)), created_at=feed.created_at)
+
+
+@router.get("/export.ics")
+def export_calendar(
+    request: Request, response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+):
+    # The calendar name comes from the user row, which has no change-log version, so it is keyed directly.
+    name = _calendar_name(current_user.full_name)
+    check_collections(request, response, db, current_user.id, ICS_COLLECTIONS, extra=(name,))
+    headers = {**response.headers, "Content-Disposition": 'attachment; filename="agenda.ics"'}
+    return StreamingResponse(stream_calendar(current_user.id, name), media_type=ICS_MEDIA_TYPE, headers=headers)
+
+
+@router.get("/feed", response_model=schemas.CalendarFeedOut)
+def get_calendar_feed(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    feed = db.query(CalendarFeed).filter(CalendarFeed.owner_id == current_user.id).first()
+    if not feed:
+        raise HTTPException(status_code=404, detail="Calendar feed not enabled")
+    return _feed_out(request, feed)
+
+
+@router.post("/feed", response_model=schemas.CalendarFeedOut, status_code=201)
+def rotate_calendar_feed(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    # Posting again issues a new URL, so a leaked one can be revoked without turning the feed off.
+    feed = db.query(CalendarFeed).filter(CalendarFeed.owner_id == current_user.id).first()
+    if feed is None:
+        feed = CalendarFeed(owner_id=current_user.id)
+        db.add(feed)
+    feed.token = secrets.token_urlsafe(FEED_TOKEN_BYTES)
+    db.commit()
+    db.refresh(feed)
+    return _feed_out(request, feed)
+
+
+@router.delete("/feed", status_code=204)
+def delete_calendar_feed(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    db.query(CalendarFeed).filter(CalendarFeed.owner_id == current_user.id).delete()
+    db.commit()
+
+
+@router.get("/feed/{token}.ics", name="calendar_feed")
+def calendar_feed(token: str, request: Request, response: Response, db: Session = Depends(get_db)):
+    # Calendar apps cannot send a bearer token, so the secret in the URL is the credential.
+    owner = (
+        db.query(User.id, User.full_name)
+        .join(CalendarFeed, CalendarFeed.owner_id == User.id)
+        .filter(CalendarFeed.token == token)
+        .first()
+    )
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Calendar feed not found")
+    name = _calendar_name(owner.full_name)
+    check_collections(request, response, db, owner.id, ICS_COLLECTIONS, extra=(name,))
+    return StreamingResponse(stream_calendar(owner.id, name), media_type=ICS_MEDIA_TYPE, headers=dict(response.headers))
@@ -1,15 +1,22 @@
 from datetime import date, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from .. import schemas
+from ..attendance import attendance_rate, roll_call
 from ..auth import get_current_user
+from ..conditional import collection_etag
 from ..database import get_db
-from ..models import Attendance, DailyContent, Observation, Planning, Student, User
+from ..models import Attendance, AttendanceRollup, DailyContent, Observation, Planning, Student, User
+from ..pagination import Page
+from ..rollups import rollup_counts
 
 router = APIRouter(prefix="/api/pedagogical", tags=["pedagogical"])
 
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
 
 @router.post("/observations", response_model=schemas.ObservationOut, status_code=201)
 def create_observation(payload: schemas.ObservationCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -23,40 +30,58 @@ def create_observation(payload: schemas.ObservationCreate, db: Session = Depends
     return observation
 
 
-@router.get("/observations", response_model=list[schemas.ObservationOut])
+@router.get("/observations", response_model=list[schemas.ObservationOut], dependencies=[Depends(collection_etag("observations"))])
 def list_observations(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     student_id: int | None = None,
     target_date: date | None = None,
+    page: Page = Depends(),
 ):
     query = db.query(Observation).filter(Observation.owner_id == current_user.id)
     if student_id:
         query = query.filter(Observation.student_id == student_id)
     if target_date:
         query = query.filter(Observation.date == target_date)
-    return query.order_by(Observation.date.desc()).all()
+    return page.respond(query, [(Observation.date, True), (Observation.id, True)], schemas.ObservationOut, fast=True)
 
 
 @router.post("/attendance", response_model=schemas.AttendanceOut, status_code=201)
-def create_attendance(payload: schemas.AttendanceCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_attendance(
+    payload: schemas.AttendanceCreate,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
     student = db.query(Student).filter(Student.id == payload.student_id, Student.owner_id == current_user.id).first()
     if not student:
         raise HTTPException(status_code=404, detail="Alumno no encontrado")
-    attendance = Attendance(owner_id=current_user.id, **payload.model_dump())
-    db.add(attendance)
+    attendance = db.query(Attendance).filter(Attendance.student_id == payload.student_id, Attendance.date == payload.date).first()
+    if attendance:
+        # Same student and day: the row is updated in place, which is not a creation.
+        attendance.status = payload.status
+        response.status_code = status.HTTP_200_OK
+    else:
+        attendance = Attendance(owner_id=current_user.id, **payload.model_dump())
+        db.add(attendance)
     db.commit()
     db.refresh(attendance)
     return attendance
 
 
-@router.get("/attendance", response_model=list[schemas.AttendanceOut])
+@router.post("/attendance/batch", response_model=schemas.AttendanceBatchOut)
+def create_attendance_batch(payload: schemas.AttendanceBatch, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return roll_call(db, current_user.id, payload)
+
+
+@router.get("/attendance", response_model=list[schemas.AttendanceOut], dependencies=[Depends(collection_etag("attendance"))])
 def list_attendance(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     view: str = "daily",
     target_date: date | None = None,
     student_id: int | None = None,
+    page: Page = Depends(),
 ):
     base_date = target_date or date.today()
     query = db.query(Attendance).filter(Attendance.owner_id == current_user.id)
@@ -71,7 +96,93 @@ def list_attendance(
         month_start = base_date.replace(day=1)
         query = query.filter(Attendance.date.between(month_start, base_date))
 
-    return query.order_by(Attendance.date.desc()).all()
+    return page.respond(query, [(Attendance.date, True), (Attendance.id, True)], schemas.AttendanceOut, fast=True)
+
+
+def _fold_stats(rows, key_fields: tuple[str, ...]) -> list[schemas.AttendanceStats]:
+    stats: dict[tuple, schemas.AttendanceStats] = {}
+    students: dict[tuple, set[int]] = {}
+    for row in rows:
+        key = tuple(getattr(row, field) for field in key_fields)
+        entry = stats.setdefault(key, schemas.AttendanceStats(**dict(zip(key_fields, key))))
+        entry.by_status[row.status] = entry.by_status.get(row.status, 0) + row.total
+        entry.total += row.total
+        if "student_id" in row._fields and "student_id" not in key_fields:
+            students.setdefault(key, set()).add(row.student_id)
+    for key, entry in stats.items():
+        entry.rate = attendance_rate(entry.by_status)
+        if key in students:
+            entry.students = len(students[key])
+    return list(stats.values())
+
+
+@router.get(
+    "/attendance/stats/groups",
+    response_model=list[schemas.AttendanceStats],
+    response_model_exclude_none=True,
+    dependencies=[Depends(collection_etag("attendance", "students"))],
+)
+def attendance_stats_by_group(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    start_month: str | None = Query(default=None, pattern=MONTH_PATTERN),
+    end_month: str | None = Query(default=None, pattern=MONTH_PATTERN),
+):
+    rows = rollup_counts(db, current_user.id, [Student.group_name, AttendanceRollup.student_id], start_month, end_month)
+    return sorted(_fold_stats(rows, ("group_name",)), key=lambda entry: (entry.group_name is None, entry.group_name or ""))
+
+
+@router.get(
+    "/attendance/stats/students",
+    response_model=list[schemas.AttendanceStats],
+    response_model_exclude_none=True,
+    dependencies=[Depends(collection_etag("attendance", "students"))],
+)
+def attendance_stats_by_student(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    group_name: str | None = None,
+    start_month: str | None = Query(default=None, pattern=MONTH_PATTERN),
+    end_month: str | None = Query(default=None, pattern=MONTH_PATTERN),
+):
+    rows = rollup_counts(
+        db,
+        current_user.id,
+        [AttendanceRollup.student_id, Student.full_name, Student.group_name],
+        start_month,
+        end_month,
+        group_name=group_name,
+    )
+    return sorted(
+        _fold_stats(rows, ("student_id", "full_name", "group_name")),
+        key=lambda entry: (entry.group_name or "", entry.full_name, entry.student_id),
+    )
+
+
+@router.get(
+    "/attendance/stats/months",
+    response_model=list[schemas.AttendanceStats],
+    response_model_exclude_none=True,
+    dependencies=[Depends(collection_etag("attendance", "students"))],
+)
+def attendance_stats_by_month(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    group_name: str | None = None,
+    student_id: int | None = None,
+    start_month: str | None = Query(default=None, pattern=MONTH_PATTERN),
+    end_month: str | None = Query(default=None, pattern=MONTH_PATTERN),
+):
+    rows = rollup_counts(
+        db,
+        current_user.id,
+        [AttendanceRollup.month, AttendanceRollup.student_id],
+        start_month,
+        end_month,
+        group_name=group_name,
+        student_id=student_id,
+    )
+    return sorted(_fold_stats(rows, ("month",)), key=lambda entry: entry.month)
 
 
 @router.put("/attendance/{attendance_id}", response_model=schemas.AttendanceOut)
@@ -81,7 +192,10 @@ def update_attendance(attendance_id: int, payload: schemas.AttendanceUpdate, db:
         raise HTTPException(status_code=404, detail="Registro de asistencia no encontrado")
     for key, value in payload.model_dump(exclude_unset=True).items():
         setattr(attendance, key, value)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        raise HTTPException(status_code=409, detail="Ya existe una asistencia para ese alumno en esa fecha") from exc
     db.refresh(attendance)
     return attendance
 
@@ -95,12 +209,19 @@ def create_planning(payload: schemas.PlanningCreate, db: Session = Depends(get_d
     return planning
 
 
-@router.get("/plannings", response_model=list[schemas.PlanningOut])
-def list_plannings(db: Session = Depends(get_db), current_user: User = Depends(get_current_user), week_start: date | None = None):
+@router.get("/plannings", response_model=list[schemas.PlanningOut], dependencies=[Depends(collection_etag("plannings"))])
+def list_plannings(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    week_start: date | None = None,
+    page: Page = Depends(),
+):
     query = db.query(Planning).filter(Planning.owner_id == current_user.id)
     if week_start:
         query = query.filter(Planning.week_start == week_start)
-    return query.order_by(Planning.week_start.desc(), Planning.weekday).all()
+    return page.respond(
+        query, [(Planning.week_start, True), (Planning.weekday, False), (Planning.id, False)], schemas.PlanningOut, fast=True
+    )
 
 
 @router.post("/contents", response_model=schemas.DailyContentOut, status_code=201)
@@ -116,16 +237,17 @@ def create_daily_content(payload: schemas.DailyContentCreate, db: Session = Depe
     return content
 
 
-@router.get("/contents", response_model=list[schemas.DailyContentOut])
+@router.get("/contents", response_model=list[schemas.DailyContentOut], dependencies=[Depends(collection_etag("contents"))])
 def list_daily_content(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     target_date: date | None = None,
     student_id: int | None = None,
+    page: Page = Depends(),
 ):
     query = db.query(DailyContent).filter(DailyContent.owner_id == current_user.id)
     if target_date:
         query = query.filter(DailyContent.date == target_date)
     if student_id:
         query = query.filter(DailyContent.student_id == student_id)
-    return query.order_by(DailyContent.date.desc()).all()
+    return page.respond(query, [(DailyContent.date, True), (DailyContent.id, True)], schemas.DailyContentOut, fast=True)
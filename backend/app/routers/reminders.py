@@ -1,10 +1,15 @@
+from datetime import date
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from .. import schemas
 from ..auth import get_current_user
+from ..conditional import collection_etag
 from ..database import get_db
+from ..digest import DIGEST_COLLECTIONS, build_digests
 from ..models import Reminder, User
+from ..pagination import Page
 
 router = APIRouter(prefix="/api/reminders", tags=["reminders"])
 
@@ -23,8 +28,20 @@ def create_reminder(
 
 
 @router.get("", response_model=list[schemas.ReminderOut])
-def list_reminders(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return db.query(Reminder).filter(Reminder.owner_id == current_user.id).all()
+def list_reminders(db: Session = Depends(get_db), current_user: User = Depends(get_current_user), page: Page = Depends()):
+    query = db.query(Reminder).filter(Reminder.owner_id == current_user.id)
+    return page.respond(query, [(Reminder.id, False)], schemas.ReminderOut, fast=True)
+
+
+@router.get(
+    "/daily-summary", response_model=schemas.DailyDigest, dependencies=[Depends(collection_etag(*DIGEST_COLLECTIONS))]
+)
+def daily_summary(
+    day: date | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return build_digests(db, day or date.today(), [current_user.id])[current_user.id]
 
 
 @router.put("/{reminder_id}", response_model=schemas.ReminderOut)
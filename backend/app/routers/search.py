@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from .. import schemas
+from ..auth import get_current_user
+from ..database import get_db
+from ..models import User
+from ..search import SEARCH_SOURCES, search
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+
+@router.get("", response_model=list[schemas.SearchResult])
+def search_everything(
+    q: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    kinds: str | None = None,
+    limit: int = Query(default=20, ge=1, le=100),
+):
+    requested = [kind.strip() for kind in kinds.split(",") if kind.strip()] if kinds else None
+    unknown = [kind for kind in requested or [] if kind not in SEARCH_SOURCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown kinds: {', '.join(unknown)}")
+    return search(db, current_user.id, q, requested, limit)
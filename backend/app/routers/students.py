@@ -1,12 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException
+import shutil
+import tempfile
+
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Date, func, literal, null, select, type_coerce, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .. import schemas
-from ..auth import get_current_user
-from ..database import get_db
-from ..models import Attendance, DailyContent, Observation, Student, User
+from ..attendance import attendance_rate
+from ..auth import get_current_user, get_current_user_async
+from ..conditional import async_collection_etag, collection_etag
+from ..database import get_async_db, get_db
+from ..models import Attendance, AttendanceRollup, DailyContent, Observation, Student, User
+from ..pagination import NDJSON_MEDIA_TYPE, Window, fetch_page, window_params
+from ..search import filter_by_search
+from ..serialization import fast_list, fast_list_async
+from ..student_import import XLSX_SUPPORTED, InvalidImportFile, import_students, is_xlsx, read_records, stream_import
 
 router = APIRouter(prefix="/api/students", tags=["students"])
+async_router = APIRouter(prefix="/api/students", tags=["students"])
+
+IMPORT_SPOOL_BYTES = 1024 * 1024
+PROFILE_TAB_LIMIT = 50
+PROFILE_TABS = {"attendance": Attendance, "observations": Observation, "contents": DailyContent}
+
+
+def _filter_students(query, owner_id: int, q: str | None):
+    query = query.filter(Student.owner_id == owner_id)
+    if q:
+        query = filter_by_search(query, Student, "students", owner_id, q, columns="{title}")
+    return query.order_by(Student.full_name)
 
 
 @router.post("", response_model=schemas.StudentOut, status_code=201)
@@ -18,15 +42,50 @@ def create_student(payload: schemas.StudentCreate, db: Session = Depends(get_db)
     return student
 
 
-@router.get("", response_model=list[schemas.StudentOut])
-def list_students(db: Session = Depends(get_db), current_user: User = Depends(get_current_user), q: str | None = None):
-    query = db.query(Student).filter(Student.owner_id == current_user.id)
-    if q:
-        query = query.filter(Student.full_name.ilike(f"%{q}%"))
-    return query.order_by(Student.full_name).all()
+@router.post("/import", response_model=schemas.StudentImportResult)
+def import_students_file(
+    request: Request,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    xlsx = is_xlsx(file.filename, file.content_type)
+    if xlsx and not XLSX_SUPPORTED:
+        raise HTTPException(status_code=415, detail="La importación de XLSX requiere openpyxl en el servidor")
+
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        # The upload is closed before a streamed body is sent, so the stream reads its own copy.
+        spool = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES)
+        shutil.copyfileobj(file.file, spool)
+        spool.seek(0)
+        return StreamingResponse(stream_import(current_user.id, spool, xlsx), media_type=NDJSON_MEDIA_TYPE)
+
+    try:
+        for result in import_students(db, current_user.id, read_records(file.file, xlsx)):
+            pass
+    except InvalidImportFile as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return result
+
+
+@router.get("", response_model=list[schemas.StudentOut], dependencies=[Depends(collection_etag("students"))])
+def list_students(
+    response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), q: str | None = None
+):
+    return fast_list(_filter_students(db.query(Student), current_user.id, q), schemas.StudentOut, response)
+
 
+@async_router.get("", response_model=list[schemas.StudentOut], dependencies=[Depends(async_collection_etag("students"))])
+async def list_students_async(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+    q: str | None = None,
+):
+    return await fast_list_async(db, _filter_students(select(Student), current_user.id, q), schemas.StudentOut, response)
 
-@router.get("/{student_id}", response_model=schemas.StudentOut)
+
+@router.get("/{student_id}", response_model=schemas.StudentOut, dependencies=[Depends(collection_etag("students"))])
 def get_student(student_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     student = db.query(Student).filter(Student.id == student_id, Student.owner_id == current_user.id).first()
     if not student:
@@ -34,31 +93,93 @@ def get_student(student_id: int, db: Session = Depends(get_db), current_user: Us
     return student
 
 
-@router.get("/{student_id}/profile", response_model=schemas.StudentProfile)
-def get_student_profile(student_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.get(
+    "/{student_id}/profile",
+    response_model=schemas.StudentProfile,
+    dependencies=[Depends(collection_etag("students", "attendance", "observations", "contents"))],
+)
+def get_student_profile(
+    student_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    tabs: str | None = None,
+    attendance_window: Window = Depends(window_params("attendance", PROFILE_TAB_LIMIT)),
+    observations_window: Window = Depends(window_params("observations", PROFILE_TAB_LIMIT)),
+    contents_window: Window = Depends(window_params("contents", PROFILE_TAB_LIMIT)),
+):
+    requested = [name.strip() for name in tabs.split(",") if name.strip()] if tabs else list(PROFILE_TABS)
+    unknown = [name for name in requested if name not in PROFILE_TABS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Pestañas desconocidas: {', '.join(unknown)}")
+
     student = db.query(Student).filter(Student.id == student_id, Student.owner_id == current_user.id).first()
     if not student:
         raise HTTPException(status_code=404, detail="Alumno no encontrado")
 
-    attendance = (
-        db.query(Attendance)
-        .filter(Attendance.owner_id == current_user.id, Attendance.student_id == student_id)
-        .order_by(Attendance.date.desc())
-        .all()
-    )
-    observations = (
-        db.query(Observation)
-        .filter(Observation.owner_id == current_user.id, Observation.student_id == student_id)
-        .order_by(Observation.date.desc())
-        .all()
-    )
-    contents = (
-        db.query(DailyContent)
-        .filter(DailyContent.owner_id == current_user.id, DailyContent.student_id == student_id)
-        .order_by(DailyContent.date.desc())
-        .all()
+    windows = {"attendance": attendance_window, "observations": observations_window, "contents": contents_window}
+    profile = {"student": student}
+    for name in requested:
+        model = PROFILE_TABS[name]
+        window = windows[name]
+        query = window.apply(
+            db.query(model).filter(model.owner_id == current_user.id, model.student_id == student_id), model.date
+        )
+        profile[name], profile[f"{name}_next_cursor"] = fetch_page(
+            query, [(model.date, True), (model.id, True)], window.limit, window.cursor
+        )
+
+    # The first unfiltered observations page already starts with the latest observation.
+    latest = None
+    if profile.get("observations") and observations_window == Window(limit=observations_window.limit):
+        latest = profile["observations"][0]
+    return schemas.StudentProfile(**profile, summary=_summary(db, current_user.id, student_id, latest))
+
+
+def _summary(db: Session, owner_id: int, student_id: int, latest_observation: Observation | None) -> schemas.StudentProfileSummary:
+    # Attendance per month and status (from the rollups) plus observation/content totals come back from one UNION ALL query.
+    statement = union_all(
+        select(
+            literal("attendance").label("kind"),
+            AttendanceRollup.month,
+            AttendanceRollup.status,
+            AttendanceRollup.count.label("total"),
+            type_coerce(null(), Date).label("latest"),
+        ).where(AttendanceRollup.owner_id == owner_id, AttendanceRollup.student_id == student_id),
+        select(literal("observations"), null(), null(), func.count(), func.max(Observation.date))
+        .where(Observation.owner_id == owner_id, Observation.student_id == student_id),
+        select(literal("contents"), null(), null(), func.count(), func.max(DailyContent.date))
+        .where(DailyContent.owner_id == owner_id, DailyContent.student_id == student_id),
     )
-    return schemas.StudentProfile(student=student, attendance=attendance, observations=observations, contents=contents)
+
+    summary = schemas.StudentProfileSummary()
+    months: dict[str, schemas.AttendanceMonth] = {}
+    for row in db.execute(statement):
+        if row.kind == "attendance":
+            bucket = months.setdefault(row.month, schemas.AttendanceMonth(month=row.month))
+            bucket.by_status[row.status] = row.total
+            bucket.total += row.total
+            summary.attendance_by_status[row.status] = summary.attendance_by_status.get(row.status, 0) + row.total
+            summary.attendance_total += row.total
+        elif row.kind == "observations":
+            summary.observations_total = row.total
+        else:
+            summary.contents_total = row.total
+            summary.latest_content_date = row.latest
+
+    for bucket in months.values():
+        bucket.rate = attendance_rate(bucket.by_status)
+    summary.attendance_by_month = [months[key] for key in sorted(months)]
+    summary.attendance_rate = attendance_rate(summary.attendance_by_status)
+
+    if latest_observation is None and summary.observations_total:
+        latest_observation = (
+            db.query(Observation)
+            .filter(Observation.owner_id == owner_id, Observation.student_id == student_id)
+            .order_by(Observation.date.desc(), Observation.id.desc())
+            .first()
+        )
+    summary.latest_observation = latest_observation
+    return summary
 
 
 @router.put("/{student_id}", response_model=schemas.StudentOut)
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from .. import schemas
+from ..auth import get_current_user
+from ..changes import COLLECTIONS
+from ..database import get_db, read_snapshot
+from ..models import ChangeLog, User
+
+router = APIRouter(prefix="/api/sync", tags=["sync"])
+
+
+def _parse_token(since: str | None) -> int:
+    if not since:
+        return 0
+    try:
+        seq = int(since)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid sync token") from exc
+    if seq < 0:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return seq
+
+
+@router.get("", response_model=schemas.SyncResponse)
+def sync(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    since: str | None = None,
+    limit: int = Query(default=1000, ge=1, le=5000),
+):
+    seq = _parse_token(since)
+    with read_snapshot(db):
+        entries = (
+            db.query(ChangeLog)
+            .filter(ChangeLog.owner_id == current_user.id, ChangeLog.seq > seq)
+            .order_by(ChangeLog.seq)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        changed: dict[str, list[int]] = {}
+        deleted: dict[str, list[int]] = {}
+        for entry in entries:
+            (deleted if entry.deleted else changed).setdefault(entry.collection, []).append(entry.row_id)
+
+        changes = {}
+        for name, row_ids in changed.items():
+            model, schema = COLLECTIONS[name]
+            rows = db.query(model).filter(model.owner_id == current_user.id, model.id.in_(row_ids)).order_by(model.id)
+            changes[name] = [schema.model_validate(row) for row in rows]
+
+        token = str(entries[-1].seq) if entries else str(seq)
+        return schemas.SyncResponse(token=token, has_more=has_more, changes=changes, deleted=deleted)
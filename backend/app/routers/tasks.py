@@ -1,14 +1,31 @@
 from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .. import schemas
-from ..auth import get_current_user
-from ..database import get_db
+from ..auth import get_current_user, get_current_user_async
+from ..conditional import async_collection_etag, collection_etag
+from ..database import get_async_db, get_db
 from ..models import Task, User
+from ..search import filter_by_search
+from ..serialization import fast_list, fast_list_async
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
+async_router = APIRouter(prefix="/api/tasks", tags=["tasks"])
+
+
+def _filter_tasks(query, owner_id: int, q: str | None, due_before: date | None, priority: str | None):
+    query = query.filter(Task.owner_id == owner_id)
+    if q:
+        query = filter_by_search(query, Task, "tasks", owner_id, q)
+    if due_before:
+        query = query.filter(Task.due_date <= due_before)
+    if priority:
+        query = query.filter(Task.priority == priority)
+    return query.order_by(Task.due_date)
 
 
 @router.post("", response_model=schemas.TaskOut, status_code=201)
@@ -24,23 +41,29 @@ def create_task(
     return task
 
 
-@router.get("", response_model=list[schemas.TaskOut])
+@router.get("", response_model=list[schemas.TaskOut], dependencies=[Depends(collection_etag("tasks"))])
 def list_tasks(
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     q: str | None = None,
     due_before: date | None = None,
     priority: str | None = None,
 ):
-    query = db.query(Task).filter(Task.owner_id == current_user.id)
-    if q:
-        like = f"%{q}%"
-        query = query.filter((Task.title.ilike(like)) | (Task.notes.ilike(like)))
-    if due_before:
-        query = query.filter(Task.due_date <= due_before)
-    if priority:
-        query = query.filter(Task.priority == priority)
-    return query.order_by(Task.due_date).all()
+    return fast_list(_filter_tasks(db.query(Task), current_user.id, q, due_before, priority), schemas.TaskOut, response)
+
+
+@async_router.get("", response_model=list[schemas.TaskOut], dependencies=[Depends(async_collection_etag("tasks"))])
+async def list_tasks_async(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+    q: str | None = None,
+    due_before: date | None = None,
+    priority: str | None = None,
+):
+    statement = _filter_tasks(select(Task), current_user.id, q, due_before, priority)
+    return await fast_list_async(db, statement, schemas.TaskOut, response)
 
 
 @router.put("/{task_id}", response_model=schemas.TaskOut)
@@ -0,0 +1,435 @@
+import asyncio
+import heapq
+import importlib
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Protocol
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from .changes import subscribe, unsubscribe
+from .database import DATABASE_URL, IN_MEMORY, IS_SQLITE, ReadSessionLocal
+from .digest import build_digests
+from .models import Event, EventException, Reminder, Task
+from .recurrence import event_occurrences, is_occurrence, parse_rule
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+REMINDER_SCHEDULER_ENABLED = os.getenv("REMINDER_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Every worker starts a scheduler but only the one holding this lock fires reminders; empty disables the lock.
+REMINDER_SCHEDULER_LOCK = os.getenv(
+    "REMINDER_SCHEDULER_LOCK", f"{make_url(DATABASE_URL).database}.scheduler.lock" if IS_SQLITE and not IN_MEMORY else ""
+)
+REMINDER_LEADER_RETRY_SECONDS = float(os.getenv("REMINDER_LEADER_RETRY_SECONDS", "30"))
+REMINDER_DISPATCHER = os.getenv("REMINDER_DISPATCHER", "log")
+REMINDER_LOOKAHEAD_DAYS = int(os.getenv("REMINDER_LOOKAHEAD_DAYS", "400"))
+DAILY_SUMMARY_TIME = time.fromisoformat(os.getenv("DAILY_SUMMARY_TIME", "07:00"))
+TASK_DUE_TIME = time.fromisoformat(os.getenv("TASK_DUE_TIME", "09:00"))
+LOAD_BATCH_SIZE = 1000
+MAX_SLEEP_SECONDS = 300
+SCHEDULED_COLLECTIONS = {"reminders", "events", "event_exceptions", "tasks"}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Notification:
+    reminder_id: int
+    owner_id: int
+    kind: str
+    title: str
+    body: str
+    fire_at: datetime
+    event_id: int | None = None
+    task_id: int | None = None
+
+
+class Dispatcher(Protocol):
+    async def dispatch(self, notification: Notification) -> None: ...
+
+
+class LogDispatcher:
+    async def dispatch(self, notification: Notification) -> None:
+        logger.info(
+            "Reminder %s for user %s at %s: %s - %s",
+            notification.reminder_id,
+            notification.owner_id,
+            notification.fire_at.isoformat(),
+            notification.title,
+            notification.body,
+        )
+
+
+class MemoryDispatcher:
+    def __init__(self):
+        self.sent: list[Notification] = []
+
+    async def dispatch(self, notification: Notification) -> None:
+        self.sent.append(notification)
+
+
+DISPATCHERS = {"log": LogDispatcher, "memory": MemoryDispatcher}
+
+
+def load_dispatcher(name: str) -> Dispatcher:
+    # Either a built-in name or "package.module:ClassName".
+    if name in DISPATCHERS:
+        return DISPATCHERS[name]()
+    module_name, _, attribute = name.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+
+class LeaderLock:
+    # An exclusive flock on a file next to the database. The OS drops it when the holding process exits,
+    # so a standby worker takes over without a lease to expire. flock locks belong to the open file, so two
+    # schedulers in one process exclude each other as well.
+    def __init__(self, path: str | None):
+        self.path = path or None
+        self.held = False
+        self._file = None
+
+    def acquire(self) -> bool:
+        if not self.held and self.path is not None and fcntl is not None:
+            file = open(self.path, "a")
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                file.close()
+                return False
+            self._file = file
+        self.held = True
+        return True
+
+    def release(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self.held = False
+
+
+@dataclass
+class ReminderPlan:
+    reminder_id: int
+    owner_id: int
+    event_id: int | None
+    task_id: int | None
+    fire_at: datetime | None
+    kind: str = "event"
+    title: str = ""
+    body: str = ""
+    seq: int = 0
+
+
+def _fire_time(day: date, at: time, minutes_before: int) -> datetime:
+    return datetime.combine(day, at) - timedelta(minutes=minutes_before)
+
+
+def _next_event_fire(
+    event: Event, exceptions: dict[date, EventException], minutes_before: int, after: datetime
+) -> tuple[datetime, str] | None:
+    def fire(original: date) -> tuple[datetime, str] | None:
+        exception = exceptions.get(original)
+        if exception is not None and exception.is_cancelled:
+            return None
+        day = exception.date if exception is not None and exception.date else original
+        start = exception.start_time if exception is not None and exception.start_time else event.start_time
+        title = exception.title if exception is not None and exception.title else event.title
+        at = _fire_time(day, start, minutes_before)
+        return (at, title) if at > after else None
+
+    # Overrides can move an earlier occurrence past `after`, so they are checked on their own.
+    candidates = [
+        found
+        for original, exception in exceptions.items()
+        if exception.date and original != exception.date and is_occurrence(event, original) and (found := fire(original))
+    ]
+    if parse_rule(event.recurrence, event.recurrence_rule) is None:
+        found = fire(event.date)
+        return min(candidates + ([found] if found else []), default=None)
+
+    start = max(event.date, (after + timedelta(minutes=minutes_before)).date())
+    horizon = after.date() + timedelta(days=REMINDER_LOOKAHEAD_DAYS)
+    span = 31
+    while start <= horizon:
+        end = start + timedelta(days=span)
+        found = [result for day in event_occurrences(event, start, end) if (result := fire(day))]
+        if found:
+            return min(found + candidates)
+        if candidates and min(candidates)[0].date() <= end:
+            return min(candidates)
+        start, span = end + timedelta(days=1), span * 2
+    return min(candidates, default=None)
+
+
+def _chunks(values: list, size: int = 500):
+    for index in range(0, len(values), size):
+        yield values[index : index + size]
+
+
+def plan_reminders(db: Session, reminders: list[Reminder], after: datetime) -> list[ReminderPlan]:
+    event_ids = sorted({reminder.event_id for reminder in reminders if reminder.event_id})
+    task_ids = sorted({reminder.task_id for reminder in reminders if reminder.task_id})
+    events: dict[int, Event] = {}
+    exceptions: dict[int, dict[date, EventException]] = defaultdict(dict)
+    tasks: dict[int, Task] = {}
+    for chunk in _chunks(event_ids):
+        events.update((event.id, event) for event in db.query(Event).filter(Event.id.in_(chunk)))
+        for exception in db.query(EventException).filter(EventException.event_id.in_(chunk)):
+            exceptions[exception.event_id][exception.original_date] = exception
+    for chunk in _chunks(task_ids):
+        tasks.update((task.id, task) for task in db.query(Task).filter(Task.id.in_(chunk)))
+
+    plans = []
+    for reminder in reminders:
+        plan = ReminderPlan(reminder.id, reminder.owner_id, reminder.event_id, reminder.task_id, None)
+        if reminder.daily_summary:
+            fire_at = datetime.combine(after.date(), DAILY_SUMMARY_TIME)
+            plan.fire_at = fire_at if fire_at > after else fire_at + timedelta(days=1)
+            plan.kind, plan.title = "daily_summary", "Resumen del día"
+        elif reminder.event_id in events:
+            event = events[reminder.event_id]
+            found = _next_event_fire(event, exceptions[event.id], reminder.minutes_before, after)
+            if found:
+                plan.fire_at, plan.title = found
+                plan.body = reminder.custom_message or f"Comienza en {reminder.minutes_before} minutos"
+        elif reminder.task_id in tasks:
+            task = tasks[reminder.task_id]
+            if not task.is_done and task.due_date:
+                fire_at = _fire_time(task.due_date, TASK_DUE_TIME, reminder.minutes_before)
+                if fire_at > after:
+                    plan.kind, plan.fire_at, plan.title = "task", fire_at, task.title
+                    plan.body = reminder.custom_message or f"Vence el {task.due_date.isoformat()}"
+        plans.append(plan)
+    return plans
+
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        session_factory=ReadSessionLocal,
+        clock=datetime.now,
+        lock_path: str | None = REMINDER_SCHEDULER_LOCK,
+        retry_seconds: float = REMINDER_LEADER_RETRY_SECONDS,
+    ):
+        self.dispatcher = dispatcher
+        self.session_factory = session_factory
+        self.clock = clock
+        self.lock = LeaderLock(lock_path)
+        self.retry_seconds = retry_seconds
+        self.fired = 0
+        self.failed = 0
+        self._heap: list[tuple[datetime, int, int]] = []
+        self._plans: dict[int, ReminderPlan] = {}
+        self._by_event: dict[int, set[int]] = defaultdict(set)
+        self._by_task: dict[int, set[int]] = defaultdict(set)
+        self._by_owner: dict[int, set[int]] = defaultdict(set)
+        self._seq = 0
+        self._pending: list[tuple] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        if self.lock.acquire():
+            await self._lead()
+            self._task = asyncio.create_task(self._run())
+        else:
+            logger.info("Another worker runs the reminder scheduler; standing by")
+            self._task = asyncio.create_task(self._standby())
+
+    async def stop(self) -> None:
+        unsubscribe(self.notify_changes)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._loop = None
+        self.lock.release()
+
+    async def _lead(self) -> None:
+        subscribe(self.notify_changes)
+        for plan in await self._loop.run_in_executor(None, self._load, None, self.clock()):
+            self._schedule(plan)
+
+    async def _standby(self) -> None:
+        while not self.lock.acquire():
+            await asyncio.sleep(self.retry_seconds)
+        logger.info("Took over the reminder scheduler")
+        await self._lead()
+        await self._run()
+
+    def notify_changes(self, changes) -> None:
+        # Called from whichever thread released the writing connection.
+        relevant = [change for change in changes if change[1] in SCHEDULED_COLLECTIONS]
+        loop = self._loop
+        if relevant and loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._enqueue, relevant)
+
+    def stats(self) -> dict:
+        upcoming = self.next_fire_at()
+        return {
+            "leader": self.lock.held,
+            "scheduled": sum(1 for plan in self._plans.values() if plan.fire_at),
+            "heap_size": len(self._heap),
+            "fired": self.fired,
+            "failed": self.failed,
+            "next_fire_at": upcoming.isoformat() if upcoming else None,
+        }
+
+    def next_fire_at(self) -> datetime | None:
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def _enqueue(self, changes) -> None:
+        self._pending.extend(changes)
+        self._wakeup.set()
+
+    def _load(self, reminder_ids: set[int] | None, after: datetime) -> list[ReminderPlan]:
+        db = self.session_factory()
+        try:
+            plans = []
+            if reminder_ids is None:
+                query = db.query(Reminder).order_by(Reminder.id).yield_per(LOAD_BATCH_SIZE)
+                batch = []
+                for reminder in query:
+                    batch.append(reminder)
+                    if len(batch) == LOAD_BATCH_SIZE:
+                        plans += plan_reminders(db, batch, after)
+                        batch = []
+                return plans + plan_reminders(db, batch, after)
+            for chunk in _chunks(sorted(reminder_ids)):
+                plans += plan_reminders(db, db.query(Reminder).filter(Reminder.id.in_(chunk)).all(), after)
+            return plans
+        finally:
+            db.close()
+
+    def _summaries(self, owners: set[int], day: date) -> dict[int, str]:
+        db = self.session_factory()
+        try:
+            digests = build_digests(db, day, sorted(owners))
+            return {owner_id: digest.body for owner_id, digest in digests.items()}
+        finally:
+            db.close()
+
+    def _is_current(self, entry: tuple[datetime, int, int]) -> bool:
+        plan = self._plans.get(entry[2])
+        return plan is not None and plan.seq == entry[1]
+
+    def _unschedule(self, reminder_id: int) -> None:
+        plan = self._plans.pop(reminder_id, None)
+        if plan is None:
+            return
+        self._by_owner[plan.owner_id].discard(reminder_id)
+        if plan.event_id:
+            self._by_event[plan.event_id].discard(reminder_id)
+        if plan.task_id:
+            self._by_task[plan.task_id].discard(reminder_id)
+
+    def _schedule(self, plan: ReminderPlan) -> None:
+        # Stale heap entries are skipped lazily; their seq no longer matches the reminder's current plan.
+        self._unschedule(plan.reminder_id)
+        self._seq += 1
+        plan.seq = self._seq
+        self._plans[plan.reminder_id] = plan
+        self._by_owner[plan.owner_id].add(plan.reminder_id)
+        if plan.event_id:
+            self._by_event[plan.event_id].add(plan.reminder_id)
+        if plan.task_id:
+            self._by_task[plan.task_id].add(plan.reminder_id)
+        if plan.fire_at is not None:
+            heapq.heappush(self._heap, (plan.fire_at, plan.seq, plan.reminder_id))
+        if len(self._heap) > 2 * len(self._plans) + 1024:
+            self._heap = [entry for entry in self._heap if self._is_current(entry)]
+            heapq.heapify(self._heap)
+
+    def _affected(self, changes) -> set[int]:
+        affected: set[int] = set()
+        for owner_id, collection, row_id, _deleted in changes:
+            if collection == "reminders":
+                affected.add(row_id)
+            elif collection == "events":
+                affected |= self._by_event.get(row_id, set())
+            elif collection == "tasks":
+                affected |= self._by_task.get(row_id, set())
+            else:
+                # Exceptions are only known by id; re-plan the owner's event reminders.
+                affected |= {rid for rid in self._by_owner.get(owner_id, ()) if self._plans[rid].event_id}
+        return affected
+
+    async def _refresh(self, reminder_ids: set[int]) -> None:
+        plans = await self._loop.run_in_executor(None, self._load, reminder_ids, self.clock())
+        for reminder_id in reminder_ids - {plan.reminder_id for plan in plans}:
+            self._unschedule(reminder_id)
+        for plan in plans:
+            self._schedule(plan)
+
+    def _pop_due(self, now: datetime) -> list[ReminderPlan]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if self._is_current(entry):
+                due.append(self._plans[entry[2]])
+        return due
+
+    async def _fire(self, due: list[ReminderPlan]) -> None:
+        summary_owners = {plan.owner_id for plan in due if plan.kind == "daily_summary"}
+        summaries = {}
+        if summary_owners:
+            summaries = await self._loop.run_in_executor(None, self._summaries, summary_owners, self.clock().date())
+        for plan in due:
+            notification = Notification(
+                reminder_id=plan.reminder_id,
+                owner_id=plan.owner_id,
+                kind=plan.kind,
+                title=plan.title,
+                body=summaries.get(plan.owner_id, plan.body) if plan.kind == "daily_summary" else plan.body,
+                fire_at=plan.fire_at,
+                event_id=plan.event_id,
+                task_id=plan.task_id,
+            )
+            try:
+                await self.dispatcher.dispatch(notification)
+                self.fired += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Reminder %s could not be dispatched", plan.reminder_id)
+        await self._refresh({plan.reminder_id for plan in due})
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                if self._pending:
+                    changes, self._pending = self._pending, []
+                    await self._refresh(self._affected(changes))
+                due = self._pop_due(self.clock())
+                if due:
+                    await self._fire(due)
+                    continue
+            except Exception:
+                logger.exception("Reminder scheduler iteration failed")
+            upcoming = self.next_fire_at()
+            timeout = MAX_SLEEP_SECONDS
+            if upcoming is not None:
+                timeout = min(timeout, max(0.0, (upcoming - self.clock()).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+reminder_scheduler = ReminderScheduler(load_dispatcher(REMINDER_DISPATCHER))
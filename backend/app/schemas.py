@@ -63,6 +63,81 @@ class EventOut(EventBase):
     color: str
 
 
+class EventOccurrenceOut(EventOut):
+    occurrence_date: datetime.date
+    is_exception: bool = False
+
+
+class CalendarDay(BaseModel):
+    date: datetime.date
+    # False for the days of neighbouring months that pad a month grid to whole weeks.
+    in_period: bool = True
+    events: list[EventOccurrenceOut] = []
+    counts: dict[str, int] = {}
+
+
+class CalendarGrid(BaseModel):
+    view: str
+    anchor: datetime.date
+    start: datetime.date
+    end: datetime.date
+    days: list[CalendarDay]
+    counts: dict[str, int]
+
+
+class CalendarFeedOut(BaseModel):
+    url: str
+    created_at: datetime.datetime
+
+
+class EventConflict(BaseModel):
+    event_id: int
+    title: str
+    date: datetime.date
+    start_time: datetime.time
+    end_time: datetime.time
+    occurrence_date: datetime.date
+
+
+class EventWriteOut(EventOut):
+    conflicts: list[EventConflict] = []
+
+
+class ConflictPair(BaseModel):
+    date: datetime.date
+    first: EventConflict
+    second: EventConflict
+
+
+class FreeSlot(BaseModel):
+    date: datetime.date
+    start_time: datetime.time
+    end_time: datetime.time
+
+
+class EventExceptionBase(BaseModel):
+    original_date: datetime.date
+    is_cancelled: bool = False
+    title: Optional[str] = None
+    date: Optional[datetime.date] = None
+    start_time: Optional[datetime.time] = None
+    end_time: Optional[datetime.time] = None
+    location: Optional[str] = None
+    notes: Optional[str] = None
+
+
+class EventExceptionCreate(EventExceptionBase):
+    pass
+
+
+class EventExceptionOut(EventExceptionBase):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    owner_id: int
+    event_id: int
+
+
 # ================= TASKS =================
 
 class TaskBase(BaseModel):
@@ -152,6 +227,22 @@ class StudentOut(StudentBase):
     owner_id: int
 
 
+class StudentImportError(BaseModel):
+    row: int
+    field: Optional[str] = None
+    message: str
+
+
+class StudentImportResult(BaseModel):
+    done: bool = False
+    processed: int = 0
+    created: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    errors: list[StudentImportError] = []
+    error: Optional[str] = None
+
+
 # ================= OBSERVATIONS =================
 
 class ObservationBase(BaseModel):
@@ -204,6 +295,44 @@ class AttendanceOut(AttendanceBase):
     owner_id: int
 
 
+class AttendanceBatchEntry(BaseModel):
+    student_id: int
+    status: str
+
+
+class AttendanceBatch(BaseModel):
+    date: datetime.date
+    group_name: Optional[str] = None
+    default_status: Optional[str] = None
+    entries: list[AttendanceBatchEntry] = Field(default_factory=list, max_length=500)
+
+
+class AttendanceBatchResult(BaseModel):
+    student_id: int
+    result: str
+    attendance: Optional[AttendanceOut] = None
+    error: Optional[str] = None
+
+
+class AttendanceBatchOut(BaseModel):
+    date: datetime.date
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    results: list[AttendanceBatchResult] = []
+
+
+class AttendanceStats(BaseModel):
+    group_name: Optional[str] = None
+    student_id: Optional[int] = None
+    full_name: Optional[str] = None
+    month: Optional[str] = None
+    students: Optional[int] = None
+    total: int = 0
+    by_status: dict[str, int] = {}
+    rate: Optional[float] = None
+
+
 # ================= PLANNING =================
 
 class PlanningBase(BaseModel):
@@ -256,10 +385,89 @@ class DailyContentOut(DailyContentBase):
     owner_id: int
 
 
+# ================= DAILY DIGEST =================
+
+class DailyDigest(BaseModel):
+    owner_id: int
+    date: datetime.date
+    events: list[EventOccurrenceOut] = []
+    tasks: list[TaskOut] = []
+    birthdays: list[StudentOut] = []
+    plannings: list[PlanningOut] = []
+    body: str = ""
+
+
 # ================= STUDENT PROFILE (AGREGADO FINAL) =================
 
+class AttendanceMonth(BaseModel):
+    month: str
+    total: int = 0
+    by_status: dict[str, int] = {}
+    rate: Optional[float] = None
+
+
+class StudentProfileSummary(BaseModel):
+    attendance_total: int = 0
+    attendance_by_status: dict[str, int] = {}
+    attendance_rate: Optional[float] = None
+    attendance_by_month: list[AttendanceMonth] = []
+    observations_total: int = 0
+    latest_observation: Optional[ObservationOut] = None
+    contents_total: int = 0
+    latest_content_date: Optional[datetime.date] = None
+
+
 class StudentProfile(BaseModel):
     student: StudentOut
-    attendance: list[AttendanceOut]
-    observations: list[ObservationOut]
-    contents: list[DailyContentOut]
+    attendance: list[AttendanceOut] = []
+    observations: list[ObservationOut] = []
+    contents: list[DailyContentOut] = []
+    attendance_next_cursor: Optional[str] = None
+    observations_next_cursor: Optional[str] = None
+    contents_next_cursor: Optional[str] = None
+    summary: StudentProfileSummary
+
+
+# ================= SEARCH =================
+
+class SearchResult(BaseModel):
+    kind: str
+    id: int
+    title: str
+    snippet: str
+    rank: float
+
+
+# ================= SYNC =================
+
+class SyncChanges(BaseModel):
+    events: list[EventOut] = []
+    event_exceptions: list[EventExceptionOut] = []
+    tasks: list[TaskOut] = []
+    reminders: list[ReminderOut] = []
+    students: list[StudentOut] = []
+    observations: list[ObservationOut] = []
+    attendance: list[AttendanceOut] = []
+    plannings: list[PlanningOut] = []
+    contents: list[DailyContentOut] = []
+
+
+class SyncResponse(BaseModel):
+    token: str
+    has_more: bool
+    changes: SyncChanges
+    deleted: dict[str, list[int]]
+
+
+# ================= BOOTSTRAP =================
+
+class Bootstrap(BaseModel):
+    sync_token: Optional[str] = None
+    events: Optional[list[EventOut]] = None
+    tasks: Optional[list[TaskOut]] = None
+    reminders: Optional[list[ReminderOut]] = None
+    students: Optional[list[StudentOut]] = None
+    observations: Optional[list[ObservationOut]] = None
+    attendance: Optional[list[AttendanceOut]] = None
+    plannings: Optional[list[PlanningOut]] = None
+    contents: Optional[list[DailyContentOut]] = None
@@ -0,0 +1,125 @@
+import re
+
+from sqlalchemy import column, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+# kind -> (code, table, title expression, body expression)
+SEARCH_SOURCES = {
+    "events": (1, "events", "{row}.title", "coalesce({row}.notes, '') || ' ' || coalesce({row}.location, '')"),
+    "tasks": (2, "tasks", "{row}.title", "coalesce({row}.notes, '')"),
+    "observations": (
+        3,
+        "observations",
+        "coalesce({row}.behavior_mood, '') || ' ' || coalesce({row}.participation, '')",
+        "{row}.notes",
+    ),
+    "contents": (4, "daily_contents", "{row}.topic", "coalesce({row}.notes, '')"),
+    "students": (5, "students", "{row}.full_name", "coalesce({row}.group_name, '') || ' ' || coalesce({row}.guardian_contact, '')"),
+}
+KINDS_BY_CODE = {code: kind for kind, (code, *_rest) in SEARCH_SOURCES.items()}
+ROWID_STRIDE = 8
+
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE search_index USING fts5("
+    "scope, title, body, tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+
+def _values(kind: str, row: str) -> tuple[str, str, str, str]:
+    code, _table, title, body = SEARCH_SOURCES[kind]
+    return (
+        f"{row}.id * {ROWID_STRIDE} + {code}",
+        f"'u' || {row}.owner_id || ' k{kind}'",
+        title.format(row=row),
+        body.format(row=row),
+    )
+
+
+def _trigger_statements(kind: str) -> list[str]:
+    table = SEARCH_SOURCES[kind][1]
+    rowid, scope, title, body = _values(kind, "new")
+    old_rowid = _values(kind, "old")[0]
+    insert = f"INSERT INTO search_index(rowid, scope, title, body) VALUES ({rowid}, {scope}, {title}, {body});"
+    delete = f"DELETE FROM search_index WHERE rowid = {old_rowid};"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS search_{table}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS search_{table}_au AFTER UPDATE ON {table} BEGIN {delete} {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS search_{table}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+    ]
+
+
+def _backfill(connection) -> None:
+    for kind, (_code, table, *_rest) in SEARCH_SOURCES.items():
+        rowid, scope, title, body = _values(kind, table)
+        connection.exec_driver_sql(
+            f"INSERT INTO search_index(rowid, scope, title, body) SELECT {rowid}, {scope}, {title}, {body} FROM {table}"
+        )
+
+
+def init_search_index(connection: Connection) -> None:
+    exists = connection.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'").first()
+    if not exists:
+        connection.exec_driver_sql(CREATE_INDEX)
+        _backfill(connection)
+    for kind in SEARCH_SOURCES:
+        for statement in _trigger_statements(kind):
+            connection.exec_driver_sql(statement)
+
+
+def rebuild_search_index(engine: Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM search_index")
+        _backfill(connection)
+
+
+def match_expression(q: str, owner_id: int, kinds: list[str] | None = None, columns: str = "{title body}") -> str | None:
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    scope = f'"u{owner_id}"'
+    if kinds:
+        kind_terms = " OR ".join(f'"k{kind}"' for kind in kinds)
+        scope = f"{scope} AND ({kind_terms})"
+    phrases = " ".join(f'"{term}"*' for term in terms)
+    return f"scope : ({scope}) AND {columns} : ({phrases})"
+
+
+def matching_ids(kind: str, owner_id: int, q: str, columns: str = "{title body}"):
+    expression = match_expression(q, owner_id, [kind], columns)
+    if expression is None:
+        return None
+    return (
+        text(f"SELECT rowid / {ROWID_STRIDE} AS ref_id FROM search_index WHERE search_index MATCH :match")
+        .bindparams(match=expression)
+        .columns(column("ref_id"))
+    )
+
+
+def filter_by_search(query, model, kind: str, owner_id: int, q: str, columns: str = "{title body}"):
+    ids = matching_ids(kind, owner_id, q, columns)
+    return query if ids is None else query.filter(model.id.in_(ids))
+
+
+def search(db: Session, owner_id: int, q: str, kinds: list[str] | None = None, limit: int = 20) -> list[dict]:
+    expression = match_expression(q, owner_id, kinds)
+    if expression is None:
+        return []
+    rows = db.execute(
+        text(
+            "SELECT rowid, title, snippet(search_index, 2, '', '', '…', 12) AS snippet, "
+            "bm25(search_index, 0.0, 10.0, 1.0) AS rank "
+            "FROM search_index WHERE search_index MATCH :match ORDER BY rank LIMIT :limit"
+        ),
+        {"match": expression, "limit": limit},
+    )
+    return [
+        {
+            "kind": KINDS_BY_CODE[row.rowid % ROWID_STRIDE],
+            "id": row.rowid // ROWID_STRIDE,
+            "title": row.title.strip(),
+            "snippet": row.snippet.strip(),
+            "rank": -row.rank,
+        }
+        for row in rows
+    ]
@@ -0,0 +1,67 @@
+import os
+from functools import cache
+
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import Query
+
+try:
+    import orjson
+except ImportError:  # without orjson the routes keep serializing through their response models
+    orjson = None
+
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_ENABLED", "true").lower() == "true" and orjson is not None
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+@cache
+def _schema_columns(model, schema: type[BaseModel]) -> tuple | None:
+    columns = inspect(model).columns
+    if any(name not in columns for name in schema.model_fields):
+        return None
+    return tuple(getattr(model, name) for name in schema.model_fields)
+
+
+def fast_columns(query, schema: type[BaseModel]) -> tuple | None:
+    # The columns behind every field of `schema`, or None when the query cannot skip the response model.
+    if not FAST_JSON_ENABLED:
+        return None
+    return _schema_columns(query.column_descriptions[0]["entity"], schema)
+
+
+def select_columns(query, columns: tuple):
+    # Works on both a legacy Query and a select(), like the routers' filter helpers.
+    if isinstance(query, Query):
+        return query.with_entities(*columns)
+    return query.with_only_columns(*columns)
+
+
+def row_dicts(rows, columns: tuple) -> list[dict]:
+    names = [column.key for column in columns]
+    return [dict(zip(names, row)) for row in rows]
+
+
+def ndjson_line(names: list[str], row) -> bytes:
+    return orjson.dumps(dict(zip(names, row))) + b"\n"
+
+
+def fast_list(query, schema: type[BaseModel], response: Response):
+    columns = fast_columns(query, schema)
+    if columns is None:
+        return query.all()
+    return FastJSONResponse(row_dicts(select_columns(query, columns).all(), columns), headers=dict(response.headers))
+
+
+async def fast_list_async(db, statement, schema: type[BaseModel], response: Response):
+    columns = fast_columns(statement, schema)
+    if columns is None:
+        return (await db.scalars(statement)).all()
+    rows = (await db.execute(select_columns(statement, columns))).all()
+    return FastJSONResponse(row_dicts(rows, columns), headers=dict(response.headers))
@@ -0,0 +1,183 @@
+import codecs
+import csv
+import io
+import os
+import zipfile
+from datetime import datetime
+from itertools import islice
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .changes import record_changes
+from .database import SessionLocal
+from .models import Student
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+SNIFF_BYTES = 64 * 1024
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+XLSX_SUPPORTED = openpyxl is not None
+
+# Header spellings accepted for each StudentCreate field, compared after lower-casing.
+COLUMN_ALIASES = {
+    "full_name": ("full_name", "nombre", "nombre completo", "alumno", "name"),
+    "age": ("age", "edad"),
+    "birthday": ("birthday", "fecha de nacimiento", "fecha_nacimiento", "nacimiento"),
+    "group_name": ("group_name", "grupo", "curso", "group"),
+    "guardian_contact": ("guardian_contact", "contacto", "tutor", "contacto tutor"),
+    "progress_status": ("progress_status", "estado", "progreso"),
+}
+HEADER_FIELDS = {alias: field for field, aliases in COLUMN_ALIASES.items() for alias in aliases}
+
+students_adapter = TypeAdapter(list[schemas.StudentCreate])
+
+
+class InvalidImportFile(ValueError):
+    pass
+
+
+def is_xlsx(filename: str | None, content_type: str | None) -> bool:
+    return content_type == XLSX_MEDIA_TYPE or (filename or "").lower().endswith(".xlsx")
+
+
+def _fields(header) -> list[str | None]:
+    return [HEADER_FIELDS.get(str(name or "").strip().lower()) for name in header]
+
+
+def _record(fields: list[str | None], values) -> dict:
+    record = {}
+    for field, value in zip(fields, values):
+        if field is None or value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+        elif isinstance(value, datetime):
+            value = value.date()
+        record[field] = value
+    return record
+
+
+def _csv_records(file):
+    sample = file.read(SNIFF_BYTES)
+    file.seek(0)
+    try:
+        text = codecs.getincrementaldecoder("utf-8-sig")().decode(sample, final=False)
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        # Spreadsheet exports on Windows are usually cp1252 rather than UTF-8.
+        text = sample.decode("cp1252", errors="replace")
+        encoding = "cp1252"
+    try:
+        dialect = csv.Sniffer().sniff(text, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.reader(io.TextIOWrapper(file, encoding=encoding, errors="replace", newline=""), dialect)
+    try:
+        fields = _fields(next(reader, []))
+        for values in reader:
+            if any(value.strip() for value in values):
+                yield reader.line_num, _record(fields, values)
+    except csv.Error as exc:
+        raise InvalidImportFile(f"CSV no válido (línea {reader.line_num}): {exc}") from exc
+
+
+def _xlsx_records(file):
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, OSError) as exc:
+        raise InvalidImportFile("XLSX no válido") from exc
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        fields = _fields(next(rows, ()))
+        for row, values in enumerate(rows, start=2):
+            if any(value not in (None, "") for value in values):
+                yield row, _record(fields, values)
+    finally:
+        workbook.close()
+
+
+def read_records(file, xlsx: bool):
+    return _xlsx_records(file) if xlsx else _csv_records(file)
+
+
+def _key(group_name: str | None, full_name: str) -> tuple[str, str]:
+    return " ".join((group_name or "").split()).casefold(), " ".join(full_name.split()).casefold()
+
+
+def _validate(batch: list[tuple[int, dict]], errors: list[schemas.StudentImportError]) -> list[schemas.StudentCreate]:
+    # The whole batch goes through one TypeAdapter call; only a failing batch is validated a second time.
+    records = [record for _row, record in batch]
+    try:
+        return students_adapter.validate_python(records)
+    except ValidationError as exc:
+        failed: set[int] = set()
+        for error in exc.errors():
+            index, *field = error["loc"]
+            failed.add(index)
+            errors.append(
+                schemas.StudentImportError(row=batch[index][0], field=str(field[0]) if field else None, message=error["msg"])
+            )
+        return students_adapter.validate_python([record for index, record in enumerate(records) if index not in failed])
+
+
+def import_students(db: Session, owner_id: int, records):
+    # Yields one progress snapshot per committed batch and a final summary with done=True.
+    summary = schemas.StudentImportResult()
+    seen = {
+        _key(group_name, full_name)
+        for group_name, full_name in db.execute(
+            select(Student.group_name, Student.full_name).where(Student.owner_id == owner_id)
+        )
+    }
+    records = iter(records)
+    while batch := list(islice(records, IMPORT_BATCH_SIZE)):
+        errors: list[schemas.StudentImportError] = []
+        students = _validate(batch, errors)
+        rows = []
+        for student in students:
+            key = _key(student.group_name, student.full_name)
+            if key in seen:
+                summary.duplicates += 1
+                continue
+            seen.add(key)
+            rows.append({"owner_id": owner_id, **student.model_dump()})
+
+        if rows:
+            # Core insert on the table: the ORM bulk path falls back to one statement per row when RETURNING ids.
+            table = Student.__table__
+            ids = db.execute(insert(table).returning(table.c.id), rows).scalars().all()
+            record_changes(db.connection(), owner_id, "students", ids)
+            db.commit()
+
+        summary.processed += len(batch)
+        summary.created += len(rows)
+        summary.failed += len({error.row for error in errors})
+        summary.errors.extend(errors[: max(0, IMPORT_MAX_ERRORS - len(summary.errors))])
+        yield summary.model_copy(update={"errors": errors})
+
+    summary.done = True
+    yield summary
+
+
+def stream_import(owner_id: int, file, xlsx: bool):
+    # Runs after the request's session and upload are closed, so it owns both its session and its copy of the file.
+    db = SessionLocal()
+    try:
+        for progress in import_students(db, owner_id, read_records(file, xlsx)):
+            yield progress.model_dump_json() + "\n"
+    except InvalidImportFile as exc:
+        yield schemas.StudentImportResult(done=True, error=str(exc)).model_dump_json() + "\n"
+    finally:
+        db.close()
+        file.close()
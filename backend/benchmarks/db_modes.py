@@ -0,0 +1,80 @@
+"""Throughput of the hot read routes with DATABASE_MODE=sync versus DATABASE_MODE=async.
+
+Run from backend/:  python -m benchmarks.db_modes --concurrency 32 --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.login_storm import percentile
+
+EMAIL = "modes@example.com"
+PASSWORD = "modes-password"
+PATHS = ("/api/events", "/api/tasks", "/api/students")
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        await client.post("/api/auth/register", json={"email": EMAIL, "full_name": "Modes", "password": PASSWORD})
+        response = await client.post("/api/auth/login", data={"username": EMAIL, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for index in range(args.rows):
+            day = f"2026-03-{index % 28 + 1:02d}"
+            event = {"title": f"Clase {index}", "date": day, "start_time": "08:00", "end_time": "09:00", "category": "subject"}
+            await client.post("/api/events", json=event, headers=headers)
+            await client.post("/api/tasks", json={"title": f"Tarea {index}", "due_date": day}, headers=headers)
+            await client.post("/api/students", json={"full_name": f"Alumno {index}"}, headers=headers)
+
+        latencies: list[float] = []
+        queue = iter(range(args.requests))
+
+        async def reader() -> None:
+            for index in queue:
+                started = time.perf_counter()
+                response = await client.get(PATHS[index % len(PATHS)], headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(reader() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(
+        f"{os.environ['DATABASE_MODE']:<6} req/s={len(latencies) / elapsed:8.1f} "
+        f"p50={percentile(latencies, 50):8.2f}ms p95={percentile(latencies, 95):8.2f}ms p99={percentile(latencies, 99):8.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modes", default="sync,async", help="comma separated DATABASE_MODE values to compare")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent GET clients")
+    parser.add_argument("--requests", type=int, default=2000, help="GET requests per mode")
+    parser.add_argument("--rows", type=int, default=50, help="events, tasks and students seeded")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(run(args))
+        return
+    # The mode is read once at import time, so each one runs in its own interpreter and database.
+    for mode in args.modes.split(","):
+        with tempfile.TemporaryDirectory() as workdir:
+            env = {**os.environ, "DATABASE_MODE": mode, "DATABASE_URL": f"sqlite:///{workdir}/bench.db"}
+            env.setdefault("BCRYPT_ROUNDS", "4")
+            env.setdefault("REMINDER_SCHEDULER_ENABLED", "false")
+            subprocess.run([sys.executable, "-m", "benchmarks.db_modes", "--worker", *sys.argv[1:]], env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Throughput and p50/p95/p99 latency of every router against a seeded school database.
+
+Run from backend/:
+    python -m benchmarks.endpoints --users 200 --output benchmarks/results/latest.json
+    python -m benchmarks.endpoints --users 200 --baseline benchmarks/baseline.json
+
+The seeded database is cached under benchmarks/.data and copied before each run, so write
+scenarios never leak into the next run. With --baseline the run exits non-zero when an
+endpoint's p95 grew by more than --tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+import httpx
+
+from benchmarks.login_storm import percentile
+from benchmarks.seed import PASSWORD, STUDENTS_PER_USER, Layout, layout_path
+
+DATA_DIR = Path("benchmarks/.data")
+DEFAULT_END = date(2026, 3, 20)
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    json: dict | None = None
+    data: dict | None = None
+    files: dict | None = None
+    headers: dict = field(default_factory=dict)
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: Callable[[Layout, int, random.Random], Request]
+    requests: int | None = None
+    authenticated: bool = True
+
+
+def _day(layout: Layout, rng: random.Random, days: int = 180) -> date:
+    day = layout.end_date - timedelta(days=rng.randint(0, days))
+    return day - timedelta(days=max(0, day.weekday() - 4))
+
+
+def _student(layout: Layout, user_id: int, rng: random.Random) -> int:
+    return rng.choice(layout.student_ids(user_id))
+
+
+def _roll_call(layout: Layout, user_id: int, rng: random.Random) -> Request:
+    entries = [
+        {"student_id": student_id, "status": rng.choice(("presente", "presente", "ausente", "tarde"))}
+        for student_id in layout.student_ids(user_id)
+    ]
+    return Request("POST", "/api/pedagogical/attendance/batch", json={"date": _day(layout, rng).isoformat(), "entries": entries})
+
+
+def _import(layout: Layout, user_id: int, rng: random.Random) -> Request:
+    group = f"Importado {rng.randint(1, 10**6)}"
+    rows = "\n".join(f"Alumno {index};{group};{rng.randint(6, 12)}" for index in range(STUDENTS_PER_USER))
+    body = f"nombre;grupo;edad\n{rows}\n".encode()
+    return Request("POST", "/api/students/import", files={"file": ("alumnos.csv", body, "text/csv")})
+
+
+SCENARIOS = [
+    Scenario("GET /api/health", lambda layout, user, rng: Request("GET", "/api/health"), authenticated=False),
+    Scenario(
+        "POST /api/auth/login",
+        lambda layout, user, rng: Request("POST", "/api/auth/login", data={"username": layout.email(user), "password": PASSWORD}),
+        requests=40,
+        authenticated=False,
+    ),
+    Scenario("GET /api/events", lambda layout, user, rng: Request("GET", "/api/events?limit=50")),
+    Scenario(
+        "GET /api/events/occurrences",
+        lambda layout, user, rng: Request(
+            "GET",
+            f"/api/events/occurrences?start_date={(layout.end_date - timedelta(days=30)).isoformat()}&end_date={layout.end_date.isoformat()}",
+        ),
+    ),
+    Scenario("GET /api/events/export.ics", lambda layout, user, rng: Request("GET", "/api/events/export.ics")),
+    Scenario(
+        "GET /api/events/calendar",
+        lambda layout, user, rng: Request("GET", f"/api/events/calendar?view=month&anchor={_day(layout, rng).isoformat()}"),
+    ),
+    Scenario(
+        "GET /api/events/{id}/exceptions",
+        lambda layout, user, rng: Request("GET", f"/api/events/{rng.choice(layout.event_ids(user))}/exceptions"),
+    ),
+    Scenario(
+        "POST /api/events",
+        lambda layout, user, rng: Request(
+            "POST",
+            "/api/events",
+            json={"title": "Tutoría", "date": layout.end_date.isoformat(), "start_time": "16:00", "end_time": "17:00", "category": "personal"},
+        ),
+    ),
+    Scenario(
+        "PUT /api/events/{id}",
+        lambda layout, user, rng: Request("PUT", f"/api/events/{rng.choice(layout.event_ids(user))}", json={"notes": "Actualizado"}),
+    ),
+    Scenario("GET /api/tasks", lambda layout, user, rng: Request("GET", "/api/tasks")),
+    Scenario(
+        "POST /api/tasks",
+        lambda layout, user, rng: Request("POST", "/api/tasks", json={"title": "Preparar examen", "due_date": layout.end_date.isoformat()}),
+    ),
+    Scenario(
+        "PUT /api/tasks/{id}",
+        lambda layout, user, rng: Request("PUT", f"/api/tasks/{rng.choice(layout.task_ids(user))}", json={"is_done": rng.random() < 0.5}),
+    ),
+    Scenario("GET /api/reminders", lambda layout, user, rng: Request("GET", "/api/reminders")),
+    Scenario(
+        "GET /api/reminders/daily-summary",
+        lambda layout, user, rng: Request("GET", f"/api/reminders/daily-summary?day={_day(layout, rng, 5).isoformat()}"),
+    ),
+    Scenario("GET /api/students", lambda layout, user, rng: Request("GET", "/api/students")),
+    Scenario("GET /api/students/{id}", lambda layout, user, rng: Request("GET", f"/api/students/{_student(layout, user, rng)}")),
+    Scenario(
+        "GET /api/students/{id}/profile",
+        lambda layout, user, rng: Request("GET", f"/api/students/{_student(layout, user, rng)}/profile"),
+    ),
+    Scenario("POST /api/students/import", _import, requests=50),
+    Scenario("GET /api/pedagogical/observations", lambda layout, user, rng: Request("GET", "/api/pedagogical/observations?limit=50")),
+    Scenario("GET /api/pedagogical/attendance", lambda layout, user, rng: Request("GET", "/api/pedagogical/attendance?limit=100")),
+    Scenario("GET /api/pedagogical/plannings", lambda layout, user, rng: Request("GET", "/api/pedagogical/plannings?limit=50")),
+    Scenario("GET /api/pedagogical/contents", lambda layout, user, rng: Request("GET", "/api/pedagogical/contents?limit=50")),
+    Scenario(
+        "POST /api/pedagogical/observations",
+        lambda layout, user, rng: Request(
+            "POST",
+            "/api/pedagogical/observations",
+            json={"student_id": _student(layout, user, rng), "date": layout.end_date.isoformat(), "notes": "Buen trabajo en grupo"},
+        ),
+    ),
+    Scenario("POST /api/pedagogical/attendance/batch", _roll_call),
+    Scenario(
+        "GET /api/pedagogical/attendance/stats/groups",
+        lambda layout, user, rng: Request("GET", "/api/pedagogical/attendance/stats/groups"),
+    ),
+    Scenario(
+        "GET /api/pedagogical/attendance/stats/months",
+        lambda layout, user, rng: Request("GET", "/api/pedagogical/attendance/stats/months"),
+    ),
+    Scenario("GET /api/bootstrap", lambda layout, user, rng: Request("GET", "/api/bootstrap")),
+    Scenario("GET /api/sync", lambda layout, user, rng: Request("GET", "/api/sync?limit=200")),
+    Scenario("GET /api/search", lambda layout, user, rng: Request("GET", "/api/search?q=matem")),
+]
+
+
+def seeded_database(users: int, years: int, seed: int, end: date) -> Path:
+    path = DATA_DIR / f"school-{users}u-{years}y-{seed}-{end.isoformat()}.db"
+    if not path.exists():
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        # Seeding imports the app against its own database URL, so it runs in a separate interpreter.
+        command = [sys.executable, "-m", "benchmarks.seed", "--db", str(path), "--users", str(users), "--years", str(years)]
+        command += ["--seed", str(seed), "--end", end.isoformat()]
+        subprocess.run(command, check=True)
+    return path
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, layout: Layout, tokens: dict, requests: int, concurrency: int, seed: int
+) -> dict:
+    rng = random.Random(f"{seed}:{scenario.name}")
+    planned = []
+    for _ in range(scenario.requests or requests):
+        user_id = rng.randint(1, layout.users)
+        planned.append((user_id, scenario.build(layout, user_id, rng)))
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    queue = iter(planned)
+
+    async def worker() -> None:
+        for user_id, request in queue:
+            headers = dict(request.headers)
+            if scenario.authenticated:
+                headers["Authorization"] = f"Bearer {tokens[user_id]}"
+            started = time.perf_counter()
+            response = await client.request(
+                request.method, request.path, json=request.json, data=request.data, files=request.files, headers=headers
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+async def run(args: argparse.Namespace, layout: Layout) -> dict:
+    from app.auth import create_access_token
+    from app.main import app
+
+    tokens = {user_id: create_access_token(layout.email(user_id)) for user_id in range(1, layout.users + 1)}
+    selected = [scenario for scenario in SCENARIOS if not args.only or any(term in scenario.name for term in args.only)]
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for scenario in selected:
+            results[scenario.name] = await run_scenario(
+                client, scenario, layout, tokens, args.requests, args.concurrency, args.seed
+            )
+            result = results[scenario.name]
+            print(
+                f"{scenario.name:<48} {result['rps']:9.1f} req/s  p50={result['p50_ms']:8.2f}ms "
+                f"p95={result['p95_ms']:8.2f}ms p99={result['p99_ms']:8.2f}ms  errors={result['errors']}"
+            )
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    print(f"\n{'endpoint':<48} {'base p95':>10} {'p95':>10} {'change':>8}")
+    for name, result in results["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            print(f"{name:<48} {'-':>10} {result['p95_ms']:10.2f} {'new':>8}")
+            continue
+        change = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<48} {before['p95_ms']:10.2f} {result['p95_ms']:10.2f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="seeded teachers (30 students each)")
+    parser.add_argument("--years", type=int, default=1, help="years of attendance history")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--end", type=date.fromisoformat, default=DEFAULT_END, help="last day of seeded history")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients per endpoint")
+    parser.add_argument("--only", action="append", help="run only endpoints whose name contains this text")
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/results/latest.json"))
+    parser.add_argument("--baseline", type=Path, help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth before failing (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    os.environ.setdefault("REMINDER_SCHEDULER_ENABLED", "false")
+    seeded = seeded_database(args.users, args.years, args.seed, args.end)
+    layout = Layout.load(layout_path(seeded))
+    with tempfile.TemporaryDirectory() as workdir:
+        working = Path(workdir) / "bench.db"
+        shutil.copyfile(seeded, working)
+        os.environ["DATABASE_URL"] = f"sqlite:///{working}"
+        started = time.perf_counter()
+        endpoints = asyncio.run(run(args, layout))
+
+    results = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "users": args.users,
+            "years": args.years,
+            "seed": args.seed,
+            "end": args.end.isoformat(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "database_mode": os.getenv("DATABASE_MODE", "sync"),
+            "duration_s": round(time.perf_counter() - started, 2),
+        },
+        "endpoints": endpoints,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} endpoint(s) regressed beyond {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""GET latency while a burst of logins keeps the password hashing pool busy.
+
+Run from backend/:  python -m benchmarks.login_storm --storm 64 --samples 300
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+EMAIL = "storm@example.com"
+PASSWORD = "storm-password"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def sample_gets(client: httpx.AsyncClient, headers: dict, samples: int, readers: int) -> list[float]:
+    latencies: list[float] = []
+
+    async def reader(count: int) -> None:
+        for _ in range(count):
+            started = time.perf_counter()
+            response = await client.get("/api/events", headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+
+    await asyncio.gather(*(reader(samples // readers) for _ in range(readers)))
+    return latencies
+
+
+async def login_storm(client: httpx.AsyncClient, stop: asyncio.Event, counters: dict) -> None:
+    while not stop.is_set():
+        response = await client.post("/api/auth/login", data={"username": EMAIL, "password": PASSWORD})
+        counters[response.status_code] = counters.get(response.status_code, 0) + 1
+
+
+def report(label: str, latencies: list[float]) -> None:
+    print(
+        f"{label:<12} n={len(latencies):<5} p50={percentile(latencies, 50):8.2f}ms "
+        f"p95={percentile(latencies, 95):8.2f}ms p99={percentile(latencies, 99):8.2f}ms"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.auth import hashing_pool
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        await client.post("/api/auth/register", json={"email": EMAIL, "full_name": "Storm", "password": PASSWORD})
+        response = await client.post("/api/auth/login", data={"username": EMAIL, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        report("idle", await sample_gets(client, headers, args.samples, args.readers))
+
+        stop = asyncio.Event()
+        counters: dict[int, int] = {}
+        storm = [asyncio.create_task(login_storm(client, stop, counters)) for _ in range(args.storm)]
+        await asyncio.sleep(0.2)
+        report("login storm", await sample_gets(client, headers, args.samples, args.readers))
+        stop.set()
+        await asyncio.gather(*storm)
+
+    print(f"login responses: {dict(sorted(counters.items()))}")
+    print(f"hashing pool: {hashing_pool.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--storm", type=int, default=64, help="concurrent clients logging in")
+    parser.add_argument("--samples", type=int, default=300, help="GET requests measured per phase")
+    parser.add_argument("--readers", type=int, default=4, help="concurrent GET clients")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/bench.db")
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
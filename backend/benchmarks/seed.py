@@ -0,0 +1,251 @@
+"""Deterministic synthetic school data for the benchmarks.
+
+Run from backend/:  python -m benchmarks.seed --users 2000 --years 2 --db benchmarks/.data/school.db
+
+Rows get explicit primary keys laid out per user (see Layout), so a benchmark can build valid
+paths for any seeded user without querying the database first.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, time as clock, timedelta
+from pathlib import Path
+
+STUDENTS_PER_USER = 30
+EVENTS_PER_USER = 12
+TASKS_PER_USER = 40
+PASSWORD = "bench-password"
+BATCH_USERS = 25
+
+FIRST_NAMES = ("Ana", "Luis", "Marta", "Pablo", "Lucía", "Hugo", "Sofía", "Mateo", "Valeria", "Martín", "Julia", "Daniel")
+LAST_NAMES = ("García", "Fernández", "López", "Martínez", "Sánchez", "Pérez", "Gómez", "Díaz", "Romero", "Navarro")
+SUBJECTS = ("Matemáticas", "Lengua", "Ciencias", "Historia", "Inglés", "Música", "Plástica", "Educación Física")
+WEEKDAYS = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes")
+STATUSES = ("presente",) * 17 + ("ausente", "ausente", "tarde")
+MOODS = ("tranquilo", "participativo", "distraído", "cansado", "motivado")
+
+
+@dataclass
+class Layout:
+    users: int
+    years: int
+    seed: int
+    end: str
+
+    @property
+    def end_date(self) -> date:
+        return date.fromisoformat(self.end)
+
+    @property
+    def start_date(self) -> date:
+        return self.end_date - timedelta(days=365 * self.years)
+
+    def email(self, user_id: int) -> str:
+        return f"docente{user_id}@bench.example"
+
+    def student_ids(self, user_id: int) -> range:
+        return range((user_id - 1) * STUDENTS_PER_USER + 1, user_id * STUDENTS_PER_USER + 1)
+
+    def event_ids(self, user_id: int) -> range:
+        return range((user_id - 1) * EVENTS_PER_USER + 1, user_id * EVENTS_PER_USER + 1)
+
+    def task_ids(self, user_id: int) -> range:
+        return range((user_id - 1) * TASKS_PER_USER + 1, user_id * TASKS_PER_USER + 1)
+
+    def save(self, path: Path) -> None:
+        path.write_text(json.dumps(asdict(self)))
+
+    @classmethod
+    def load(cls, path: Path) -> "Layout":
+        return cls(**json.loads(path.read_text()))
+
+
+def layout_path(db_path: Path) -> Path:
+    return db_path.with_suffix(".json")
+
+
+def _school_days(start: date, end: date) -> list[date]:
+    days = []
+    day = start
+    while day <= end:
+        # Weekdays outside the summer break.
+        if day.weekday() < 5 and day.month not in (7, 8):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def _user_rows(layout: Layout, user_id: int, rng: random.Random, school_days: list[date], hashed_password: str) -> dict:
+    from app.routers.events import CATEGORY_COLORS
+
+    rows: dict[str, list[dict]] = {name: [] for name in ("users", "students", "events", "tasks", "reminders")}
+    rows.update({name: [] for name in ("attendance", "observations", "plannings", "contents", "event_exceptions")})
+    rows["users"].append(
+        {"id": user_id, "email": layout.email(user_id), "full_name": f"Docente {user_id}", "hashed_password": hashed_password}
+    )
+
+    groups = [f"{grade}{letter}" for grade in range(1, 7) for letter in "AB"]
+    user_groups = rng.sample(groups, 2)
+    student_ids = list(layout.student_ids(user_id))
+    for student_id in student_ids:
+        birthday = date(layout.end_date.year - rng.randint(6, 12), rng.randint(1, 12), rng.randint(1, 28))
+        rows["students"].append(
+            {
+                "id": student_id,
+                "owner_id": user_id,
+                "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {student_id}",
+                "age": layout.end_date.year - birthday.year,
+                "birthday": birthday,
+                "group_name": user_groups[student_id % 2],
+                "guardian_contact": f"+34 600 {student_id:06d}",
+                "progress_status": rng.choice(("en_proceso", "logrado", "requiere_apoyo")),
+            }
+        )
+
+    event_ids = list(layout.event_ids(user_id))
+    first_monday = layout.start_date - timedelta(days=layout.start_date.weekday())
+    for index, event_id in enumerate(event_ids):
+        recurring = index < EVENTS_PER_USER - 2
+        category = "subject" if recurring else rng.choice(("exam", "practice", "personal"))
+        day = first_monday + timedelta(days=index % 5) if recurring else layout.end_date + timedelta(days=rng.randint(1, 60))
+        start = clock(8 + index // 5 * 2, 0)
+        rows["events"].append(
+            {
+                "id": event_id,
+                "owner_id": user_id,
+                "title": rng.choice(SUBJECTS) + f" {user_groups[index % 2]}",
+                "date": day,
+                "start_time": start,
+                "end_time": clock(start.hour + 1, 0),
+                "location": f"Aula {rng.randint(1, 20)}",
+                "category": category,
+                "color": CATEGORY_COLORS[category],
+                "notes": None,
+                "recurrence": "weekly" if recurring else None,
+                "recurrence_rule": None,
+            }
+        )
+    for event_id in event_ids[:3]:
+        original = layout.end_date - timedelta(days=rng.randint(1, 90))
+        original -= timedelta(days=(original.weekday() - (event_id - event_ids[0]) % 5) % 7)
+        rows["event_exceptions"].append(
+            {"owner_id": user_id, "event_id": event_id, "original_date": original, "is_cancelled": True}
+        )
+
+    for task_id in layout.task_ids(user_id):
+        rows["tasks"].append(
+            {
+                "id": task_id,
+                "owner_id": user_id,
+                "title": f"Corregir {rng.choice(SUBJECTS).lower()}",
+                "due_date": layout.end_date + timedelta(days=rng.randint(-30, 30)),
+                "priority": rng.choice(("low", "medium", "high")),
+                "notes": None,
+                "is_done": rng.random() < 0.5,
+            }
+        )
+
+    rows["reminders"].append({"owner_id": user_id, "minutes_before": 0, "daily_summary": True})
+    for event_id in event_ids[:2]:
+        rows["reminders"].append({"owner_id": user_id, "event_id": event_id, "minutes_before": 15, "daily_summary": False})
+
+    for day in school_days:
+        for student_id in student_ids:
+            rows["attendance"].append({"owner_id": user_id, "student_id": student_id, "date": day, "status": rng.choice(STATUSES)})
+        if day.weekday() == 0:
+            for weekday in WEEKDAYS:
+                rows["plannings"].append(
+                    {"owner_id": user_id, "week_start": day, "weekday": weekday, "activities": f"{rng.choice(SUBJECTS)}: unidad {rng.randint(1, 12)}"}
+                )
+        if rng.random() < 0.1:
+            student_id = rng.choice(student_ids)
+            rows["observations"].append(
+                {
+                    "owner_id": user_id,
+                    "student_id": student_id,
+                    "date": day,
+                    "behavior_mood": rng.choice(MOODS),
+                    "participation": rng.choice(("alta", "media", "baja")),
+                    "notes": f"Seguimiento de {rng.choice(SUBJECTS).lower()}",
+                }
+            )
+        if rng.random() < 0.3:
+            rows["contents"].append(
+                {"owner_id": user_id, "student_id": None, "date": day, "topic": rng.choice(SUBJECTS), "notes": "Repaso"}
+            )
+    return rows
+
+
+def seed(db_path: Path, users: int, years: int, seed_value: int = 2024, end: date | None = None) -> Layout:
+    # The app reads DATABASE_URL when it is first imported.
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("REMINDER_SCHEDULER_ENABLED", "false")
+    from sqlalchemy import insert
+
+    from app.auth import hash_password
+    from app.changes import init_change_log
+    from app.database import engine
+    from app.main import app  # noqa: F401  creates the schema, search triggers and indexes
+    from app.models import Attendance, DailyContent, Event, EventException, Observation, Planning, Reminder, Student, Task, User
+    from app.rollups import init_rollups
+
+    layout = Layout(users=users, years=years, seed=seed_value, end=(end or date.today()).isoformat())
+    models = {
+        "users": User,
+        "students": Student,
+        "events": Event,
+        "event_exceptions": EventException,
+        "tasks": Task,
+        "reminders": Reminder,
+        "attendance": Attendance,
+        "observations": Observation,
+        "plannings": Planning,
+        "contents": DailyContent,
+    }
+    rng = random.Random(seed_value)
+    school_days = _school_days(layout.start_date, layout.end_date)
+    hashed_password = hash_password(PASSWORD)
+    for first in range(1, users + 1, BATCH_USERS):
+        batch: dict[str, list[dict]] = {name: [] for name in models}
+        for user_id in range(first, min(first + BATCH_USERS, users + 1)):
+            for name, rows in _user_rows(layout, user_id, rng, school_days, hashed_password).items():
+                batch[name].extend(rows)
+        with engine.begin() as connection:
+            for name, model in models.items():
+                if batch[name]:
+                    connection.execute(insert(model.__table__), batch[name])
+
+    # Core inserts skip the mapper events, so the change log and the rollups are rebuilt from the tables.
+    with engine.begin() as connection:
+        init_change_log(connection)
+        init_rollups(connection)
+    # Closing the pool checkpoints the WAL, so the database file can be copied on its own.
+    engine.dispose()
+    layout.save(layout_path(db_path))
+    return layout
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, default=Path("benchmarks/.data/school.db"))
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="last day of generated history (default: today)")
+    args = parser.parse_args()
+
+    if args.db.exists():
+        parser.error(f"{args.db} already exists")
+    args.db.parent.mkdir(parents=True, exist_ok=True)
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    started = time.perf_counter()
+    layout = seed(args.db.resolve(), args.users, args.years, args.seed, args.end)
+    print(f"Seeded {layout.users} users over {layout.years} year(s) into {args.db} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
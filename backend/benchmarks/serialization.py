@@ -0,0 +1,121 @@
+"""Large list responses through the response models versus the orjson column fast path.
+
+Run from backend/:  python -m benchmarks.serialization --users 50 --requests 200
+
+Each path runs in its own interpreter with FAST_JSON_ENABLED=false and then true against a copy of
+the seeded database, and the bodies are compared so the fast path cannot drift from the schema.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+import httpx
+
+from benchmarks.endpoints import DEFAULT_END, seeded_database
+from benchmarks.login_storm import percentile
+from benchmarks.seed import Layout, layout_path
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+def paths(layout: Layout) -> list[tuple[str, dict]]:
+    end = layout.end_date.isoformat()
+    return [
+        ("/api/events", {}),
+        ("/api/tasks", {}),
+        ("/api/students", {}),
+        ("/api/pedagogical/observations", {}),
+        ("/api/pedagogical/plannings", {}),
+        ("/api/pedagogical/contents", {}),
+        (f"/api/pedagogical/attendance?view=monthly&target_date={end}", {}),
+        (f"/api/pedagogical/attendance?view=monthly&target_date={end}", NDJSON),
+    ]
+
+
+async def run(args: argparse.Namespace, layout: Layout) -> dict:
+    from app.auth import create_access_token
+    from app.main import app
+
+    tokens = [create_access_token(layout.email(user_id)) for user_id in range(1, layout.users + 1)]
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for path, headers in paths(layout):
+            latencies: list[float] = []
+            digest = hashlib.blake2b(digest_size=8)
+            size = 0
+            for index in range(args.requests):
+                token = tokens[index % len(tokens)]
+                started = time.perf_counter()
+                response = await client.get(path, headers={**headers, "Authorization": f"Bearer {token}"})
+                latencies.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+                if index < len(tokens):
+                    digest.update(response.content)
+                size += len(response.content)
+            name = f"{path} (ndjson)" if headers else path
+            results[name] = {
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "bytes": size // args.requests,
+                "body": digest.hexdigest(),
+            }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="seeded teachers")
+    parser.add_argument("--years", type=int, default=1, help="years of attendance history")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--end", type=date.fromisoformat, default=DEFAULT_END)
+    parser.add_argument("--requests", type=int, default=200, help="sequential requests per path")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    os.environ.setdefault("REMINDER_SCHEDULER_ENABLED", "false")
+    seeded = seeded_database(args.users, args.years, args.seed, args.end)
+    layout = Layout.load(layout_path(seeded))
+    if args.worker:
+        print(json.dumps(asyncio.run(run(args, layout))))
+        return
+
+    runs = {}
+    for fast in ("false", "true"):
+        # The switch is read at import time, so each side runs in its own interpreter.
+        with tempfile.TemporaryDirectory() as workdir:
+            working = Path(workdir) / "bench.db"
+            shutil.copyfile(seeded, working)
+            env = {**os.environ, "FAST_JSON_ENABLED": fast, "DATABASE_URL": f"sqlite:///{working}"}
+            command = [sys.executable, "-m", "benchmarks.serialization", "--worker", *sys.argv[1:]]
+            output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+            runs[fast] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'path':<72} {'bytes':>8} {'model p50':>10} {'fast p50':>10} {'model p95':>10} {'fast p95':>10} {'speedup':>8}")
+    mismatched = []
+    for name, model in runs["false"].items():
+        fast = runs["true"][name]
+        if fast["body"] != model["body"]:
+            mismatched.append(name)
+        print(
+            f"{name:<72} {model['bytes']:8d} {model['p50_ms']:10.2f} {fast['p50_ms']:10.2f} "
+            f"{model['p95_ms']:10.2f} {fast['p95_ms']:10.2f} {model['p50_ms'] / fast['p50_ms']:7.2f}x"
+        )
+    if mismatched:
+        print("\nBodies differ between the two paths for: " + ", ".join(mismatched))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
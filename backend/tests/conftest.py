@@ -0,0 +1,44 @@
+import itertools
+import os
+import tempfile
+
+# The app reads its settings when it is imported, so the test database and switches go in first.
+_data_dir = tempfile.mkdtemp(prefix="agenda-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_data_dir}/agenda.db"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["QUERY_BUDGET_STRICT"] = "true"
+os.environ["REMINDER_SCHEDULER_ENABLED"] = "false"
+os.environ["INVALIDATION_POLL_SECONDS"] = "0"
+os.environ.pop("METRICS_TOKEN", None)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+PASSWORD = "password123"
+_emails = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def login(client):
+    # Each call registers a fresh teacher, so tests never see each other's rows.
+    def login(full_name: str = "Docente") -> dict[str, str]:
+        email = f"teacher{next(_emails)}@example.com"
+        response = client.post("/api/auth/register", json={"email": email, "full_name": full_name, "password": PASSWORD})
+        assert response.status_code == 201, response.text
+        response = client.post("/api/auth/login", data={"username": email, "password": PASSWORD})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return login
+
+
+@pytest.fixture
+def headers(login):
+    return login()
@@ -0,0 +1,93 @@
+import re
+
+DAY = "2027-03-01"
+
+
+def _students(client, headers, count, group_name="2B"):
+    created = []
+    for n in range(count):
+        response = client.post("/api/students", json={"full_name": f"Alumno {n:02d}", "group_name": group_name}, headers=headers)
+        assert response.status_code == 201, response.text
+        created.append(response.json()["id"])
+    return created
+
+
+def _roll_call(client, headers, body):
+    response = client.post("/api/pedagogical/attendance/batch", json={"date": DAY, **body}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def _attendance(client, headers):
+    rows = client.get(f"/api/pedagogical/attendance?target_date={DAY}", headers=headers).json()
+    return {row["student_id"]: row["status"] for row in rows}
+
+
+def test_roll_call_creates_then_updates_one_row_per_student_and_day(client, headers):
+    students = _students(client, headers, 25)
+    first = _roll_call(client, headers, {"entries": [{"student_id": student_id, "status": "present"} for student_id in students]}).json()
+    assert (first["created"], first["updated"], first["failed"]) == (25, 0, 0)
+
+    second = _roll_call(client, headers, {"entries": [{"student_id": students[0], "status": "absent"}]}).json()
+    assert (second["created"], second["updated"], second["failed"]) == (0, 1, 0)
+    assert second["results"][0]["attendance"]["status"] == "absent"
+
+    statuses = _attendance(client, headers)
+    assert len(statuses) == 25
+    assert statuses[students[0]] == "absent"
+
+
+def test_roll_call_cost_does_not_grow_with_the_class(client, headers):
+    students = _students(client, headers, 25)
+    response = _roll_call(client, headers, {"entries": [{"student_id": student_id, "status": "present"} for student_id in students]})
+    queries = int(re.search(r'desc="(\d+) queries"', response.headers["Server-Timing"]).group(1))
+    assert queries < 10
+
+
+def test_group_default_status_fills_in_the_rest_of_the_group(client, headers):
+    students = _students(client, headers, 4)
+    _students(client, headers, 2, group_name="3C")
+    body = {"group_name": "2B", "default_status": "present", "entries": [{"student_id": students[1], "status": "late"}]}
+    result = _roll_call(client, headers, body).json()
+    assert result["created"] == 4
+
+    statuses = _attendance(client, headers)
+    assert statuses == {students[0]: "present", students[1]: "late", students[2]: "present", students[3]: "present"}
+
+
+def test_foreign_and_repeated_students_fail_per_row(client, login):
+    teacher, other = login(), login()
+    mine = _students(client, teacher, 2)
+    theirs = _students(client, other, 1)
+    entries = [
+        {"student_id": mine[0], "status": "present"},
+        {"student_id": mine[1], "status": "present"},
+        {"student_id": mine[1], "status": "absent"},
+        {"student_id": theirs[0], "status": "present"},
+    ]
+    result = _roll_call(client, teacher, {"entries": entries}).json()
+    assert (result["created"], result["updated"], result["failed"]) == (1, 0, 2)
+    errors = {row["student_id"]: row["error"] for row in result["results"] if row["result"] == "error"}
+    assert set(errors) == {mine[1], theirs[0]}
+    assert _attendance(client, other) == {}
+
+
+def test_updates_move_the_rollup_counts(client, headers):
+    students = _students(client, headers, 3)
+    _roll_call(client, headers, {"entries": [{"student_id": student_id, "status": "present"} for student_id in students]})
+    _roll_call(client, headers, {"entries": [{"student_id": students[0], "status": "absent"}]})
+
+    stats = client.get("/api/pedagogical/attendance/stats/groups", headers=headers).json()
+    assert [(entry["group_name"], entry["total"], entry["by_status"]) for entry in stats] == [("2B", 3, {"absent": 1, "present": 2})]
+
+
+def test_single_post_updates_the_day_with_200(client, headers):
+    (student_id,) = _students(client, headers, 1)
+    body = {"student_id": student_id, "date": DAY, "status": "present"}
+    created = client.post("/api/pedagogical/attendance", json=body, headers=headers)
+    assert created.status_code == 201
+
+    updated = client.post("/api/pedagogical/attendance", json={**body, "status": "late"}, headers=headers)
+    assert updated.status_code == 200
+    assert updated.json()["id"] == created.json()["id"]
+    assert _attendance(client, headers) == {student_id: "late"}
@@ -0,0 +1,60 @@
+import pytest
+
+COLLECTION_ROUTES = [
+    "/api/events",
+    "/api/tasks",
+    "/api/students",
+    "/api/pedagogical/observations",
+    "/api/pedagogical/attendance",
+    "/api/pedagogical/plannings",
+    "/api/pedagogical/contents",
+]
+
+
+@pytest.mark.parametrize("url", COLLECTION_ROUTES)
+def test_unchanged_collection_answers_304(client, headers, url):
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+    assert client.get(url, headers={**headers, "If-None-Match": f"W/{etag}"}).status_code == 304
+
+
+def test_write_changes_the_etag(client, headers):
+    etag = client.get("/api/tasks", headers=headers).headers["ETag"]
+    assert client.post("/api/tasks", json={"title": "Preparar fichas"}, headers=headers).status_code == 201
+
+    response = client.get("/api/tasks", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [task["title"] for task in response.json()] == ["Preparar fichas"]
+
+
+def test_versions_are_per_user_and_per_collection(client, login):
+    teacher, other = login(), login()
+    tasks_etag = client.get("/api/tasks", headers=teacher).headers["ETag"]
+    students_etag = client.get("/api/students", headers=teacher).headers["ETag"]
+
+    client.post("/api/tasks", json={"title": "Otra clase"}, headers=other)
+    client.post("/api/students", json={"full_name": "Ana"}, headers=teacher)
+
+    assert client.get("/api/tasks", headers={**teacher, "If-None-Match": tasks_etag}).status_code == 304
+    assert client.get("/api/students", headers={**teacher, "If-None-Match": students_etag}).status_code == 200
+
+
+def test_query_parameters_are_part_of_the_etag(client, headers):
+    etag = client.get("/api/tasks", headers=headers).headers["ETag"]
+    response = client.get("/api/tasks?limit=1", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_304_runs_no_queries_once_the_versions_are_cached(client, headers):
+    etag = client.get("/api/students", headers=headers).headers["ETag"]
+    response = client.get("/api/students", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert 'desc="0 queries"' in response.headers["Server-Timing"]
@@ -0,0 +1,84 @@
+from datetime import date, time, timedelta
+
+from app import conflicts, schemas
+from app.database import ReadSessionLocal
+
+MONDAY = date(2027, 3, 1)
+WINDOW = (MONDAY, MONDAY + timedelta(days=60))
+
+
+def _event(client, headers, **fields):
+    body = {"title": "Lengua", "date": str(MONDAY), "start_time": "09:00", "end_time": "10:00", "category": "class", **fields}
+    response = client.post("/api/events?allow_conflicts=true", json=body, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _pairs(client, headers):
+    response = client.get(f"/api/events/conflicts?start_date={WINDOW[0]}&end_date={WINDOW[1]}", headers=headers)
+    assert response.status_code == 200, response.text
+    return [(pair["date"], pair["first"]["event_id"], pair["second"]["event_id"]) for pair in response.json()]
+
+
+def _days(index):
+    return {day: [(occurrence.id, occurrence.start_time, occurrence.end_time) for occurrence in items] for day, items in index._days.items()}
+
+
+def _event_days(index):
+    return {event_id: sorted(days) for event_id, days in index._event_days.items() if days}
+
+
+def _occurrence(event_id, day, start="09:00", end="10:00"):
+    return schemas.EventOccurrenceOut(
+        id=event_id, owner_id=1, title="Clase", date=day, start_time=start, end_time=end, category="class", color="#0f766e", occurrence_date=day
+    )
+
+
+def test_new_event_reports_overlaps_with_recurring_ones(client, headers):
+    weekly = _event(client, headers, recurrence="weekly")
+    response = client.post(
+        "/api/events?allow_conflicts=false",
+        json={"title": "Tutoría", "date": str(MONDAY + timedelta(weeks=3)), "start_time": "09:30", "end_time": "11:00", "category": "meeting"},
+        headers=headers,
+    )
+    assert response.status_code == 409
+    assert [conflict["event_id"] for conflict in response.json()["detail"]["conflicts"]] == [weekly["id"]]
+
+
+def test_cached_index_is_patched_after_writes(client, headers):
+    weekly = _event(client, headers, recurrence="weekly")
+    single = _event(client, headers, date=str(MONDAY + timedelta(weeks=2)), start_time="09:30", end_time="10:30")
+    assert _pairs(client, headers) == [(str(MONDAY + timedelta(weeks=2)), weekly["id"], single["id"])]
+    owner_id = single["owner_id"]
+    key = (owner_id, WINDOW[0].replace(day=1), date(2027, 4, 30))
+    built = conflicts.index_cache.get(key)[1]
+    before = _event_days(built)
+
+    client.put(f"/api/events/{single['id']}?allow_conflicts=true", json={"date": str(MONDAY + timedelta(weeks=4))}, headers=headers)
+    client.post(f"/api/events/{weekly['id']}/exceptions", json={"original_date": str(MONDAY + timedelta(weeks=4)), "is_cancelled": True}, headers=headers)
+    assert _pairs(client, headers) == []
+    client.put(f"/api/events/{single['id']}?allow_conflicts=true", json={"date": str(MONDAY + timedelta(weeks=5))}, headers=headers)
+    assert _pairs(client, headers) == [(str(MONDAY + timedelta(weeks=5)), weekly["id"], single["id"])]
+
+    patched = conflicts.index_cache.get(key)[1]
+    assert patched is not built
+    assert _event_days(built) == before
+    db = ReadSessionLocal()
+    try:
+        rebuilt = conflicts.IntervalIndex(*conflicts._expand(db, owner_id, *key[1:]))
+    finally:
+        db.close()
+    assert _days(patched) == _days(rebuilt)
+
+
+def test_patching_leaves_the_previous_index_alone():
+    tuesday = MONDAY + timedelta(days=1)
+    built = conflicts.IntervalIndex([_occurrence(1, MONDAY), _occurrence(2, MONDAY, "09:30", "11:00"), _occurrence(3, tuesday)])
+    patched = built.patched({2}, [_occurrence(2, tuesday, "09:30", "11:00")], {})
+
+    assert [occurrence.id for occurrence in built.overlapping(MONDAY, time(9, 45), time(10, 30))] == [1, 2]
+    assert [occurrence.id for occurrence in patched.overlapping(MONDAY, time(9, 45), time(10, 30))] == [1]
+    assert [occurrence.id for occurrence in patched.overlapping(tuesday, time(9, 45), time(10, 30))] == [3, 2]
+    # Day sets written while rebuilding a day belong to the new index only.
+    assert all(patched._event_days[event_id] is not built._event_days[event_id] for event_id in (1, 2, 3))
+    assert _event_days(built) == {1: [MONDAY], 2: [MONDAY], 3: [tuesday]}
@@ -0,0 +1,17 @@
+from app.ics import _escape
+
+
+def test_escape_turns_every_line_break_into_an_escaped_newline():
+    assert _escape("a\r\nb\rc\nd") == "a\\nb\\nc\\nd"
+    assert _escape("uno; dos, tres \\") == "uno\\; dos\\, tres \\\\"
+
+
+def test_export_keeps_crlf_line_structure(client, headers):
+    body = {"title": "Lengua\rGrupo B", "notes": "Traer\r\rcuaderno", "date": "2027-03-01", "start_time": "09:00", "end_time": "10:00", "category": "class"}
+    assert client.post("/api/events", json=body, headers=headers).status_code == 201
+
+    response = client.get("/api/events/export.ics", headers=headers)
+    assert response.status_code == 200
+    text = response.text
+    assert "\r" not in text.replace("\r\n", "")
+    assert "SUMMARY:Lengua\\nGrupo B\r\n" in text
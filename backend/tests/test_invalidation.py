@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+
+from app.auth import PRINCIPAL_TOPIC, principal_cache
+from app.database import DATABASE_URL
+from app.invalidation import InvalidationBus, publish
+from app.models import Task, User
+
+
+@pytest.fixture
+def other_worker():
+    # A second engine on the same file stands in for another uvicorn worker: its commits never reach this
+    # process's checkin hook, so only the bus can tell the local caches about them.
+    engine = create_engine(DATABASE_URL)
+    session = Session(engine)
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def bus():
+    bus = InvalidationBus()
+    bus._change_seq, bus._topic_seq = bus._latest()
+    return bus
+
+
+def test_writes_from_another_worker_reach_the_etags(client, headers, other_worker, bus):
+    task_id = client.post("/api/tasks", json={"title": "Preparar fichas"}, headers=headers).json()["id"]
+    etag = client.get("/api/tasks", headers=headers).headers["ETag"]
+
+    other_worker.get(Task, task_id).title = "Fichas corregidas"
+    other_worker.commit()
+    # The cached collection version still vouches for the old list until the bus runs.
+    assert client.get("/api/tasks", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    assert bus.poll() == 1
+    response = client.get("/api/tasks", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [task["title"] for task in response.json()] == ["Fichas corregidas"]
+
+
+def test_user_changes_from_another_worker_evict_cached_principals(client, other_worker, bus):
+    email = "renamed@example.com"
+    client.post("/api/auth/register", json={"email": email, "full_name": "Antes", "password": "password123"})
+    token = client.post("/api/auth/login", data={"username": email, "password": "password123"}).json()["access_token"]
+    assert client.get("/api/tasks", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    assert principal_cache.get(token) is not None
+
+    # What the other worker's User listener commits; an ORM flush here would evict through this process's own listener.
+    user_id = other_worker.query(User.id).filter(User.email == email).scalar()
+    other_worker.execute(update(User).where(User.id == user_id).values(full_name="Después"))
+    publish(other_worker.connection(), user_id, PRINCIPAL_TOPIC)
+    other_worker.commit()
+    assert principal_cache.get(token) is not None
+
+    bus.poll()
+    assert principal_cache.get(token) is None
+
+
+def test_poll_resumes_after_the_last_seen_change(client, headers, other_worker, bus):
+    task_id = client.post("/api/tasks", json={"title": "Uno"}, headers=headers).json()["id"]
+    assert bus.poll() == 1
+    assert bus.poll() == 0
+
+    other_worker.get(Task, task_id).is_done = True
+    other_worker.commit()
+    assert bus.poll() == 1
+    assert bus.stats()["received"] == 2
@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app import main
+
+
+def _request(authorization: bytes) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/api/metrics", "headers": [(b"authorization", authorization)]})
+
+
+@pytest.mark.parametrize("authorization", [b"Bearer wrong", "Bearer é".encode(), b""])
+def test_wrong_metrics_token_is_401(monkeypatch, authorization):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "secret")
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(main.metrics_endpoint(_request(authorization)))
+    assert raised.value.status_code == 401
+
+
+def test_metrics_token_grants_access(monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "secret")
+    response = asyncio.run(main.metrics_endpoint(_request(b"Bearer secret")))
+    assert response.status_code == 200
+    assert b"reminders_scheduler_leader" in response.body
+
+
+def test_metrics_route_needs_a_configured_token(client):
+    assert client.get("/api/metrics").status_code == 404
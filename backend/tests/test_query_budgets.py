@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.query_budget import QUERY_BUDGETS, SLOW_QUERY_PARAMETERS_CHARS, QueryBudgetExceeded, log_slow_query
+
+MONDAY = date.today() - timedelta(days=date.today().weekday())
+
+# One request per budgeted route; `{student_id}` is filled in from the seeded data.
+BUDGETED_REQUESTS = {
+    "GET /api/events": "/api/events",
+    "GET /api/events/occurrences": f"/api/events/occurrences?start_date={MONDAY}&end_date={MONDAY + timedelta(days=90)}",
+    "GET /api/events/calendar": f"/api/events/calendar?view=month&anchor={MONDAY}",
+    "GET /api/events/conflicts": f"/api/events/conflicts?start_date={MONDAY}&end_date={MONDAY + timedelta(days=60)}",
+    "GET /api/events/free-slots": f"/api/events/free-slots?start_date={MONDAY}&end_date={MONDAY + timedelta(days=14)}",
+    "GET /api/tasks": "/api/tasks",
+    "GET /api/students": "/api/students",
+    "GET /api/students/{student_id}": "/api/students/{student_id}",
+    "GET /api/reminders": "/api/reminders",
+    "GET /api/pedagogical/observations": "/api/pedagogical/observations",
+    "GET /api/pedagogical/attendance": "/api/pedagogical/attendance",
+    "GET /api/pedagogical/plannings": "/api/pedagogical/plannings",
+    "GET /api/pedagogical/contents": "/api/pedagogical/contents",
+    "GET /api/search": "/api/search?q=lectura",
+    "GET /api/sync": "/api/sync",
+    "GET /api/bootstrap": "/api/bootstrap",
+}
+
+
+@pytest.fixture(scope="module")
+def teacher(client):
+    # Enough rows of every kind that a per-row lazy load would blow the budget.
+    email = "budgets@example.com"
+    client.post("/api/auth/register", json={"email": email, "full_name": "Budgets", "password": "password123"})
+    token = client.post("/api/auth/login", data={"username": email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def post(url, body):
+        response = client.post(url, json=body, headers=headers)
+        assert response.status_code in (200, 201), response.text
+        return response.json()
+
+    students = [
+        post("/api/students", {"full_name": f"Alumno {n}", "group_name": "3A", "birthday": f"2018-{n % 12 + 1:02d}-10"})
+        for n in range(12)
+    ]
+    for n in range(6):
+        event = post(
+            "/api/events?allow_conflicts=true",
+            {
+                "title": f"Lectura {n}",
+                "date": str(MONDAY + timedelta(days=n % 5)),
+                "start_time": f"{9 + n % 3:02d}:00",
+                "end_time": f"{10 + n % 3:02d}:30",
+                "category": "class",
+                "recurrence": "weekly",
+            },
+        )
+        post(f"/api/events/{event['id']}/exceptions", {"original_date": str(MONDAY + timedelta(days=7 + n % 5)), "is_cancelled": True})
+        task = post("/api/tasks", {"title": f"Corregir lectura {n}", "due_date": str(MONDAY + timedelta(days=n)), "event_id": event["id"]})
+        post("/api/reminders", {"event_id": event["id"], "minutes_before": 15})
+        post("/api/reminders", {"task_id": task["id"], "minutes_before": 60})
+    post(
+        "/api/pedagogical/attendance/batch",
+        {"date": str(MONDAY), "entries": [{"student_id": student["id"], "status": "present"} for student in students]},
+    )
+    for student in students[:6]:
+        post("/api/pedagogical/observations", {"student_id": student["id"], "date": str(MONDAY), "notes": "Buena lectura"})
+        post("/api/pedagogical/contents", {"student_id": student["id"], "date": str(MONDAY), "topic": "Lectura guiada"})
+    post("/api/pedagogical/plannings", {"week_start": str(MONDAY), "weekday": "lunes", "activities": "Lectura en voz alta"})
+    return headers, students[0]["id"]
+
+
+def test_every_budgeted_route_is_exercised():
+    assert set(BUDGETED_REQUESTS) == set(QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize("route", sorted(QUERY_BUDGETS))
+def test_route_stays_within_budget(client, teacher, route):
+    headers, student_id = teacher
+    url = BUDGETED_REQUESTS[route].format(student_id=student_id)
+    # The first request runs with cold per-owner caches, the second with warm ones; strict mode turns an
+    # over-budget statement into an exception raised straight out of the client.
+    for _ in range(2):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, response.text
+
+
+def test_strict_mode_fails_an_over_budget_route(client, teacher, monkeypatch):
+    headers, _student_id = teacher
+    monkeypatch.setitem(QUERY_BUDGETS, "GET /api/tasks", 0)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/api/tasks", headers=headers)
+
+
+def test_slow_query_log_keeps_only_the_first_row_of_a_batch(caplog):
+    rows = [("Alumno con un nombre largo " * 40, n) for n in range(1000)]
+    log_slow_query(None, "INSERT INTO students (full_name, age) VALUES (?, ?)", rows, 0.5)
+    message = caplog.records[-1].getMessage()
+    assert "(+999 more rows)" in message
+    assert len(message) < SLOW_QUERY_PARAMETERS_CHARS + 300
@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+MONDAY = date(2027, 3, 1)
+
+
+def _occurrences(client, headers, start, end):
+    response = client.get(f"/api/events/occurrences?start_date={start}&end_date={end}", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _weekly_class(client, headers, **fields):
+    body = {"title": "Lengua", "date": str(MONDAY), "start_time": "09:00", "end_time": "10:00", "category": "class", "recurrence": "weekly"}
+    response = client.post("/api/events?allow_conflicts=true", json={**body, **fields}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_weekly_event_expands_over_the_requested_window_only(client, headers):
+    _weekly_class(client, headers)
+    found = _occurrences(client, headers, MONDAY + timedelta(days=14), MONDAY + timedelta(days=34))
+    assert [occurrence["date"] for occurrence in found] == [str(MONDAY + timedelta(weeks=week)) for week in (2, 3, 4)]
+    assert all(occurrence["occurrence_date"] == occurrence["date"] for occurrence in found)
+
+
+def test_rrule_count_and_byday(client, headers):
+    _weekly_class(client, headers, recurrence=None, recurrence_rule="FREQ=WEEKLY;BYDAY=MO,WE;COUNT=3")
+    found = _occurrences(client, headers, MONDAY, MONDAY + timedelta(days=60))
+    assert [occurrence["date"] for occurrence in found] == [str(MONDAY), str(MONDAY + timedelta(days=2)), str(MONDAY + timedelta(days=7))]
+
+
+def test_exceptions_cancel_and_move_single_occurrences(client, headers):
+    event = _weekly_class(client, headers)
+    cancelled, moved = MONDAY + timedelta(weeks=1), MONDAY + timedelta(weeks=2)
+    for body in (
+        {"original_date": str(cancelled), "is_cancelled": True},
+        {"original_date": str(moved), "date": str(moved + timedelta(days=1)), "start_time": "11:00", "title": "Lengua (aula 2)"},
+    ):
+        response = client.post(f"/api/events/{event['id']}/exceptions", json=body, headers=headers)
+        assert response.status_code == 201, response.text
+
+    found = _occurrences(client, headers, MONDAY, MONDAY + timedelta(days=20))
+    assert [(occurrence["date"], occurrence["start_time"], occurrence["is_exception"]) for occurrence in found] == [
+        (str(MONDAY), "09:00:00", False),
+        (str(moved + timedelta(days=1)), "11:00:00", True),
+    ]
+    assert found[1]["occurrence_date"] == str(moved)
+    assert found[1]["title"] == "Lengua (aula 2)"
+
+
+def test_exception_must_target_an_occurrence(client, headers):
+    event = _weekly_class(client, headers)
+    response = client.post(
+        f"/api/events/{event['id']}/exceptions", json={"original_date": str(MONDAY + timedelta(days=1)), "is_cancelled": True}, headers=headers
+    )
+    assert response.status_code == 400
+
+
+def test_editing_the_event_replaces_its_memoized_expansion(client, headers):
+    event = _weekly_class(client, headers)
+    window = (MONDAY, MONDAY + timedelta(days=13))
+    assert [occurrence["start_time"] for occurrence in _occurrences(client, headers, *window)] == ["09:00:00", "09:00:00"]
+
+    response = client.put(
+        f"/api/events/{event['id']}?allow_conflicts=true",
+        json={"start_time": "12:00", "end_time": "13:00", "recurrence": "daily"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    found = _occurrences(client, headers, *window)
+    assert len(found) == 14
+    assert {occurrence["start_time"] for occurrence in found} == {"12:00:00"}
@@ -0,0 +1,64 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+
+from app.scheduler import MemoryDispatcher, ReminderScheduler
+
+
+class Clock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def _reminders(client, headers):
+    owned = []
+    for day, start in (("2031-03-03", "09:00"), ("2031-03-03", "11:00"), ("2031-03-04", "09:00")):
+        event = client.post(
+            "/api/events?allow_conflicts=true",
+            json={"title": f"Clase {day} {start}", "date": day, "start_time": start, "end_time": "12:00", "category": "class"},
+            headers=headers,
+        ).json()
+        owned.append(client.post("/api/reminders", json={"event_id": event["id"], "minutes_before": 10}, headers=headers).json()["id"])
+    return owned
+
+
+async def _advance(clock: Clock, to: datetime, *schedulers: ReminderScheduler) -> None:
+    clock.now = to
+    for scheduler in schedulers:
+        if scheduler._wakeup is not None:
+            scheduler._wakeup.set()
+    await asyncio.sleep(0.3)
+
+
+def test_two_workers_deliver_each_due_reminder_once(client, headers, tmp_path):
+    owned = _reminders(client, headers)
+    lock_path = str(tmp_path / "agenda.db.scheduler.lock")
+
+    async def run():
+        clock = Clock(datetime(2031, 3, 3, 8, 0))
+        workers = [ReminderScheduler(MemoryDispatcher(), clock=clock, lock_path=lock_path, retry_seconds=0.05) for _ in range(2)]
+        for worker in workers:
+            await worker.start()
+        assert sorted(worker.stats()["leader"] for worker in workers) == [False, True]
+        leader, standby = sorted(workers, key=lambda worker: not worker.stats()["leader"])
+
+        await _advance(clock, datetime(2031, 3, 3, 12, 0), *workers)
+        first = [notification for worker in workers for notification in worker.dispatcher.sent]
+
+        # The leader's worker exits; the standby takes the lock over and carries on from there.
+        await leader.stop()
+        await asyncio.sleep(0.3)
+        assert standby.stats()["leader"]
+        await _advance(clock, datetime(2031, 3, 4, 12, 0), standby)
+        await standby.stop()
+        return leader.dispatcher.sent, standby.dispatcher.sent, first
+
+    led, stood_by, first = asyncio.run(run())
+    delivered = Counter((notification.reminder_id, notification.fire_at) for notification in led + stood_by)
+    assert set(delivered.values()) == {1}
+    assert {notification.reminder_id for notification in first if notification.reminder_id in owned} == set(owned[:2])
+    assert [notification.reminder_id for notification in stood_by if notification.reminder_id in owned] == [owned[2]]
+    assert not any(notification.reminder_id == owned[2] for notification in led)
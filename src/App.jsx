@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { request } from './api';
 
 import AuthPanel from './components/AuthPanel';
@@ -28,6 +28,7 @@ export default function App() {
   });
 
   const [studentProfile, setStudentProfile] = useState(null);
+  const syncToken = useRef(null);
 
   // ================= AUTH =================
 
@@ -47,36 +48,36 @@ export default function App() {
   // ================= LOAD DATA =================
 
   const loadData = async () => {
-    const [
-      events,
-      tasks,
-      reminders,
-      students,
-      observations,
-      attendance,
-      plannings,
-      contents,
-    ] = await Promise.all([
-      request('/api/events', { token }),
-      request('/api/tasks', { token }),
-      request('/api/reminders', { token }),
-      request('/api/students', { token }),
-      request('/api/pedagogical/observations', { token }),
-      request('/api/pedagogical/attendance?view=weekly', { token }),
-      request('/api/pedagogical/plannings', { token }),
-      request('/api/pedagogical/contents', { token }),
-    ]);
-
-    setData({
-      events,
-      tasks,
-      reminders,
-      students,
-      observations,
-      attendance,
-      plannings,
-      contents,
+    const { sync_token: since, ...snapshot } = await request('/api/bootstrap', { token });
+    syncToken.current = since;
+    setData((current) => ({ ...current, ...snapshot }));
+  };
+
+  const mergeChanges = (current, changes, deleted) => {
+    const next = { ...current };
+    Object.keys(current).forEach((key) => {
+      const changed = changes[key] || [];
+      const removed = new Set(deleted[key] || []);
+      if (!changed.length && !removed.size) return;
+      const byId = new Map(changed.map((row) => [row.id, row]));
+      const kept = current[key]
+        .filter((row) => !removed.has(row.id))
+        .map((row) => byId.get(row.id) || row);
+      const known = new Set(kept.map((row) => row.id));
+      next[key] = [...kept, ...changed.filter((row) => !known.has(row.id))];
     });
+    return next;
+  };
+
+  const syncData = async () => {
+    if (syncToken.current === null) return loadData();
+    let hasMore = true;
+    while (hasMore) {
+      const delta = await request(`/api/sync?since=${syncToken.current}`, { token });
+      syncToken.current = delta.token;
+      hasMore = delta.has_more;
+      setData((current) => mergeChanges(current, delta.changes, delta.deleted));
+    }
   };
 
   const loadStudentProfile = async (studentId) => {
@@ -84,6 +85,17 @@ export default function App() {
     setStudentProfile(profile);
   };
 
+  const loadMoreProfile = async (tab) => {
+    const cursor = studentProfile[`${tab}_next_cursor`];
+    const page = await request(`/api/students/${studentProfile.student.id}/profile?tabs=${tab}&${tab}_cursor=${cursor}`, { token });
+    setStudentProfile((current) => ({
+      ...current,
+      [tab]: [...current[tab], ...page[tab]],
+      [`${tab}_next_cursor`]: page[`${tab}_next_cursor`],
+      summary: page.summary,
+    }));
+  };
+
   useEffect(() => {
     if (token) loadData();
   }, [token]);
@@ -98,7 +110,7 @@ export default function App() {
 
   const create = async (path, payload) => {
     await request(path, { method: 'POST', body: payload, token });
-    await loadData();
+    await syncData();
     if (selectedStudentId) await loadStudentProfile(selectedStudentId);
   };
 
@@ -108,7 +120,7 @@ export default function App() {
       body: { is_done: !task.is_done },
       token,
     });
-    await loadData();
+    await syncData();
   };
 
   const updateStudent = async (studentId, payload) => {
@@ -117,7 +129,7 @@ export default function App() {
       body: payload,
       token,
     });
-    await loadData();
+    await syncData();
     if (selectedStudentId) await loadStudentProfile(selectedStudentId);
   };
 
@@ -158,6 +170,7 @@ export default function App() {
               onCreateObservation={(p) => create('/api/pedagogical/observations', p)}
               onCreateContent={(p) => create('/api/pedagogical/contents', p)}
               onUpdateStudent={updateStudent}
+              onLoadMore={loadMoreProfile}
             />
           );
         }
@@ -2,12 +2,12 @@ import { useState } from 'react';
 
 const tabs = ['seguimiento', 'asistencias', 'observaciones', 'contenidos'];
 
-export default function StudentProfileView({ profile, onBack, onCreateAttendance, onCreateObservation, onCreateContent, onUpdateStudent }) {
+export default function StudentProfileView({ profile, onBack, onCreateAttendance, onCreateObservation, onCreateContent, onUpdateStudent, onLoadMore }) {
   const [activeTab, setActiveTab] = useState('seguimiento');
 
   if (!profile) return null;
 
-  const { student, attendance, observations, contents } = profile;
+  const { student, attendance, observations, contents, summary } = profile;
 
   return (
     <section className="view-stack">
@@ -35,22 +35,36 @@ export default function StudentProfileView({ profile, onBack, onCreateAttendance
 
         {activeTab === 'seguimiento' && (
           <ul className="list compact">
-            <li>Observaciones totales: {observations.length}</li>
-            <li>Asistencias registradas: {attendance.length}</li>
-            <li>Contenidos vistos: {contents.length}</li>
+            <li>Observaciones totales: {summary.observations_total}</li>
+            <li>Asistencias registradas: {summary.attendance_total}</li>
+            {summary.attendance_rate !== null && <li>Asistencia: {Math.round(summary.attendance_rate * 100)}%</li>}
+            {summary.attendance_by_month.slice(-3).map((month) => (
+              <li key={month.month}>{month.month}: {month.rate === null ? 's/d' : `${Math.round(month.rate * 100)}%`} ({month.total} registros)</li>
+            ))}
+            <li>Contenidos vistos: {summary.contents_total}</li>
+            {summary.latest_observation && <li>Última observación: {summary.latest_observation.date} · {summary.latest_observation.notes}</li>}
           </ul>
         )}
 
         {activeTab === 'asistencias' && (
-          <TabAttendance studentId={student.id} attendance={attendance} onCreateAttendance={onCreateAttendance} />
+          <>
+            <TabAttendance studentId={student.id} attendance={attendance} onCreateAttendance={onCreateAttendance} />
+            {profile.attendance_next_cursor && <button className="link" onClick={() => onLoadMore('attendance')}>Cargar más</button>}
+          </>
         )}
 
         {activeTab === 'observaciones' && (
-          <TabObservations studentId={student.id} observations={observations} onCreateObservation={onCreateObservation} />
+          <>
+            <TabObservations studentId={student.id} observations={observations} onCreateObservation={onCreateObservation} />
+            {profile.observations_next_cursor && <button className="link" onClick={() => onLoadMore('observations')}>Cargar más</button>}
+          </>
         )}
 
         {activeTab === 'contenidos' && (
-          <TabContents studentId={student.id} contents={contents} onCreateContent={onCreateContent} />
+          <>
+            <TabContents studentId={student.id} contents={contents} onCreateContent={onCreateContent} />
+            {profile.contents_next_cursor && <button className="link" onClick={() => onLoadMore('contents')}>Cargar más</button>}
+          </>
         )}
       </article>
     </section>